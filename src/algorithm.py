@@ -1,29 +1,73 @@
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 import threading
+import time
 
 import graph
+import debug as profiler
 from debug import debug
+from recording import Trace
+from scheduler import StepScheduler
 
 
 class Algorithm(ABC):
     name = ""
     description = ""
-    barrier = threading.Barrier(2)
+    scheduler = None # hands out the steps of this session, every instance has its own
     finished = False
-    window = None
+    window = None # window the algorithm is visualized in, None when running headless
+    running_to_end = False # whether pauses are skipped until the algorithm is finished
+    killed = False
+    max_steps = None # number of steps after which a headless run stops, None to run until finished
+    steps = 0 # number of pauses reached so far
+    step_times = [] # duration of every step in seconds, only recorded when pauses are skipped
+    graph = None # graph the algorithm runs on
+    trace = None # records the changes of every step, None if the run is not recorded
 
-    def __init__(self, name, description, window):
+    def __init__(self, name, description, window=None):
         self.name = name
         self.description = description
         self.window = window
 
-    # call this method to start the algorithm
-    def start(self, graph):
-        debug("Starting algorithm: " + self.name)
+    # call this method to start the algorithm, it runs on a worker thread of pool
+    # returns False without starting if every worker of pool is taken by another session
+    def start(self, graph, pool):
+        if pool.full():
+            debug("All algorithm workers are busy, not starting: %s", self.name)
+            return False
+        debug("Starting algorithm: %s", self.name)
         self.finished = False
-        self.barrier.reset() # reset barrier
-        thread = threading.Thread(target=self.run, args=(graph,)) # create thread to execute algorithm
-        thread.start() # start thread
+        self.reset_counters()
+        self.record(graph)
+        self.scheduler = StepScheduler()
+        pool.submit(self, graph)
+        return True
+
+    def reset_counters(self):
+        self.running_to_end = False
+        self.killed = False
+        self.steps = 0
+        self.step_times = []
+        self.last_pause = time.perf_counter()
+
+    # starts recording the changes the algorithm makes to graph
+    def record(self, graph):
+        self.graph = graph
+        self.trace = Trace(graph)
+        graph.recorder = self.trace
+
+    def stop_recording(self):
+        if self.graph is not None and self.graph.recorder is self.trace:
+            self.graph.recorder = None
+
+    # runs the algorithm in the calling thread, triggers a final update of the window when done
+    def execute(self, graph):
+        self.run(graph)
+        if self.trace is not None:
+            self.trace.end_step() # changes after the last pause
+            self.stop_recording() # the trace is kept for stepping through the run
+        if self.window is not None and not self.killed:
+            self.window.root.event_generate("<<UpdateGraph>>")
 
     # the algorithm should be implemented in this method, and should wait with self.pause() before each step
     # it should also check whether self.pause() returns True, and if so, return from the method
@@ -31,29 +75,105 @@ class Algorithm(ABC):
     def run(self, graph):
         pass
 
-    # call this method to execute the next step in the algorithm, releasing the barrier
+    # call this method to execute the next step in the algorithm
     def step(self):
-        if not self.finished:
-            debug("Executing next step in algorithm: " + self.name)
-            self.barrier.wait()
+        if not self.finished and not self.running_to_end:
+            debug("Executing next step in algorithm: %s", self.name)
+            self.scheduler.release()
+
+    # skips all remaining pauses, the window is only updated once the algorithm is finished
+    def run_to_end(self):
+        if self.finished or self.running_to_end:
+            return
+        debug("Running algorithm to end: %s", self.name)
+        self.running_to_end = True
+        self.scheduler.run_free() # releases the algorithm if it is waiting for the next step
 
     # call this method to pause the algorithm, returns True if algorithm is being killed
+    # when running headless or to the end this only counts and times the step
     def pause(self):
+        self.steps += 1
+        if self.trace is not None:
+            self.trace.end_step()
+        now = time.perf_counter()
+        if profiler.profiling:
+            profiler.record("algorithm/step", self.last_pause, now - self.last_pause)
+        if self.window is None or self.running_to_end:
+            self.step_times.append(now - self.last_pause)
+            self.last_pause = now
+            if self.max_steps is not None and self.steps >= self.max_steps:
+                debug("Step limit reached, stopping algorithm: %s", self.name)
+                return True
+            return self.killed
         self.window.root.event_generate("<<UpdateGraph>>") # trigger update of graph in main thread
-        try:
-            self.barrier.wait()
-        except threading.BrokenBarrierError:
-            debug("Barrier broken, algorithm finished: " + self.name)
+        if self.scheduler.wait():
+            debug("Session cancelled, algorithm finished: %s", self.name)
             return True
+        self.last_pause = time.perf_counter() # the wait for the next step does not count as step time
         return False
 
     def kill(self):
-        debug("Killing algorithm: " + self.name)
-        self.barrier.abort()
+        debug("Killing algorithm: %s", self.name)
+        self.killed = True
+        self.stop_recording()
+        if self.scheduler is not None:
+            self.scheduler.cancel()
+
+
+# runs algorithm sessions on a bounded number of worker threads
+# sessions are independent, several of them can run at once on different graphs
+class AlgorithmPool:
+    executor = None
+    max_workers = 4
+    sessions = {} # maps running algorithms to the futures of their workers
+    lock = None
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="algorithm")
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    # a session waiting for its next step keeps its worker, so a queued session could wait forever behind parked ones
+    # returns None instead of queueing if all workers are taken
+    def submit(self, algorithm, graph):
+        with self.lock:
+            if self.live_sessions() >= self.max_workers:
+                debug("All algorithm workers are busy, not starting: %s", algorithm.name)
+                return None
+            future = self.executor.submit(algorithm.execute, graph)
+            self.sessions[algorithm] = future
+        future.add_done_callback(lambda future: self.finished(algorithm, future))
+        return future
+
+    def finished(self, algorithm, future):
+        with self.lock:
+            if self.sessions.get(algorithm) is future:
+                del self.sessions[algorithm]
+        if not future.cancelled() and future.exception() is not None:
+            debug("Algorithm %s failed: %r", algorithm.name, future.exception())
+
+    # killed sessions are not counted, their workers are free once they return from their current pause
+    def live_sessions(self):
+        return sum(1 for algorithm in self.sessions if not algorithm.killed)
+
+    def full(self):
+        with self.lock:
+            return self.live_sessions() >= self.max_workers
+
+    def running(self):
+        with self.lock:
+            return list(self.sessions)
+
+    # cancels all sessions and waits for their workers, no thread outlives the pool
+    def shutdown(self):
+        for algorithm in self.running():
+            algorithm.kill()
+        self.executor.shutdown(wait=True, cancel_futures=True)
 
 
 class TestAlgorithm(Algorithm):
-    def __init__(self, window):
+    def __init__(self, window=None):
         super().__init__("Test Algorithm", "This is a test algorithm that colors all nodes", window)
 
     def run(self, graph):
@@ -64,4 +184,4 @@ class TestAlgorithm(Algorithm):
             if self.pause():
                 return
         self.finished = True
-        debug("Algorithm finished: " + self.name)
\ No newline at end of file
+        debug("Algorithm finished: %s", self.name)
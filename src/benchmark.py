@@ -0,0 +1,419 @@
+import argparse
+from collections import Counter
+import gc
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from algorithm import TestAlgorithm
+from graph import Graph
+import layout
+from layout import ProgressiveLayout
+from lazy import LazyModule
+from renderer import Renderer
+from runner import run_headless
+from tool import AddTool, DragTool
+from view import ViewTransform
+from window import Window
+
+nx = LazyModule("networkx") # graph library, not imported by the startup benchmark
+
+
+# normalized stress of a layout, pos is a dict of {name: (x, y)}
+# graph distances are taken from breadth first searches from a sample of sources, so this also works for large graphs
+# the layout is scaled optimally before comparing, so the result does not depend on the size of the layout
+def stress(nx_graph, pos, sources=50, seed=0):
+    rng = np.random.default_rng(seed)
+    names = list(nx_graph.nodes())
+    layout_distances = []
+    graph_distances = []
+    for source in rng.choice(len(names), size=min(sources, len(names)), replace=False).tolist():
+        lengths = nx.single_source_shortest_path_length(nx_graph, names[source])
+        targets = [target for target in lengths if target != names[source]]
+        if not targets:
+            continue
+        offsets = np.array([pos[target] for target in targets]) - np.array(pos[names[source]])
+        layout_distances.append(np.linalg.norm(offsets, axis=1))
+        graph_distances.append(np.array([lengths[target] for target in targets], dtype=float))
+    if not graph_distances:
+        return 0.0
+    layout_distances = np.concatenate(layout_distances)
+    graph_distances = np.concatenate(graph_distances)
+    weights = 1/graph_distances**2
+    scale = np.sum(weights*layout_distances*graph_distances)/np.sum(weights*layout_distances**2)
+    return float(np.sum(weights*(scale*layout_distances - graph_distances)**2)/len(graph_distances))
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+# compares wall time and stress of the barnes-hut layout and nx.spring_layout on grids of growing size
+# networkx is skipped above networkx_limit nodes, it takes minutes there
+def benchmark_layout(sizes, networkx_limit):
+    print("nodes   layout        time [s]   stress")
+    for size in sizes:
+        side = int(np.sqrt(size))
+        nx_graph = nx.convert_node_labels_to_integers(nx.grid_2d_graph(side, side))
+        pos, duration = timed(layout.spring_layout, nx_graph)
+        print(f"{len(nx_graph):<7} {'barnes-hut':<13} {duration:<10.3f} {stress(nx_graph, pos):.4f}")
+        if len(nx_graph) <= networkx_limit:
+            pos, duration = timed(nx.spring_layout, nx_graph)
+            print(f"{len(nx_graph):<7} {'networkx':<13} {duration:<10.3f} {stress(nx_graph, pos):.4f}")
+
+
+# bytes per node and edge measured like below before graphs were stored in arrays, by number of nodes
+# the Graph kept its networkx graph, a Node and an Edge object per element and a property tracker built right away
+object_graph_bytes_per_element = {100: 496, 1000: 467, 5000: 468, 20000: 467}
+
+
+# memory used by a Graph per node and edge, measured with tracemalloc for random graphs with 10 edges per node
+# the networkx graph the Graph is created from is freed before measuring, nodes are placed at the origin
+# the bytes per element of the object graph are printed next to it where they were measured
+def benchmark_memory(sizes):
+    print("nodes   edges     memory [MB]   bytes per element   object graph")
+    for size in sizes:
+        nx_graph = nx.gnm_random_graph(size, 10*size, seed=0)
+        pos = {node: (0.0, 0.0) for node in nx_graph}
+        gc.collect()
+        tracemalloc.start()
+        graph = Graph(nx_graph, pos)
+        del nx_graph, pos
+        gc.collect()
+        used = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        elements = graph.node_count + graph.edge_count
+        baseline = object_graph_bytes_per_element.get(size, "-")
+        print(f"{graph.node_count:<7} {graph.edge_count:<9} {used/1e6:<13.1f} {used/elements:<19.0f} {baseline}")
+        del graph
+
+
+# canvas without a display that records the calls the renderer and the tools make
+# item ids are handed out like tk does, so the renderer can keep its maps from items to nodes and edges
+class FakeCanvas:
+    calls = None # number of calls per method
+    items = 0 # number of items created so far
+
+    def __init__(self):
+        self.calls = Counter()
+        self.items = 0
+
+    def create_item(self, method):
+        self.calls[method] += 1
+        self.items += 1
+        return self.items
+
+    def create_oval(self, *args, **kwargs):
+        return self.create_item("create_oval")
+
+    def create_line(self, *args, **kwargs):
+        return self.create_item("create_line")
+
+    def create_text(self, *args, **kwargs):
+        return self.create_item("create_text")
+
+    def create_rectangle(self, *args, **kwargs):
+        return self.create_item("create_rectangle")
+
+    def tag_bind(self, *args, **kwargs):
+        self.calls["tag_bind"] += 1
+
+    def coords(self, *args):
+        self.calls["coords"] += 1
+
+    def itemconfigure(self, *args, **kwargs):
+        self.calls["itemconfigure"] += 1
+
+    def delete(self, *args):
+        self.calls["delete"] += 1
+
+    def move(self, *args):
+        self.calls["move"] += 1
+
+    def scale(self, *args):
+        self.calls["scale"] += 1
+
+    def tag_lower(self, *args):
+        self.calls["tag_lower"] += 1
+
+    def find_withtag(self, *args):
+        self.calls["find_withtag"] += 1
+        return ()
+
+
+# the parts of Window that the renderer and the tools use, with a FakeCanvas instead of a tk canvas
+# the helpers are the ones of Window, so hit testing is measured as it runs in the application
+class FakeWindow:
+    canvas = None
+    view = None
+    renderer = None
+    layout = None
+    current_graph = None
+    current_tool = None
+
+    canvas_to_unitsquare_coords = Window.canvas_to_unitsquare_coords
+    node_at = Window.node_at
+    nodes_within = Window.nodes_within
+    relax_around = Window.relax_around
+
+    def __init__(self, graph, width=800, height=600):
+        self.canvas = FakeCanvas()
+        self.view = ViewTransform(width, height)
+        self.renderer = Renderer(self)
+        self.layout = ProgressiveLayout()
+        self.current_graph = graph
+
+    def update_graph(self):
+        self.renderer.render(self.current_graph)
+
+    def request_update(self):
+        pass
+
+    def close(self):
+        self.layout.shutdown()
+
+
+# mouse event at a canvas position
+class FakeEvent:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+# arguments of the Graph.new_* generators for a graph with about size nodes
+# complete graphs get about size edges instead, they have a quadratic number of edges
+generators = {
+    "empty": lambda size: Graph.new_empty_graph(size),
+    "complete": lambda size: Graph.new_complete_graph(max(math.isqrt(2*size), 2)),
+    "complete bipartite": lambda size: Graph.new_complete_bipartite_graph(max(math.isqrt(size), 1), max(math.isqrt(size), 1)),
+    "cycle": lambda size: Graph.new_cycle_graph(size),
+    "path": lambda size: Graph.new_path_graph(size),
+    "star": lambda size: Graph.new_star_graph(size - 1),
+    "full rary tree": lambda size: Graph.new_full_rary_tree(3, size),
+    "balanced tree": lambda size: Graph.new_balanced_tree(2, max(int(math.log2(size + 1)) - 1, 0)),
+}
+
+
+# best wall time of repeats calls of function(), the minimum is the least disturbed by other processes
+# setup() is called before every call and not timed, its result is passed to function
+def best_time(function, repeats, setup=None):
+    times = []
+    for _ in range(repeats):
+        argument = setup() if setup is not None else None
+        gc.collect()
+        start = time.perf_counter()
+        function(argument) if setup is not None else function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+# times the hot paths of the application for graphs of the given sizes, returns {benchmark name: seconds}
+# runs without a display, the layout cache is disabled and all random numbers are seeded, so runs are comparable
+def benchmark_suite(sizes, repeats=3, clicks=200):
+    cache = Graph.layout_cache
+    Graph.layout_cache = None
+    results = {}
+    try:
+        for size in sizes:
+            for name, generator in generators.items():
+                seed()
+                results["construct/" + name + "/" + str(size)] = best_time(lambda: generator(size), repeats)
+            seed()
+            graph = Graph.new_cycle_graph(size)
+            results["properties/cycle/" + str(size)] = best_time(
+                lambda: (graph.calculate_properties(), graph.refresh_properties()), repeats)
+            results.update(benchmark_rendering(graph, size, repeats))
+            results.update(benchmark_hit_testing(size, repeats, clicks))
+            results["algorithm/test/" + str(size)] = best_time(
+                lambda graph: run_headless(TestAlgorithm(), graph), repeats, setup=lambda: Graph.new_cycle_graph(size))
+    finally:
+        Graph.layout_cache = cache
+    return results
+
+
+def seed():
+    random.seed(0)
+    np.random.seed(0)
+
+
+# first frame, which creates all items, and a frame after one node moved, with the canvas calls of both
+def benchmark_rendering(graph, size, repeats):
+    results = {}
+    def first_frame():
+        window = FakeWindow(graph)
+        window.update_graph()
+        window.close()
+        return window
+    results["render/first frame/" + str(size)] = best_time(first_frame, repeats)
+    window = first_frame()
+    for method, count in sorted(window.canvas.calls.items()):
+        results["canvas calls/first frame/" + method + "/" + str(size)] = count
+    window = FakeWindow(graph)
+    window.update_graph()
+    window.canvas.calls.clear()
+    def moved_frame():
+        graph.nodes[0].x += 1e-3
+        window.update_graph()
+    results["render/moved node/" + str(size)] = best_time(moved_frame, repeats)
+    for method, count in sorted(window.canvas.calls.items()):
+        results["canvas calls/moved node/" + method + "/" + str(size)] = count//repeats
+    window.close()
+    return results
+
+
+# presses of the drag and add tools at random canvas positions, per press
+# the add tool adds a node at every press that misses the existing ones and relaxes the layout around it
+def benchmark_hit_testing(size, repeats, clicks):
+    results = {}
+    rng = np.random.default_rng(0)
+    points = rng.uniform((0, 0), (800, 600), (clicks, 2)).tolist()
+    seed()
+    graph = Graph.new_cycle_graph(size)
+    window = FakeWindow(graph)
+    window.update_graph()
+    tool = DragTool()
+    def drag_presses():
+        for x, y in points:
+            tool.handle_canvas_press(window, FakeEvent(x, y))
+    results["hit test/drag tool/" + str(size)] = best_time(drag_presses, repeats)/clicks
+    window.close()
+    def add_setup():
+        seed()
+        window = FakeWindow(Graph.new_cycle_graph(size))
+        window.update_graph()
+        return window
+    def add_presses(window):
+        tool = AddTool()
+        for x, y in points:
+            tool.handle_canvas_press(window, FakeEvent(x, y))
+        window.close()
+    results["hit test/add tool/" + str(size)] = best_time(add_presses, repeats, setup=add_setup)/clicks
+    return results
+
+
+# runs in a fresh interpreter and measures the startup path of main.py up to the first frame
+# the tk window itself is not created, so this also runs without a display
+startup_script = """
+import json, math, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+from graph import Graph
+graph = Graph.new_complete_graph(5)
+built = time.perf_counter()
+from benchmark import FakeWindow
+window = FakeWindow(graph)
+drawn = time.perf_counter()
+window.update_graph()
+first_frame = time.perf_counter() - drawn + built - start
+networkx_loaded = "networkx" in sys.modules
+drawn = time.perf_counter()
+graph.evaluate_properties(math.inf)
+properties = time.perf_counter() - drawn
+window.close()
+print(json.dumps({"startup/imports": imported - start, "startup/default graph": built - imported,
+                  "startup/first frame": first_frame, "startup/properties": properties,
+                  "startup/networkx before first frame": int(networkx_loaded)}))
+"""
+
+
+# measures the startup in repeats fresh interpreters, the fastest run counts
+# returns 1 if the first frame takes longer than budget seconds or networkx is imported before it, 0 otherwise
+def benchmark_startup(repeats, budget):
+    runs = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", startup_script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True).stdout
+        run = json.loads(output.splitlines()[-1])
+        run["startup/process"] = time.perf_counter() - start
+        runs.append(run)
+    results = {name: min(run[name] for run in runs) for name in runs[0]}
+    print_results(results)
+    over_budget = results["startup/first frame"] > budget
+    if over_budget:
+        print(f"first frame after {results['startup/first frame']:.3f} s, the budget is {budget:.3f} s")
+    if results["startup/networkx before first frame"]:
+        print("networkx is imported before the first frame")
+    return 1 if over_budget or results["startup/networkx before first frame"] else 0
+
+
+# benchmarks whose time grew by more than tolerance relative to the baseline, as (name, baseline, current)
+# times below min_time are ignored, they are too noisy, and canvas call counts have to match exactly
+def regressions(results, baseline, tolerance, min_time=1e-3):
+    found = []
+    for name, value in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if name.startswith("canvas calls/"):
+            if value > previous:
+                found.append((name, previous, value))
+        elif value > max(previous*(1 + tolerance), min_time):
+            found.append((name, previous, value))
+    return found
+
+
+def print_results(results, baseline=None):
+    print(f"{'benchmark':<52} {'value':>12} {'baseline':>12}")
+    for name, value in sorted(results.items()):
+        previous = "" if baseline is None or name not in baseline else f"{baseline[name]:>12.6g}"
+        print(f"{name:<52} {value:>12.6g} {previous:>12}")
+
+
+# writes the results as json and compares them with a baseline written the same way, returns the exit code
+def run_suite(sizes, repeats, output, baseline_path, tolerance):
+    results = benchmark_suite(sizes, repeats)
+    baseline = None
+    if baseline_path is not None:
+        with open(baseline_path) as file:
+            baseline = json.load(file)["results"]
+    print_results(results, baseline)
+    if output is not None:
+        report = {"python": platform.python_version(), "numpy": np.__version__, "networkx": nx.__version__,
+                  "platform": platform.platform(), "sizes": sizes, "repeats": repeats, "results": results}
+        with open(output, "w") as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+    if baseline is None:
+        return 0
+    found = regressions(results, baseline, tolerance)
+    for name, previous, value in found:
+        print(f"regression: {name} {previous:.6g} -> {value:.6g}")
+    return 1 if found else 0
+
+
+# run from the src directory, e.g. python benchmark.py layout --sizes 100 1000 20000
+# python benchmark.py suite --output new.json --baseline old.json fails if a benchmark got slower than old.json
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("benchmark", choices=["layout", "memory", "suite", "startup"])
+    parser.add_argument("--sizes", type=int, nargs="+", help="number of nodes")
+    parser.add_argument("--networkx-limit", type=int, default=5000, help="largest graph to lay out with networkx")
+    parser.add_argument("--repeats", type=int, default=3, help="number of runs of every suite benchmark, the fastest counts")
+    parser.add_argument("--output", help="json file to write the suite results to")
+    parser.add_argument("--baseline", help="json file of an earlier suite run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="relative slowdown that counts as a regression")
+    parser.add_argument("--budget", type=float, default=0.5, help="seconds from the start of main.py to the first frame")
+    args = parser.parse_args()
+    if args.benchmark == "layout":
+        benchmark_layout(args.sizes or [100, 1000, 5000, 20000], args.networkx_limit)
+    elif args.benchmark == "memory":
+        benchmark_memory(args.sizes or [100, 1000, 5000, 20000])
+    elif args.benchmark == "suite":
+        sys.exit(run_suite(args.sizes or [100, 500], args.repeats, args.output, args.baseline, args.tolerance))
+    elif args.benchmark == "startup":
+        sys.exit(benchmark_startup(args.repeats, args.budget))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from debug import debug, timed
+from graph import Graph
+from properties import PropertyTracker
+
+
+# builds graphs from generators in a background thread, so large graphs do not block the window
+# the edges are produced in chunks, the construction can be cancelled between chunks and between its stages
+# the graph is published as soon as its layout is ready, its property tracker follows once it is calculated
+class GraphConstruction:
+    executor = None
+    future = None
+    cancelled = None # event that stops the running construction
+    lock = None
+    generator = None # generator of the most recent start
+    stage = None # "edges", "layout" or "properties"
+    progress = 0 # fraction of the construction that is done, the edges are counted as the first half
+    graph = None # graph that was built but not polled yet
+    tracker = None # property tracker of the built graph that was not polled yet, with the version it belongs to
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="construction")
+        self.cancelled = threading.Event()
+        self.lock = threading.Lock()
+
+    def start(self, generator):
+        self.cancel()
+        self.generator = generator
+        self.cancelled = threading.Event()
+        self.stage = "edges"
+        self.progress = 0
+        debug("Starting construction of %s with %s nodes and %s edges", generator.title, generator.node_count, generator.edge_count)
+        self.future = self.executor.submit(self.run, generator, self.cancelled)
+        self.future.add_done_callback(lambda future: self.finished(generator, future))
+
+    def finished(self, generator, future):
+        if not future.cancelled() and future.exception() is not None:
+            debug("Construction of %s failed: %r", generator.title, future.exception())
+
+    # executed in the worker thread
+    @timed("construction/run")
+    def run(self, generator, cancelled):
+        def progress(edges):
+            self.progress = 0.5*edges/max(generator.edge_count, 1)
+            if edges == generator.edge_count: # the layout is computed by Graph.from_arrays() next
+                self.stage = "layout"
+        if generator.edge_count == 0:
+            self.stage = "layout"
+        graph = Graph.from_generator(generator, progress, cancelled.is_set)
+        if graph is None or cancelled.is_set():
+            debug("Construction of %s cancelled", generator.title)
+            return
+        version = graph.version
+        with self.lock:
+            if cancelled.is_set(): # cancel() may have run since the last check
+                return
+            self.graph = graph
+            self.stage = "properties"
+            self.progress = 0.9
+        # not attached to the graph here, it is only taken over if the graph was not changed in the meantime
+        tracker = PropertyTracker(graph)
+        with self.lock:
+            if cancelled.is_set():
+                return
+            self.tracker = (tracker, version)
+        debug("Construction of %s finished", generator.title)
+
+    # a cancelled construction is not busy, even if its worker did not reach the next check yet
+    def busy(self):
+        if self.cancelled.is_set():
+            return False
+        return (self.future is not None and not self.future.done()) or self.graph is not None or self.tracker is not None
+
+    # returns the graph and the (tracker, version) pair that became ready since the last poll, None for the others
+    def poll(self):
+        with self.lock:
+            graph, tracker = self.graph, self.tracker
+            self.graph = None
+            self.tracker = None
+        return graph, tracker
+
+    # the running construction stops at the next chunk or stage, its results are dropped
+    def cancel(self):
+        self.cancelled.set()
+        with self.lock:
+            self.graph = None
+            self.tracker = None
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=True, cancel_futures=True)
@@ -1,17 +1,158 @@
-# simple debug utilities
+# simple debug utilities and timing spans for the hot paths
 import argparse
+import atexit
+from collections import Counter
+import functools
+import json
+import math
+import os
+import threading
+import time
 
 verbose = False
+profiling = False # whether spans are recorded, spans cost a single check of this flag otherwise
+timings = {} # maps span names to their Timing
+events = [] # completed spans in chrome trace format, only kept if a chrome trace is written
+keep_events = False
+max_events = 1_000_000 # events beyond this are dropped, the timings still count them
+lock = threading.Lock() # spans are recorded from worker threads as well
+clock_start = time.perf_counter()
 
-def setup_debug():
+# adds the debug options to parser, parses the command line and returns the parsed arguments
+def setup_debug(parser=None):
     global verbose
-    
-    parser = argparse.ArgumentParser()
+
+    if parser is None:
+        parser = argparse.ArgumentParser()
     parser.add_argument("-v", "--verbose", help="increase output verbosity", action="store_true")
+    parser.add_argument("--profile", help="record timing spans and show them in the sidebar", action="store_true")
+    parser.add_argument("--profile-json", metavar="FILE", help="write the timings of all spans to FILE on exit")
+    parser.add_argument("--chrome-trace", metavar="FILE", help="write all spans to FILE on exit, for chrome://tracing or perfetto")
     args = parser.parse_args()
 
     verbose = args.verbose
+    if args.profile or args.profile_json or args.chrome_trace:
+        enable_profiling(keep_events=args.chrome_trace is not None)
+    if args.profile_json:
+        atexit.register(dump_json, args.profile_json)
+    if args.chrome_trace:
+        atexit.register(dump_chrome_trace, args.chrome_trace)
+    return args
 
-def debug(to_print):
+# message is only formatted with % args if verbose is set, so pass values as args instead of concatenating them
+def debug(message, *args):
     if verbose:
-        print(to_print)
\ No newline at end of file
+        print(message % args if args else message)
+
+
+# aggregated durations of one kind of span, with a histogram of power of two buckets in microseconds
+class Timing:
+    count = 0
+    total = 0 # seconds
+    minimum = math.inf
+    maximum = 0
+    buckets = None # maps k to the number of spans that took less than 2**k microseconds but at least 2**(k - 1)
+
+    def __init__(self):
+        self.buckets = Counter()
+
+    def add(self, duration):
+        self.count += 1
+        self.total += duration
+        self.minimum = min(self.minimum, duration)
+        self.maximum = max(self.maximum, duration)
+        self.buckets[max(math.ceil(math.log2(max(duration*1e6, 1))), 0)] += 1
+
+    # approximate quantile, the upper bound of the bucket it falls into
+    def quantile(self, q):
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= q*self.count:
+                return min(2**bucket/1e6, self.maximum)
+        return self.maximum
+
+    def summary(self):
+        return {"count": self.count, "total": self.total, "mean": self.total/self.count, "min": self.minimum,
+                "max": self.maximum, "p50": self.quantile(0.5), "p90": self.quantile(0.9), "p99": self.quantile(0.99),
+                "histogram": {"<" + str(2**bucket) + "us": count for bucket, count in sorted(self.buckets.items())}}
+
+
+def enable_profiling(keep_events=False):
+    global profiling
+    globals()["keep_events"] = keep_events
+    profiling = True
+
+def record(name, start, duration):
+    with lock:
+        timing = timings.get(name)
+        if timing is None:
+            timing = timings[name] = Timing()
+        timing.add(duration)
+        if keep_events and len(events) < max_events:
+            events.append({"name": name, "ph": "X", "ts": (start - clock_start)*1e6, "dur": duration*1e6,
+                           "pid": os.getpid(), "tid": threading.get_ident()})
+
+
+# times a block, use as with span("name"):
+class Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception):
+        record(self.name, self.start, time.perf_counter() - self.start)
+        return False
+
+class NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        return False
+
+no_span = NoSpan()
+
+def span(name):
+    if not profiling:
+        return no_span
+    return Span(name)
+
+# decorator that times every call of a function as a span with the given name
+def timed(name):
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not profiling:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(name, start, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+# summaries of all timings by span name, slowest total first
+def timing_summaries():
+    with lock:
+        items = sorted(timings.items(), key=lambda item: -item[1].total)
+        return {name: timing.summary() for name, timing in items}
+
+def dump_json(path):
+    with open(path, "w") as file:
+        json.dump(timing_summaries(), file, indent=2)
+
+def dump_chrome_trace(path):
+    with lock:
+        trace = {"traceEvents": list(events), "displayTimeUnit": "ms"}
+    with open(path, "w") as file:
+        json.dump(trace, file)
@@ -0,0 +1,538 @@
+import argparse
+from collections import deque
+import math
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from lazy import LazyModule
+from debug import debug, setup_debug, timed
+from graph import Node
+import graph_io
+from algorithm import TestAlgorithm
+from recording import Trace, NODE_COLOR, NODE_SELECTED, EDGE_COLOR, EDGE_WEIGHT
+from renderer import Renderer, weight_positions
+from runner import run_headless
+from view import ViewTransform
+
+saxutils = LazyModule("xml.sax.saxutils") # imports urllib, which is slow
+multiprocessing = LazyModule("multiprocessing") # the window imports this module, these stay off its startup path
+process_futures = LazyModule("concurrent.futures.process")
+
+# colors by name like tk knows them, tk uses the x11 colors, e.g. green is #00ff00 unlike in css
+named_colors = {"white": (255, 255, 255), "black": (0, 0, 0), "red": (255, 0, 0), "green": (0, 255, 0),
+                "blue": (0, 0, 255), "yellow": (255, 255, 0), "cyan": (0, 255, 255), "magenta": (255, 0, 255),
+                "orange": (255, 165, 0), "purple": (160, 32, 240), "pink": (255, 192, 203), "gray": (190, 190, 190),
+                "grey": (190, 190, 190), "brown": (165, 42, 42), "gold": (255, 215, 0), "navy": (0, 0, 128),
+                "violet": (238, 130, 238), "maroon": (176, 48, 96), "turquoise": (64, 224, 208),
+                "salmon": (250, 128, 114), "orchid": (218, 112, 214), "skyblue": (135, 206, 235),
+                "lightblue": (173, 216, 230), "lightgreen": (144, 238, 144), "lightgray": (211, 211, 211),
+                "lightgrey": (211, 211, 211), "lightyellow": (255, 255, 224), "darkgray": (169, 169, 169),
+                "darkgrey": (169, 169, 169), "darkgreen": (0, 100, 0), "darkblue": (0, 0, 139), "darkred": (139, 0, 0),
+                "darkorange": (255, 140, 0)}
+
+# 3x5 pixel font for labels in raster images, every digit is one row of three pixels, 4 is the left pixel
+font = {"0": "75557", "1": "26227", "2": "71747", "3": "71717", "4": "55711", "5": "74717", "6": "74757", "7": "71111",
+        "8": "75757", "9": "75717", "-": "00700", ".": "00002", ",": "00024", "(": "12221", ")": "42224", "_": "00007",
+        ":": "02020", "/": "11244", "?": "71202", " ": "00000", "A": "25755", "B": "65656", "C": "34443", "D": "65556",
+        "E": "74647", "F": "74644", "G": "34553", "H": "55755", "I": "72227", "J": "11152", "K": "55655", "L": "44447",
+        "M": "57755", "N": "65555", "O": "25552", "P": "65644", "Q": "25563", "R": "65655", "S": "34216", "T": "72222",
+        "U": "55557", "V": "55552", "W": "55775", "X": "55255", "Y": "55222", "Z": "71247"}
+font_scale = 2 # pixels per font pixel
+font_size = 12 # font size of texts in svg images
+
+
+# rgb tuple of a tk color, a name or #rgb, #rrggbb, #rrrgggbbb or #rrrrggggbbbb, None if the color is unknown
+def rgb(color):
+    if color.startswith("#") and len(color) in (4, 7, 10, 13):
+        digits = (len(color) - 1)//3
+        try:
+            return tuple(int(color[1 + i*digits:1 + (i + 1)*digits], 16)*255//(16**digits - 1) for i in range(3))
+        except ValueError:
+            return None
+    return named_colors.get(color.replace(" ", "").lower())
+
+# the color as #rrggbb, unknown colors are kept as they are, svg viewers know most names
+def hex_color(color):
+    value = rgb(color)
+    if value is None:
+        return color
+    return "#%02x%02x%02x" % value
+
+
+# what a graph looks like on a canvas of the size of view, independent of tk, so it can be drawn without a display
+# it is drawn like the renderer draws it: edges, arrows of directed edges, circles and finally labels and weights
+# colors are indices into colors, which are tk colors
+class Scene:
+    width = 0
+    height = 0
+    colors = None # tk colors the other arrays refer to
+    background = 0 # index of the background color in colors
+    detail = None # level of detail the renderer would use for this scene
+
+    line_start = None # canvas position of the start of every edge, one row per edge
+    line_end = None
+    line_colors = None
+    arrows = None # triangles of the arrows of directed edges, (tip, left, right) per arrow, drawn at the middle of the edge
+    arrow_edges = None # index of the edge of every arrow
+    centers = None # canvas position of every node
+    radii = None
+    fills = None
+    outlines = None
+    outline_widths = None
+    text_positions = None # centers of node labels and then weight labels
+    texts = None # strings of the labels
+    text_nodes = 0 # number of texts that are node labels, the other texts are edge weights
+    weight_edges = None # index of the edge of every weight label
+    text_color = 0
+
+    arrow_length = 10 # from the tip to the base of an arrow, like the default arrow shape of tk lines
+    arrow_width = 4 # half the width of the base of an arrow
+
+    # labels are the node names as strings, the other arrays have one row per node or edge, like the arrays of Graph
+    def __init__(self, view, positions, endpoints, labels, edge_directed, palette, node_colors, node_selected, edge_colors, edge_weights):
+        self.width = int(view.width)
+        self.height = int(view.height)
+        self.colors = list(palette)
+        black = self.color("black")
+        blue = self.color("blue")
+        self.background = self.color("white")
+        self.centers = view.to_canvas_array(np.array(positions, dtype=float).reshape(-1, 2))
+        endpoints = np.asarray(endpoints, dtype=np.intp).reshape(-1, 2)
+        self.line_start = self.centers[endpoints[:, 0]]
+        self.line_end = self.centers[endpoints[:, 1]]
+        self.line_colors = np.asarray(edge_colors, dtype=np.intp)
+
+        # same level of detail as on a canvas of this size
+        x1, y1, x2, y2 = view.visible_rect(Renderer.cull_margin)
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        visible_nodes = int(((positions[:, 0] >= x1) & (positions[:, 0] <= x2) & (positions[:, 1] >= y1) & (positions[:, 1] <= y2)).sum())
+        detail = self.detail = Renderer.detail_for(view, visible_nodes, len(endpoints))
+
+        selected = np.asarray(node_selected, dtype=bool)
+        self.radii = np.full(len(self.centers), Node.radius if detail.point_radius is None else detail.point_radius, dtype=float)
+        self.fills = np.asarray(node_colors, dtype=np.intp)
+        self.outlines = np.where(selected, blue, black)
+        self.outline_widths = np.where(selected, 3, 0 if detail.point_radius is not None else 1)
+
+        directed = np.flatnonzero(np.asarray(edge_directed, dtype=bool))
+        self.arrow_edges = directed
+        tips = (self.line_start[directed] + self.line_end[directed])/2
+        vector = self.line_end[directed] - self.line_start[directed]
+        length = np.hypot(vector[:, 0], vector[:, 1])[:, np.newaxis]
+        direction = np.divide(vector, length, out=np.zeros_like(vector), where=length > 0)
+        normal = np.column_stack((-direction[:, 1], direction[:, 0]))
+        base = tips - direction*self.arrow_length
+        self.arrows = np.stack((tips, base + normal*self.arrow_width, base - normal*self.arrow_width), axis=1)
+
+        self.texts = []
+        text_positions = []
+        if detail.show_labels:
+            self.texts.extend(str(label) for label in labels)
+            text_positions.append(self.centers)
+        self.text_nodes = len(self.texts)
+        weights = np.asarray(edge_weights, dtype=float)
+        self.weight_edges = np.flatnonzero(~np.isnan(weights)) if detail.show_weights else np.zeros(0, dtype=np.intp)
+        self.texts.extend(format_weight(weight) for weight in weights[self.weight_edges].tolist())
+        text_positions.append(weight_positions(self.line_start[self.weight_edges], self.line_end[self.weight_edges], Renderer.weight_offset))
+        self.text_positions = np.vstack(text_positions)
+        self.text_color = black
+
+    # scene of the current state of graph as it would be drawn with view
+    @staticmethod
+    def of_graph(graph, view):
+        n = graph.node_count
+        m = graph.edge_count
+        return Scene(view, graph.node_positions(), graph.edge_node_indices(), [str(name) for name in graph.names], graph.edge_directed[:m],
+                     graph.palette, graph.node_colors[:n], graph.node_selected[:n], graph.edge_colors[:m], graph.edge_weights[:m])
+
+    # index of color in colors, it is added if it is not used yet
+    def color(self, color):
+        if color not in self.colors:
+            self.colors.append(color)
+        return self.colors.index(color)
+
+    # writes the scene as svg or png, chosen by the extension of path
+    def save(self, path):
+        if path.lower().endswith(".svg"):
+            with open(path, "w") as file:
+                file.write(self.svg())
+        else:
+            write_png(self.rasterize(), path)
+
+    # svg elements drawing the scene, with ids if ids is True, so they can be animated
+    # node circles get the id n<index>, edges e<index>, arrows a<index> and weight labels w<index>
+    def svg_elements(self, ids=False):
+        colors = [hex_color(color) for color in self.colors]
+        elements = ['<rect width="%d" height="%d" fill="%s"/>' % (self.width, self.height, colors[self.background])]
+        for index, (start, end, color) in enumerate(zip(self.line_start.tolist(), self.line_end.tolist(), self.line_colors.tolist())):
+            element_id = ' id="e%d"' % index if ids else ""
+            elements.append('<line%s x1="%.1f" y1="%.1f" x2="%.1f" y2="%.1f" stroke="%s"/>' % (element_id, *start, *end, colors[color]))
+        for edge, triangle in zip(self.arrow_edges.tolist(), self.arrows.tolist()):
+            element_id = ' id="a%d"' % edge if ids else ""
+            points = " ".join("%.1f,%.1f" % tuple(point) for point in triangle)
+            elements.append('<polygon%s points="%s" fill="%s"/>' % (element_id, points, colors[self.line_colors[edge]]))
+        for index, (center, radius, fill, outline, width) in enumerate(zip(self.centers.tolist(), self.radii.tolist(), self.fills.tolist(),
+                                                                           self.outlines.tolist(), self.outline_widths.tolist())):
+            element_id = ' id="n%d"' % index if ids else ""
+            elements.append('<circle%s cx="%.1f" cy="%.1f" r="%.1f" fill="%s" stroke="%s" stroke-width="%d"/>'
+                            % (element_id, *center, radius, colors[fill], colors[outline], width))
+        for index, (position, text) in enumerate(zip(self.text_positions.tolist(), self.texts)):
+            element_id = ' id="w%d"' % self.weight_edges[index - self.text_nodes] if ids and index >= self.text_nodes else ""
+            elements.append('<text%s x="%.1f" y="%.1f">%s</text>' % (element_id, *position, saxutils.escape(text)))
+        return elements
+
+    def svg(self):
+        return svg_document(self.width, self.height, self.svg_elements())
+
+    # draws the scene into an array of shape (height, width, 3)
+    # everything is drawn as indices into colors on an image with a margin, so circles near the border need no clipping
+    @timed("export/rasterize")
+    def rasterize(self):
+        extent = int(math.ceil(self.radii.max(initial=0)))
+        margin = 2*extent + 2
+        image = np.full((self.height + 2*margin, self.width + 2*margin), self.background,
+                        dtype=np.uint8 if len(self.colors) <= 256 else np.uint16)
+        draw_lines(image, self.line_start + margin, self.line_end + margin, self.line_colors)
+        for edge, triangle in zip(self.arrow_edges.tolist(), self.arrows + margin):
+            fill_triangle(image, triangle, self.line_colors[edge])
+        centers = np.rint(self.centers).astype(np.intp)
+        near = ((centers[:, 0] > -extent - 1) & (centers[:, 0] < self.width + extent + 1)
+                & (centers[:, 1] > -extent - 1) & (centers[:, 1] < self.height + extent + 1))
+        fill_circles(image, centers[near] + margin, self.radii[near], self.fills[near], self.outlines[near], self.outline_widths[near])
+        for position, text in zip((self.text_positions + margin).tolist(), self.texts):
+            draw_text(image, position, text, self.text_color)
+        colors = np.array([rgb(color) or (128, 128, 128) for color in self.colors], dtype=np.uint8)
+        return colors[image[margin:margin + self.height, margin:margin + self.width]]
+
+
+# weights like Edge.weight shows them, integral weights without a decimal point
+def format_weight(weight):
+    if weight.is_integer():
+        return str(int(weight))
+    return str(weight)
+
+def svg_document(width, height, elements):
+    return ('<svg xmlns="http://www.w3.org/2000/svg" width="%d" height="%d" viewBox="0 0 %d %d">\n' % (width, height, width, height)
+            + '<style>text { font: %dpx sans-serif; text-anchor: middle; dominant-baseline: central; }</style>\n' % font_size
+            + "\n".join(elements) + "\n</svg>\n")
+
+
+# draws one pixel wide lines, all lines are sampled at once with a sample per pixel along their longer axis
+# lines are sampled at most max_samples times, samples outside of the image are dropped
+def draw_lines(pixels, start, end, colors, max_samples=4096):
+    if len(start) == 0:
+        return
+    height, width = pixels.shape[:2]
+    delta = end - start
+    counts = np.clip(np.ceil(np.abs(delta).max(axis=1)), 1, max_samples).astype(np.intp) + 1
+    lines = np.repeat(np.arange(len(start)), counts)
+    first = np.repeat(np.cumsum(counts) - counts, counts)
+    t = ((np.arange(len(lines)) - first)/np.repeat(counts - 1, counts))[:, np.newaxis]
+    points = np.rint(start[lines] + t*delta[lines]).astype(np.intp)
+    inside = (points[:, 0] >= 0) & (points[:, 0] < width) & (points[:, 1] >= 0) & (points[:, 1] < height)
+    pixels[points[inside, 1], points[inside, 0]] = colors[lines[inside]]
+
+# the part of the image covered by the box from (x1, y1) to (x2, y2), as slices and the pixel centers in it
+def clip_box(pixels, x1, y1, x2, y2):
+    height, width = pixels.shape[:2]
+    left, top = max(int(math.floor(x1)), 0), max(int(math.floor(y1)), 0)
+    right, bottom = min(int(math.ceil(x2)) + 1, width), min(int(math.ceil(y2)) + 1, height)
+    if left >= right or top >= bottom:
+        return None
+    ys, xs = np.mgrid[top:bottom, left:right]
+    return (slice(top, bottom), slice(left, right)), xs + 0.5, ys + 0.5
+
+# draws circles with an outline of the given width into an image of color indices
+# circles of the same radius and outline width are drawn at once with a stencil of the pixels a circle covers
+# centers are whole pixels and the stencils have to fit into the image
+def fill_circles(image, centers, radii, fills, outlines, widths):
+    flat = image.reshape(-1)
+    shapes = np.column_stack((radii, widths))
+    for radius, outline_width in np.unique(shapes, axis=0).tolist():
+        group = np.flatnonzero((shapes[:, 0] == radius) & (shapes[:, 1] == outline_width))
+        extent = int(math.ceil(radius))
+        ys, xs = np.mgrid[-extent:extent + 1, -extent:extent + 1]
+        distance = np.hypot(xs, ys)
+        stencil = distance <= radius
+        ring = (distance > radius - outline_width)[stencil]
+        pixels = (centers[group, 1]*image.shape[1] + centers[group, 0])[:, np.newaxis] + (ys*image.shape[1] + xs)[stencil]
+        flat[pixels] = np.where(ring, outlines[group][:, np.newaxis], fills[group][:, np.newaxis])
+
+def fill_triangle(pixels, triangle, color):
+    (x1, y1), (x2, y2), (x3, y3) = triangle.tolist()
+    box = clip_box(pixels, min(x1, x2, x3), min(y1, y2, y3), max(x1, x2, x3), max(y1, y2, y3))
+    if box is None:
+        return
+    area, xs, ys = box
+    # a point is inside if it is on the same side of all three edges
+    sides = [(xs - ax)*(by - ay) - (ys - ay)*(bx - ax) for (ax, ay), (bx, by) in (((x1, y1), (x2, y2)), ((x2, y2), (x3, y3)), ((x3, y3), (x1, y1)))]
+    inside = ((sides[0] >= 0) & (sides[1] >= 0) & (sides[2] >= 0)) | ((sides[0] <= 0) & (sides[1] <= 0) & (sides[2] <= 0))
+    pixels[area][inside] = color
+
+# draws text centered at position with the pixel font, characters it does not have are drawn as ?
+def draw_text(pixels, position, text, color):
+    text = text.upper()
+    glyph_width = 4*font_scale # three pixels and a space
+    x = int(round(position[0] - (len(text)*glyph_width - font_scale)/2))
+    y = int(round(position[1] - 5*font_scale/2))
+    for character in text:
+        rows = font.get(character, font["?"])
+        for row, bits in enumerate(rows):
+            for column in range(3):
+                if int(bits) & (4 >> column):
+                    px, py = x + column*font_scale, y + row*font_scale
+                    pixels[max(py, 0):max(py + font_scale, 0), max(px, 0):max(px + font_scale, 0)] = color
+        x += glyph_width
+
+# writes an array of shape (height, width, 3) as an rgb png
+def write_png(pixels, path, level=3):
+    height, width = pixels.shape[:2]
+    rows = np.zeros((height, width*3 + 1), dtype=np.uint8) # every row starts with filter type 0
+    rows[:, 1:] = pixels.reshape(height, width*3)
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    with open(path, "wb") as file:
+        file.write(b"\x89PNG\r\n\x1a\n")
+        file.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        file.write(chunk(b"IDAT", zlib.compress(rows.tobytes(), level)))
+        file.write(chunk(b"IEND", b""))
+
+# shrinks an image by an integer factor, every pixel becomes the mean of a factor by factor block
+def downsample(pixels, factor):
+    if factor == 1:
+        return pixels
+    height, width = pixels.shape[0]//factor*factor, pixels.shape[1]//factor*factor
+    blocks = pixels[:height, :width].reshape(height//factor, factor, width//factor, factor, 3)
+    return blocks.mean(axis=(1, 3)).astype(np.uint8)
+
+
+# the parts of a scene that do not change while a trace is replayed, set once in every worker process
+frame_geometry = None
+
+def init_frame_worker(geometry):
+    global frame_geometry
+    frame_geometry = geometry
+
+# renders frames in a worker, states are (node colors, node selected, edge colors, edge weights) for every frame
+# every frame is written to its path, or returned as an image shrunk by factor if paths is None
+def render_frames(states, palette, paths=None, factor=1):
+    view, positions, endpoints, labels, edge_directed = frame_geometry
+    images = []
+    for index, (node_colors, node_selected, edge_colors, edge_weights) in enumerate(states):
+        scene = Scene(view, positions, endpoints, labels, edge_directed, palette, node_colors, node_selected, edge_colors, edge_weights)
+        if paths is None:
+            images.append(downsample(scene.rasterize(), factor))
+        else:
+            scene.save(paths[index])
+    return images
+
+
+# renders the steps of a recorded run in worker processes
+# the trace is replayed in this process, the workers get the colors, selections and weights of every frame
+class FrameExporter:
+    trace = None
+    view = None
+    max_workers = None # number of worker processes, frames are rendered in this process if it is 1
+    chunk_size = 32 # frames per task of a worker
+
+    def __init__(self, trace, view, max_workers=None):
+        self.trace = trace
+        self.view = view
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def geometry(self):
+        graph = self.trace.graph
+        return (self.view, graph.node_positions().copy(), graph.edge_node_indices().copy(), [str(name) for name in graph.names],
+                graph.edge_directed[:graph.edge_count].copy())
+
+    # replays the trace to every step in steps, yields the arguments of render_frames() for chunks of the steps
+    def chunks(self, steps, paths, factor):
+        graph = self.trace.graph
+        for offset in range(0, len(steps), self.chunk_size):
+            states = []
+            for step in steps[offset:offset + self.chunk_size]:
+                self.trace.seek(step)
+                n = graph.node_count
+                m = graph.edge_count
+                states.append((graph.node_colors[:n].copy(), graph.node_selected[:n].copy(),
+                               graph.edge_colors[:m].copy(), graph.edge_weights[:m].copy()))
+            yield states, list(graph.palette), None if paths is None else paths[offset:offset + self.chunk_size], factor
+
+    # renders the steps in order, writes them to paths or returns them as images shrunk by factor if paths is None
+    # the trace is back at its position afterwards
+    @timed("export/frames")
+    def render(self, steps, paths=None, factor=1):
+        position = self.trace.position
+        images = []
+        try:
+            if self.max_workers == 1 or len(steps) <= self.chunk_size:
+                init_frame_worker(self.geometry())
+                for chunk in self.chunks(steps, paths, factor):
+                    images.extend(render_frames(*chunk))
+                return images
+            debug("Rendering %s frames in %s processes", len(steps), self.max_workers)
+            context = multiprocessing.get_context("spawn") # like the property evaluator, forking a process with threads is unsafe
+            with process_futures.ProcessPoolExecutor(self.max_workers, mp_context=context, initializer=init_frame_worker,
+                                                     initargs=(self.geometry(),)) as executor:
+                pending = deque() # replaying is faster than rendering, the number of chunks in flight is bounded to bound memory
+                for chunk in self.chunks(steps, paths, factor):
+                    pending.append(executor.submit(render_frames, *chunk))
+                    if len(pending) > 2*self.max_workers:
+                        images.extend(pending.popleft().result())
+                while pending:
+                    images.extend(pending.popleft().result())
+            return images
+        finally:
+            self.trace.seek(position)
+
+
+# writes every step of the trace, or the given steps, as frame_<step>.png or .svg into directory, returns the paths
+def export_frames(trace, view, directory, extension=".png", steps=None, max_workers=None):
+    steps = list(range(trace.length() + 1)) if steps is None else list(steps)
+    os.makedirs(directory, exist_ok=True)
+    digits = len(str(max(steps, default=0)))
+    paths = [os.path.join(directory, "frame_%0*d%s" % (digits, step, extension)) for step in steps]
+    FrameExporter(trace, view, max_workers).render(steps, paths)
+    debug("Exported %s frames to %s", len(paths), directory)
+    return paths
+
+# steps shown in a contact sheet of at most count frames, evenly spread over the run including the first and last step
+def sheet_steps(trace, count):
+    return sorted(set(np.linspace(0, trace.length(), min(count, trace.length() + 1)).round().astype(int).tolist()))
+
+# writes an overview of the run as a grid of frames, each frame shrunk by factor and captioned with its step
+# svg sheets are made of the scenes themselves, png sheets are rendered in worker processes
+def export_contact_sheet(trace, view, path, count=64, columns=8, factor=4, max_workers=None):
+    steps = sheet_steps(trace, count)
+    width, height = int(view.width)//factor, int(view.height)//factor
+    caption = 14
+    rows = (len(steps) + columns - 1)//columns
+    sheet_width, sheet_height = columns*(width + 1) + 1, rows*(height + caption + 1) + 1
+    if path.lower().endswith(".svg"):
+        position = trace.position
+        elements = ['<rect width="%d" height="%d" fill="#808080"/>' % (sheet_width, sheet_height)]
+        try:
+            for index, step in enumerate(steps):
+                trace.seek(step)
+                x, y = 1 + index % columns*(width + 1), 1 + index//columns*(height + caption + 1)
+                elements.append('<rect x="%d" y="%d" width="%d" height="%d" fill="#ffffff"/>' % (x, y, width, caption))
+                elements.append('<text x="%.1f" y="%.1f">step %d</text>' % (x + width/2, y + caption/2, step))
+                elements.append('<g transform="translate(%d %d) scale(%g)">' % (x, y + caption, 1/factor))
+                elements.append('<svg width="%d" height="%d">' % (view.width, view.height)) # clips the frame
+                elements.extend(Scene.of_graph(trace.graph, view).svg_elements())
+                elements.append("</svg></g>")
+        finally:
+            trace.seek(position)
+        with open(path, "w") as file:
+            file.write(svg_document(sheet_width, sheet_height, elements))
+        return
+    images = FrameExporter(trace, view, max_workers).render(steps, factor=factor)
+    sheet = np.full((sheet_height, sheet_width, 3), 128, dtype=np.uint8)
+    for index, (step, image) in enumerate(zip(steps, images)):
+        x, y = 1 + index % columns*(width + 1), 1 + index//columns*(height + caption + 1)
+        sheet[y:y + caption, x:x + width] = 255
+        draw_text(sheet[y:y + caption, x:x + width], (width/2, caption/2), "step " + str(step), (0, 0, 0))
+        sheet[y + caption:y + caption + image.shape[0], x:x + image.shape[1]] = image
+    write_png(sheet, path)
+
+# writes the run as one animated svg that shows a step every frame_duration seconds
+# the scene of the first step is animated with set elements for every recorded change, so even long runs stay small
+@timed("export/animation")
+def export_animation(trace, view, path, frame_duration=0.1):
+    position = trace.position
+    trace.seek(0)
+    try:
+        scene = Scene.of_graph(trace.graph, view)
+    finally:
+        trace.seek(position)
+    elements = scene.svg_elements(ids=True)
+    weight_ids = set(scene.weight_edges.tolist())
+    texts = {} # maps (edge, weight text) to the id of its label, every weight an edge gets has its own label
+    for index, edge in enumerate(scene.weight_edges.tolist()):
+        texts[(edge, scene.texts[scene.text_nodes + index])] = "w%d" % edge
+    shown = {edge: "w%d" % edge for edge in weight_ids} # id of the weight label that is visible for every edge
+    start, end = scene.line_start, scene.line_end
+    directed = set(scene.arrow_edges.tolist())
+    points = scene.detail.point_radius is not None # unselected nodes drawn as points have no outline
+    animations = []
+    def set_attribute(target, attribute, value, time):
+        animations.append('<set href="#%s" attributeName="%s" to="%s" begin="%.3fs"/>' % (target, attribute, value, time))
+    for step in range(trace.length()):
+        time = (step + 1)*frame_duration
+        for entry in range(trace.offsets[step], trace.offsets[step + 1], 4):
+            attribute, index, _, new = trace.changes[entry:entry + 4]
+            value = trace.values[new]
+            if attribute == NODE_COLOR:
+                set_attribute("n%d" % index, "fill", hex_color(value), time)
+            elif attribute == NODE_SELECTED:
+                set_attribute("n%d" % index, "stroke", hex_color("blue" if value else "black"), time)
+                set_attribute("n%d" % index, "stroke-width", 3 if value else 0 if points else 1, time)
+            elif attribute == EDGE_COLOR:
+                set_attribute("e%d" % index, "stroke", hex_color(value), time)
+                if index in directed:
+                    set_attribute("a%d" % index, "fill", hex_color(value), time)
+            elif attribute == EDGE_WEIGHT and scene.detail.show_weights:
+                if index in shown:
+                    set_attribute(shown.pop(index), "visibility", "hidden", time)
+                if value is None:
+                    continue
+                text = format_weight(float(value))
+                label = texts.get((index, text))
+                if label is None:
+                    label = texts[(index, text)] = "w%d-%d" % (index, len(texts))
+                    x, y = weight_positions(start[index:index + 1], end[index:index + 1], Renderer.weight_offset)[0].tolist()
+                    elements.append('<text id="%s" x="%.1f" y="%.1f" visibility="hidden">%s</text>' % (label, x, y, saxutils.escape(text)))
+                set_attribute(label, "visibility", "visible", time)
+                shown[index] = label
+    with open(path, "w") as file:
+        file.write(svg_document(scene.width, scene.height, elements + animations))
+    debug("Exported animation of %s steps to %s", trace.length(), path)
+
+
+# exports a graph or a recorded run without a window, run from the src directory, e.g.
+# python export.py graph.gml --image graph.svg
+# python export.py graph.gml --algorithm test --frames frames --sheet sheet.png --animation run.svg
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("file", help="graph file, see graph_io.load()")
+    parser.add_argument("--image", help="write the graph as an .svg or .png image")
+    parser.add_argument("--algorithm", choices=["test"], help="run this algorithm and export its steps")
+    parser.add_argument("--trace", help="export the steps of a trace saved for this graph instead of running an algorithm")
+    parser.add_argument("--max-steps", type=int, help="stop the algorithm after this many steps")
+    parser.add_argument("--frames", metavar="DIRECTORY", help="write every step as an image into this directory")
+    parser.add_argument("--format", choices=["png", "svg"], default="png", help="image format of the frames")
+    parser.add_argument("--sheet", help="write a contact sheet of the run as an .svg or .png image")
+    parser.add_argument("--animation", help="write the run as an animated .svg image")
+    parser.add_argument("--frame-duration", type=float, default=0.1, help="seconds per step in the animation")
+    parser.add_argument("--size", type=int, nargs=2, default=(800, 600), metavar=("WIDTH", "HEIGHT"), help="image size in pixels")
+    parser.add_argument("--workers", type=int, help="number of processes rendering frames")
+    args = setup_debug(parser)
+
+    graph = graph_io.load(args.file)
+    view = ViewTransform(*args.size)
+    if args.image is not None:
+        Scene.of_graph(graph, view).save(args.image)
+    trace = None
+    if args.trace is not None:
+        trace = Trace.load(args.trace, graph)
+    elif args.algorithm is not None:
+        algorithm = TestAlgorithm()
+        run_headless(algorithm, graph, max_steps=args.max_steps, record=True)
+        trace = algorithm.trace
+    if trace is None:
+        if args.frames or args.sheet or args.animation:
+            parser.error("--frames, --sheet and --animation need a run, use --algorithm or --trace")
+        return
+    if args.frames is not None:
+        export_frames(trace, view, args.frames, "." + args.format, max_workers=args.workers)
+    if args.sheet is not None:
+        export_contact_sheet(trace, view, args.sheet, max_workers=args.workers)
+    if args.animation is not None:
+        export_animation(trace, view, args.animation, args.frame_duration)
+
+
+if __name__ == "__main__":
+    main()
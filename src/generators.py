@@ -0,0 +1,113 @@
+import math
+
+import numpy as np
+
+
+# describes a graph of a standard family by its size and a function that produces its edges in chunks
+# the nodes are named 0 to node_count - 1 and the edges are the same as those of the networkx generator of the family
+# the sizes are known before any edge is produced, so very large requests can be recognized before they are built
+class GraphGenerator:
+    title = ""
+    node_count = 0
+    edge_count = 0
+    chunks = None # function that yields arrays of node index pairs, one row per edge, edge_count rows in total
+    positions = None # function that returns the positions of the nodes, None for the default layout
+
+    chunk_size = 100_000 # number of edges produced at a time
+    # estimated memory per node and edge of the arrays of the graph, its properties and its canvas items
+    node_bytes = 70 + 125 + 400
+    edge_bytes = 45 + 400
+
+    def __init__(self, title, node_count, edge_count, chunks, positions=None):
+        self.title = title
+        self.node_count = node_count
+        self.edge_count = edge_count
+        self.chunks = chunks
+        self.positions = positions
+
+    def estimated_bytes(self):
+        return self.node_count*self.node_bytes + self.edge_count*self.edge_bytes
+
+    # all edges in one array, progress(edges) is called after every chunk with the number of edges produced so far
+    # returns None if cancelled() becomes true, it is checked between chunks
+    def endpoints(self, progress=None, cancelled=None):
+        endpoints = np.empty((self.edge_count, 2), dtype=np.intp)
+        filled = 0
+        for chunk in self.chunks():
+            if cancelled is not None and cancelled():
+                return None
+            endpoints[filled:filled + len(chunk)] = chunk
+            filled += len(chunk)
+            if progress is not None:
+                progress(filled)
+        return endpoints
+
+
+# edges given by a function of their index, computed for chunk_size indices at a time
+def indexed_chunks(count, edge):
+    def chunks():
+        for start in range(0, count, GraphGenerator.chunk_size):
+            yield edge(np.arange(start, min(start + GraphGenerator.chunk_size, count)))
+    return chunks
+
+
+# edges from every row node to the given columns of the row, rows are taken in blocks of about chunk_size edges
+# columns(rows) returns the row of every edge and the column of every edge
+def row_chunks(row_count, row_length, columns):
+    def chunks():
+        step = max(1, GraphGenerator.chunk_size//max(row_length, 1))
+        for start in range(0, row_count, step):
+            yield np.column_stack(columns(np.arange(start, min(start + step, row_count))))
+    return chunks
+
+
+def null_graph():
+    return GraphGenerator("Null Graph", 0, 0, indexed_chunks(0, None))
+
+def trivial_graph():
+    return GraphGenerator("Trivial Graph", 1, 0, indexed_chunks(0, None))
+
+def empty_graph(n):
+    return GraphGenerator("Empty Graph %d" % n, n, 0, indexed_chunks(0, None))
+
+# the nodes are placed on a circle, the usual drawing of a complete graph, which also saves computing a layout
+def complete_graph(n):
+    def columns(rows):
+        counts = n - 1 - rows
+        first = np.repeat(rows, counts)
+        starts = np.repeat(np.cumsum(counts) - counts, counts)
+        return first, np.arange(len(first)) - starts + first + 1
+    def positions():
+        if n <= 1:
+            return np.zeros((n, 2))
+        angles = 2*math.pi*np.arange(n)/n
+        return np.column_stack((np.cos(angles), np.sin(angles)))
+    return GraphGenerator("K%d" % n, n, n*(n - 1)//2, row_chunks(n, n, columns), positions)
+
+def complete_bipartite_graph(n1, n2):
+    def columns(rows):
+        return np.repeat(rows, n2), n1 + np.tile(np.arange(n2), len(rows))
+    return GraphGenerator("K%d,%d" % (n1, n2), n1 + n2, n1*n2, row_chunks(n1, n2, columns))
+
+# a single node has a self loop and two nodes have one edge, like in networkx
+def cycle_graph(n):
+    count = n if n != 2 else 1
+    return GraphGenerator("C%d" % n, n, count, indexed_chunks(count, lambda edges: np.column_stack((edges, (edges + 1) % n))))
+
+def path_graph(n):
+    count = max(n - 1, 0)
+    return GraphGenerator("P%d" % n, n, count, indexed_chunks(count, lambda edges: np.column_stack((edges, edges + 1))))
+
+# n leaves around node 0
+def star_graph(n):
+    return GraphGenerator("S%d" % n, n + 1, n, indexed_chunks(n, lambda edges: np.column_stack((np.zeros_like(edges), edges + 1))))
+
+# node i > 0 is a child of node (i - 1)//r, the nodes are numbered in breadth first order
+def full_rary_tree(r, n, title=None):
+    count = max(n - 1, 0)
+    return GraphGenerator(title or "%d-ary Tree %d" % (r, n), n, count,
+                          indexed_chunks(count, lambda edges: np.column_stack((edges//r, edges + 1))))
+
+def balanced_tree(r, h):
+    n = h + 1 if r == 1 else (r**(h + 1) - 1)//(r - 1)
+    return full_rary_tree(r, n, "Balanced Tree %d, %d" % (r, h))
@@ -1,250 +1,679 @@
-import networkx as nx # graph library
 import math
-from debug import debug
+
+import numpy as np
+from lazy import LazyModule
+from debug import debug, span, timed
+from properties import PropertyTracker
+from spatial import SpatialGrid
+import layout
+import generators
+from layout_cache import LayoutCache
+from recording import NODE_COLOR, NODE_SELECTED, EDGE_COLOR, EDGE_WEIGHT
+
+nx = LazyModule("networkx") # graph library, imported on first use so it stays off the startup path
 
 # represents a graph including its layout
+# the structure and all attributes of nodes and edges are stored in arrays, row i belongs to the node or edge with index i
+# Node and Edge objects are thin views into these arrays that are created on access
+# a networkx graph is only built when a networkx algorithm needs one, see to_networkx()
 class Graph:
-    nx_graph = None # networkx graph
-    nodes = [] # list of nodes
-    edges = [] # list of edges
-    properties = {} # properties of the graph to display in the sidebar
-
-    def __init__(self, nx_graph):
-        debug("Initializing graph: " + str(self))
-        self.nx_graph = nx_graph
-        pos = nx.spring_layout(nx_graph) # default layout
-        # nodes is a list of Node objects constructed by passing the position of the node in the layout
-        self.nodes = []
-        for node in nx_graph.nodes():
-            self.nodes.append(Node(node, pos[node][0], pos[node][1]))
-        # edges is a list of Edge objects constructed by passing the already created node objects
-        self.edges = [] 
-        for edge in nx_graph.edges():
-            self.edges.append(Edge(self.get_node(edge[0]), self.get_node(edge[1])))
-        # properties is a dictionary of properties to display in the sidebar
-        # calculating properties here can result in properties being calculated twice
-        # but not calculating them here results in properties being not initialized until the graph is drawn
-        self.calculate_properties()
+    nodes = None # sequence of Node views, nodes[i] is the node with index i
+    edges = None # sequence of Edge views, edges[i] is the edge with index i
+    directed = False # whether the graph was created from a directed networkx graph
+    _property_tracker = None # see property_tracker
+    version = 0 # incremented on every structural change, used to discard outdated property results
+    names = None # sequence of node names, names[i] is the name of the node with index i
+    _name_index = None # see name_index
+    dirty_nodes = None # nodes that changed since they were last drawn
+    dirty_edges = None # edges that changed since they were last drawn
+    _spatial = None # see spatial
+    recorder = None # receives changes of colors, selections and weights, e.g. a Trace of an algorithm run
+    node_count = 0
+    edge_count = 0
+    # node arrays, only the first node_count rows are used, see node_positions()
+    positions = None # node positions in layout coordinates
+    node_colors = None # index of the color of every node in palette
+    node_selected = None # whether the node is selected
+    # edge arrays, only the first edge_count rows are used, see edge_node_indices()
+    edge_endpoints = None # node indices of the two endpoints of every edge
+    edge_colors = None # index of the color of every edge in palette
+    edge_weights = None # weight of every edge, nan for edges without weight
+    edge_directed = None # whether the edge is directed
+    palette = None # colors used by nodes and edges, they are stored as indices into this list
+    palette_index = None # maps colors to their index in palette
+    # adjacency in compressed sparse row form, built from the edge arrays when needed
+    # the incidences of node i are neighbor_nodes[neighbor_offsets[i]:neighbor_offsets[i + 1]], sorted by neighbor
+    neighbor_offsets = None
+    neighbor_nodes = None # the node at the other end of the incidence
+    neighbor_edges = None # the edge of the incidence
+    indexed_edges = 0 # number of edges covered by the compressed adjacency
+    recent_edges = None # maps (node index, neighbor index) to the edge index for edges added after the last build
+    recent_incidence = None # maps node indices to the edges added after the last build that they are an endpoint of
+    large_layout_threshold = 1000 # number of nodes above which the barnes-hut layout is used instead of networkx
+    layout_cache = LayoutCache() # layouts of graphs that were laid out before, None to always compute them
+    # estimated memory of the derived data per node, see derived_bytes
+    name_index_bytes = 60
+    spatial_bytes = 270
+
+    # pos is a dict of {name: (x, y)}, the default layout is computed if it is None
+    @timed("graph/init")
+    def __init__(self, nx_graph, pos=None):
+        if pos is None:
+            pos = Graph.default_layout(nx_graph)
+        names = list(nx_graph.nodes())
+        name_index = {name: index for index, name in enumerate(names)}
+        endpoints = np.array([(name_index[u], name_index[v]) for u, v in nx_graph.edges()], dtype=np.intp).reshape(-1, 2)
+        positions = np.array([pos[name] for name in names], dtype=float).reshape(-1, 2)
+        self.set_arrays(names, endpoints, nx_graph.is_directed(), positions, name_index=name_index)
+
+    # creates a graph directly from arrays without building a networkx graph, e.g. when reading a file
+    # names is a sequence of node names and endpoints an array of node index pairs, one row per edge
+    # the other arguments are optional arrays with one row per node or edge, see set_arrays()
+    @staticmethod
+    def from_arrays(names, endpoints, directed=False, positions=None, **arrays):
+        graph = Graph.__new__(Graph)
+        graph.set_arrays(names, endpoints, directed, positions, **arrays)
+        return graph
+
+    # takes the arrays over without copying them, so they can be memory mapped, they are copied once the graph grows
+    # node_colors and edge_colors index into palette, adjacency is (neighbor_offsets, neighbor_nodes, neighbor_edges)
+    # name_index is built from names on first use if it is not given
+    @timed("graph/set arrays")
+    def set_arrays(self, names, endpoints, directed, positions=None, node_colors=None, node_selected=None,
+                   edge_colors=None, edge_weights=None, edge_directed=None, palette=None, adjacency=None, name_index=None):
+        debug("Initializing graph: %s", self)
+        self.directed = directed
+        self.nodes = ViewList(self, Node)
+        self.edges = ViewList(self, Edge)
+        self.dirty_nodes = set()
+        self.dirty_edges = set()
+        self.palette = []
+        self.palette_index = {}
+        for color in palette or ():
+            self.color_index(color)
+        self.names = names
+        self._name_index = name_index
+        self.node_count = len(names)
+        self.edge_count = len(endpoints)
+        node_rows = len(positions) if positions is not None else self.node_count
+        edge_rows = len(endpoints)
+        self.node_colors = node_colors if node_colors is not None else np.full(node_rows, self.color_index("white"), dtype=np.int32)
+        self.node_selected = node_selected if node_selected is not None else np.zeros(node_rows, dtype=bool)
+        self.edge_endpoints = endpoints
+        self.edge_colors = edge_colors if edge_colors is not None else np.full(edge_rows, self.color_index("black"), dtype=np.int32)
+        self.edge_weights = edge_weights if edge_weights is not None else np.full(edge_rows, np.nan)
+        self.edge_directed = edge_directed if edge_directed is not None else np.full(edge_rows, directed)
+        if adjacency is not None:
+            self.neighbor_offsets, self.neighbor_nodes, self.neighbor_edges = adjacency
+            self.indexed_edges = self.edge_count
+            self.recent_edges = {}
+            self.recent_incidence = {}
+        else:
+            self.index_edges()
+        if positions is None:
+            self.positions = np.zeros((node_rows, 2))
+            if self.node_count:
+                self.set_position_array(self.default_positions())
+        else:
+            self.positions = positions
+
+    # the indices below are built on first use, so a graph from a memory mapped file opens in constant time
+
+    # maps node names to node indices
+    @property
+    def name_index(self):
+        if self._name_index is None:
+            self._name_index = {name: index for index, name in enumerate(self.names)}
+        return self._name_index
+
+    # grid over node positions for hit testing
+    @property
+    def spatial(self):
+        if self._spatial is None:
+            self._spatial = SpatialGrid(self.nodes)
+        return self._spatial
+
+    # keeps properties up to date incrementally, it calculates them once when it is created
+    @property
+    def property_tracker(self):
+        if self._property_tracker is None:
+            self._property_tracker = PropertyTracker(self)
+        return self._property_tracker
+
+    # takes over a property tracker that was calculated in the background for the given version of the graph
+    # it is dropped if the graph was changed since then or got a tracker of its own, returns whether it was taken over
+    def adopt_property_tracker(self, tracker, version):
+        if self._property_tracker is not None or self.version != version:
+            return False
+        self._property_tracker = tracker
+        return True
+
+    # whether the properties were calculated already, accessing them calculates them otherwise
+    def has_property_tracker(self):
+        return self._property_tracker is not None
+
+    # estimated memory of the arrays that hold the structure and the attributes of nodes and edges
+    def structure_bytes(self):
+        arrays = (self.positions, self.node_colors, self.node_selected, self.edge_endpoints, self.edge_colors,
+                  self.edge_weights, self.edge_directed, self.neighbor_offsets, self.neighbor_nodes, self.neighbor_edges)
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    # estimated memory of the indices and properties that are rebuilt on first use, see drop_derived
+    def derived_bytes(self):
+        size = 0
+        if self._name_index is not None:
+            size += len(self._name_index)*self.name_index_bytes
+        if self._spatial is not None:
+            size += self.node_count*self.spatial_bytes
+        if self._property_tracker is not None:
+            size += self._property_tracker.estimated_bytes()
+        return size
+
+    # frees the derived data, e.g. of a graph in an inactive tab, it is rebuilt when it is needed again
+    # the properties are calculated again from scratch, results of pending evaluations are discarded
+    def drop_derived(self):
+        debug("Dropping derived data of graph: %s", self)
+        self._name_index = None
+        self._spatial = None
+        self._property_tracker = None
+        self.version += 1
+
+    # properties of the graph to display in the sidebar
+    @property
+    def properties(self):
+        return self.property_tracker.values
+
+    # builds a networkx graph with the current structure, it is not updated when the graph changes
+    def to_networkx(self):
+        nx_graph = nx.DiGraph() if self.directed else nx.Graph()
+        names = list(self.names) # decodes names from a file only once
+        nx_graph.add_nodes_from(names)
+        nx_graph.add_edges_from((names[u], names[v]) for u, v in self.edge_node_indices().tolist())
+        return nx_graph
+
+    # names of the endpoints of all edges
+    def edge_names(self):
+        names = list(self.names)
+        return [(names[u], names[v]) for u, v in self.edge_node_indices().tolist()]
+
+    def color_index(self, color):
+        index = self.palette_index.get(color)
+        if index is None:
+            index = len(self.palette)
+            self.palette.append(color)
+            self.palette_index[color] = index
+        return index
 
     def get_node(self, name):
-        for node in self.nodes:
-            if node.name == name:
-                return node
-        return None
+        index = self.name_index.get(name)
+        if index is None:
+            return None
+        return Node(self, index)
     
+    # the tracker is fetched before the node is added, a tracker created on first use would count the new node already
+    # names read from a file can be numbers too, so the default name is the first unused one from node_count on
     def add_node(self, x, y, name=None):
+        tracker = self.property_tracker
         if name is None:
-            name = str(len(self.nx_graph.nodes()))
-        self.nx_graph.add_node(name)
-        self.nodes.append(Node(name, x, y))
+            number = self.node_count
+            while str(number) in self.name_index:
+                number += 1
+            name = str(number)
+        index = self.node_count
+        if index == len(self.positions):
+            self.positions = grow(self.positions)
+            self.node_colors = grow(self.node_colors)
+            self.node_selected = grow(self.node_selected)
+        self.positions[index] = (x, y)
+        self.node_colors[index] = self.color_index("white")
+        self.node_selected[index] = False
+        if not isinstance(self.names, list): # names read from a file are immutable
+            self.names = list(self.names)
+        self.names.append(name)
+        self.name_index[name] = index
+        self.node_count += 1
+        node = Node(self, index)
+        self.spatial.insert(node)
+        self.dirty_nodes.add(node)
+        self.version += 1
+        tracker.node_added(name)
+        return node
     
     def get_edge(self, node1, node2):
-        for edge in self.edges: # get edge between node1 and node2 or node2 and node1 if undirected
-            if (edge.node1 == node1 and edge.node2 == node2) or (edge.node1 == node2 and edge.node2 == node1 and not edge.directed):
-                return edge
-        return None
+        index = self.edge_index(node1.index, node2.index)
+        if index is None:
+            return None
+        return Edge(self, index)
     
     def has_edge(self, node1, node2):
-        return self.get_edge(node1, node2) is not None
+        return self.edge_index(node1.index, node2.index) is not None
+
+    # index of the edge from node index1 to node index2, undirected edges are found in both directions
+    def edge_index(self, index1, index2):
+        index = self.recent_edges.get((index1, index2))
+        if index is not None:
+            return index
+        if index1 + 1 >= len(self.neighbor_offsets):
+            return None # node was added after the last build
+        start, end = self.neighbor_offsets[index1], self.neighbor_offsets[index1 + 1]
+        neighbors = self.neighbor_nodes[start:end]
+        first = start + int(np.searchsorted(neighbors, index2, side="left"))
+        last = start + int(np.searchsorted(neighbors, index2, side="right"))
+        for edge in self.neighbor_edges[first:last].tolist():
+            if not self.edge_directed[edge] or self.edge_endpoints[edge, 0] == index1:
+                return edge
+        return None
     
     def add_edge(self, node1, node2, weight=None, color="black", directed=False):
-        self.nx_graph.add_edge(node1.name, node2.name)
-        self.edges.append(Edge(node1, node2, weight, color, directed))
+        existing = self.get_edge(node1, node2)
+        if existing is not None: # networkx does not store parallel edges either
+            return existing
+        tracker = self.property_tracker # fetched before the edge is added, see add_node
+        index = self.edge_count
+        if index == len(self.edge_endpoints):
+            self.edge_endpoints = grow(self.edge_endpoints)
+            self.edge_colors = grow(self.edge_colors)
+            self.edge_weights = grow(self.edge_weights)
+            self.edge_directed = grow(self.edge_directed)
+        self.edge_endpoints[index] = (node1.index, node2.index)
+        self.edge_colors[index] = self.color_index(color)
+        self.edge_weights[index] = np.nan if weight is None else weight
+        self.edge_directed[index] = directed
+        self.edge_count += 1
+        self.recent_edges[(node1.index, node2.index)] = index
+        if not directed:
+            self.recent_edges[(node2.index, node1.index)] = index
+        self.recent_incidence.setdefault(node1.index, []).append(index)
+        if node2.index != node1.index:
+            self.recent_incidence.setdefault(node2.index, []).append(index)
+        # rebuilding the compressed adjacency is O(E log E), so it is only done once enough edges were added
+        if self.edge_count - self.indexed_edges > max(1024, math.isqrt(self.edge_count)):
+            self.index_edges()
+        edge = Edge(self, index)
+        self.dirty_edges.add(edge)
+        self.version += 1
+        tracker.edge_added(node1.name, node2.name)
+        return edge
+
+    # builds the compressed adjacency of all edges, every edge is an incidence of both of its endpoints
+    def index_edges(self):
+        endpoints = self.edge_node_indices()
+        loops = endpoints[:, 0] == endpoints[:, 1]
+        edges = np.arange(self.edge_count)
+        sources = np.concatenate((endpoints[:, 0], endpoints[~loops, 1])) # a self loop is one incidence
+        targets = np.concatenate((endpoints[:, 1], endpoints[~loops, 0]))
+        incident = np.concatenate((edges, edges[~loops]))
+        order = np.lexsort((targets, sources))
+        self.neighbor_nodes = targets[order].astype(np.int32) # half the memory of intp, graphs have less than 2**31 nodes
+        self.neighbor_edges = incident[order].astype(np.int32)
+        self.neighbor_offsets = np.concatenate(([0], np.cumsum(np.bincount(sources, minlength=self.node_count))))
+        self.indexed_edges = self.edge_count
+        self.recent_edges = {}
+        self.recent_incidence = {}
+
+    # edges that node is an endpoint of
+    def incident_edges(self, node):
+        index = node.index
+        edges = self.recent_incidence.get(index, [])
+        if index + 1 < len(self.neighbor_offsets):
+            start, end = self.neighbor_offsets[index], self.neighbor_offsets[index + 1]
+            edges = self.neighbor_edges[start:end].tolist() + edges
+        return [Edge(self, edge) for edge in edges]
+
+    # spring layout from networkx for small graphs, large graphs use the barnes-hut layout which scales to many nodes
+    @staticmethod
+    @timed("layout/default")
+    def default_layout(nx_graph):
+        if len(nx_graph) > Graph.large_layout_threshold:
+            algorithm = ("spring", "barnes-hut", layout.coarsest_size, layout.refine_iterations)
+            return Graph.cached_layout(nx_graph, algorithm, layout.spring_layout)
+        return Graph.cached_layout(nx_graph, ("spring", "networkx"), nx.spring_layout)
+
+    # default layout as an array with one row per node
+    # large graphs are laid out directly from the edge arrays, building a networkx graph of them takes longer than reading them
+    # their layouts are cached under a key computed from the arrays, so reopening them places them instantly
+    def default_positions(self):
+        if self.node_count > Graph.large_layout_threshold:
+            endpoints = self.edge_node_indices()
+            endpoints = endpoints[endpoints[:, 0] != endpoints[:, 1]]
+            def compute():
+                with span("layout/multilevel"):
+                    return layout.rescale(layout.multilevel_layout(self.node_count, endpoints, np.random.default_rng()))
+            if Graph.layout_cache is None:
+                return compute()
+            algorithm = ("spring", "multilevel", layout.coarsest_size, layout.refine_iterations)
+            return Graph.layout_cache.get_array(self.names, endpoints, self.directed, algorithm, compute)
+        pos = Graph.default_layout(self.to_networkx())
+        return np.array([pos[name] for name in self.names]).reshape(-1, 2)
+
+    # computes the layout with compute(nx_graph) unless the layout cache already has it
+    @staticmethod
+    def cached_layout(nx_graph, algorithm, compute):
+        if Graph.layout_cache is None:
+            return compute(nx_graph)
+        return Graph.layout_cache.get(nx_graph, algorithm, compute)
 
     # creates a new spring layout for this graph
     def spring_layout(self):
-        pos = nx.spring_layout(self.nx_graph)
-        for node in self.nodes:
-            node.x = pos[node.name][0]
-            node.y = pos[node.name][1]
+        pos = Graph.default_layout(self.to_networkx())
+        self.set_positions(pos)
 
     def planar_layout(self):
-        debug("Attempting to create planar layout for graph: " + str(self))
-        try:
-            pos = nx.planar_layout(self.nx_graph)
-        except nx.NetworkXException:
+        debug("Attempting to create planar layout for graph: %s", self)
+        pos = Graph.cached_layout(self.to_networkx(), ("planar", "networkx"), lambda nx_graph: self.planar_positions())
+        if pos is None:
             debug("Planar layout failed, is the graph planar?")
             return
-        for node in self.nodes:
-            node.x = pos[node.name][0]
-            node.y = pos[node.name][1]
+        self.set_positions(pos)
+
+    # positions from the planar embedding that is kept by the property tracker, None if the graph is not planar
+    def planar_positions(self):
+        embedding = self.property_tracker.planarity_result().embedding
+        if embedding is None:
+            return None
+        return nx.planar_layout(embedding)
+
+    # nodes and edges of a kuratowski subgraph, a subdivision of K5 or K3,3, or None if the graph is planar
+    def kuratowski_subgraph(self):
+        counterexample = self.property_tracker.planarity_result().counterexample
+        if counterexample is None:
+            return None
+        nodes = [self.get_node(name) for name in counterexample.nodes()]
+        edges = [self.get_edge(self.get_node(u), self.get_node(v)) for u, v in counterexample.edges()]
+        return nodes, edges
+
+    # positions of all nodes, a view into the position array, row i belongs to self.nodes[i]
+    def node_positions(self):
+        return self.positions[:self.node_count]
+
+    # endpoints of all edges as node indices, row i belongs to self.edges[i]
+    def edge_node_indices(self):
+        return self.edge_endpoints[:self.edge_count]
+
+    # moves all nodes to the positions in pos, a dict of {name: (x, y)}, and rebuilds the spatial index once
+    def set_positions(self, pos):
+        self.set_position_array(np.array([pos[name] for name in self.names]).reshape(-1, 2))
+
+    # moves all nodes to the rows of positions, e.g. intermediate results of a ProgressiveLayout
+    def set_position_array(self, positions):
+        self.node_positions()[:] = positions
+        self.dirty_nodes.update(self.nodes)
+        if self._spatial is not None: # otherwise it is built with the new positions on first use
+            self._spatial.rebuild(self.nodes)
+
+    # indices of the selected nodes, they keep their position when the layout is relaxed
+    def pinned_nodes(self):
+        return np.flatnonzero(self.node_selected[:self.node_count]).tolist()
+
+    # moves the given nodes and their neighbors a little to fit in with the rest of the layout, used after local changes
+    # only the edges of the nodes and of their neighbors are passed, so the relaxation does not touch the rest of the graph
+    def relax_around(self, nodes):
+        indices = [node.index for node in nodes]
+        edges = {edge.index for node in nodes for edge in self.incident_edges(node)}
+        neighbors = set(self.edge_endpoints[sorted(edges)].ravel().tolist()) - set(indices)
+        edges.update(edge.index for index in neighbors for edge in self.incident_edges(self.nodes[index]))
+        endpoints = self.edge_endpoints[np.array(sorted(edges), dtype=np.intp)].reshape(-1, 2)
+        moved = layout.relax_locally(self.node_positions(), endpoints, indices, self.pinned_nodes())
+        for index in moved.tolist():
+            self.nodes[index].moved()
+
+    # called by nodes when their position changes
+    def node_moved(self, node):
+        self.spatial.update(node)
+
+    # returns the node whose center is closest to (x, y) and at most radius away, in layout coordinates
+    def node_at(self, x, y, radius):
+        return self.spatial.nearest(x, y, radius)
+
+    # returns the nodes inside the rectangle spanned by (x1, y1) and (x2, y2), in layout coordinates
+    def nodes_within(self, x1, y1, x2, y2):
+        return self.spatial.within(x1, y1, x2, y2)
 
+    # recalculates all properties from scratch
+    @timed("properties/calculate")
     def calculate_properties(self):
-        debug("Calculating properties of graph: " + str(self))
-        # precalculate some properties which may be undefined
-        connected = "undefined"
-        try:
-            connected = nx.is_connected(self.nx_graph)
-        except nx.NetworkXPointlessConcept:
-            debug("Graph connectivity is undefined")
-        tree = "undefined"
-        try:
-            tree = nx.is_tree(self.nx_graph)
-        except nx.NetworkXPointlessConcept:
-            debug("Graph treeness is undefined")
-        forest = "undefined"
-        try:
-            forest = nx.is_forest(self.nx_graph)
-        except nx.NetworkXPointlessConcept:
-            debug("Graph forestness is undefined")
-        eulerian = "undefined" # eulerian describes whether a path exists that visits each edge exactly once
-        try:
-            eulerian = nx.is_eulerian(self.nx_graph)
-        except nx.NetworkXPointlessConcept:
-            debug("Graph eulerianness is undefined")
-        if len(self.nx_graph.nodes()) == 0:
-            regular = "undefined"
-        else:
-            regular = nx.is_regular(self.nx_graph)
-        self.properties = {"nodes": len(self.nx_graph.nodes()),
-                           "edges": len(self.nx_graph.edges()),
-                           "density": nx.density(self.nx_graph),
-                           "planar": nx.is_planar(self.nx_graph),
-                           "empty": nx.is_empty(self.nx_graph),
-                           "connected": connected,
-                           "directed": nx.is_directed(self.nx_graph),
-                           "bipartite": nx.is_bipartite(self.nx_graph),
-                           "tree": tree,
-                           "forest": forest,
-                           "eulerian": eulerian,
-                           "regular": regular,
-                           }
-
-    def draw(self, window):
-        debug("Drawing graph: " + str(self.nx_graph))
-        for edge in self.edges:
-            edge.draw(window)
-        for node in self.nodes:
-            node.draw(window)
-        window.update_properties()
+        debug("Calculating properties of graph: %s", self)
+        self.property_tracker.reset(self)
+
+    # recalculates only the properties that could not be kept up to date incrementally
+    @timed("properties/refresh")
+    def refresh_properties(self):
+        self.property_tracker.refresh()
+
+    # names of the properties that still have to be computed, see PropertyEvaluator for computing them asynchronously
+    def dirty_properties(self):
+        return sorted(self.property_tracker.dirty)
+
+    # evaluates the dirty properties that fit into budget seconds now
+    # returns the names of the properties that take longer than budget, they have to be evaluated in the background
+    @timed("properties/evaluate within budget")
+    def evaluate_properties(self, budget):
+        return self.property_tracker.evaluate_within(budget)
+
+    # computes a property that is only computed on request for large graphs
+    def request_property(self, name):
+        self.property_tracker.request(name)
+
+    def set_property(self, name, value):
+        self.property_tracker.set_value(name, value)
+
+    # reports a change of a recorded attribute to the recorder, if there is one
+    def record(self, attribute, index, old, new):
+        if self.recorder is not None:
+            self.recorder.record(attribute, index, old, new)
+
+    # returns and clears the nodes and edges that changed since the last call, used by the renderer
+    def take_dirty(self):
+        nodes, edges = self.dirty_nodes, self.dirty_edges
+        self.dirty_nodes = set()
+        self.dirty_edges = set()
+        return nodes, edges
+
+    # creates the graph described by a GraphGenerator, its edges are produced in chunks
+    # progress and cancelled are passed on to GraphGenerator.endpoints(), None is returned if it was cancelled
+    @staticmethod
+    def from_generator(generator, progress=None, cancelled=None):
+        endpoints = generator.endpoints(progress, cancelled)
+        if endpoints is None:
+            return None
+        positions = generator.positions() if generator.positions is not None else None
+        return Graph.from_arrays(list(range(generator.node_count)), endpoints, positions=positions)
 
     # static methods for creating new graphs
     @staticmethod
     def new_null_graph():
-        return Graph(nx.null_graph())
+        return Graph.from_generator(generators.null_graph())
     
     @staticmethod
     def new_trivial_graph():
-        return Graph(nx.trivial_graph())
+        return Graph.from_generator(generators.trivial_graph())
     
     @staticmethod
     def new_empty_graph(n):
-        return Graph(nx.empty_graph(n))
+        return Graph.from_generator(generators.empty_graph(n))
     
+    # needs neither networkx nor a spring layout, so the default graph is shown right at startup
     @staticmethod
     def new_complete_graph(n):
-        return Graph(nx.complete_graph(n))
+        return Graph.from_generator(generators.complete_graph(n))
     
     @staticmethod
     def new_complete_bipartite_graph(n1, n2):
-        return Graph(nx.complete_bipartite_graph(n1, n2))
+        return Graph.from_generator(generators.complete_bipartite_graph(n1, n2))
     
     @staticmethod
     def new_cycle_graph(n):
-        return Graph(nx.cycle_graph(n))
+        return Graph.from_generator(generators.cycle_graph(n))
     
     @staticmethod
     def new_path_graph(n):
-        return Graph(nx.path_graph(n))
+        return Graph.from_generator(generators.path_graph(n))
     
     @staticmethod
     def new_star_graph(n):
-        return Graph(nx.star_graph(n))
+        return Graph.from_generator(generators.star_graph(n))
     
     @staticmethod
     def  new_full_rary_tree(r, n):
-        return Graph(nx.full_rary_tree(r, n))
+        return Graph.from_generator(generators.full_rary_tree(r, n))
     
     @staticmethod
     def new_balanced_tree(r, h):
-        return Graph(nx.balanced_tree(r, h))
+        return Graph.from_generator(generators.balanced_tree(r, h))
+
+
+# doubles the number of rows of an array, used for arrays that are filled one row at a time
+# the grown array is always in memory, also if array is memory mapped
+def grow(array):
+    grown = np.zeros((max(2*len(array), 16),) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
 
 
-# represents a node including its position in a graph layout
+# sequence of the nodes or edges of a graph, the views are created on access
+class ViewList:
+    __slots__ = ("graph", "view")
+
+    def __init__(self, graph, view):
+        self.graph = graph
+        self.view = view
+
+    def __len__(self):
+        if self.view is Node:
+            return self.graph.node_count
+        return self.graph.edge_count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.view(self.graph, i) for i in range(len(self))[index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("index out of range")
+        return self.view(self.graph, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.view(self.graph, index)
+
+
+# a node of a graph, a view of row index in the node arrays of the graph
+# views of the same node are equal, so they can be used as keys of dicts and sets
+# changes to the position, color or selection are reported to the graph so only changed nodes are redrawn
 class Node:
-    name = ""
-    x = 0
-    y = 0
-    radius = 20 # last radius used to draw the node
-    color = "white"
-    selected = False # whether the node is currently selected
-
-    def __init__(self, name, x, y, color="white"):
-        self.name = name
-        self.x = x
-        self.y = y
-        self.color = color
-
-    def draw(self, window, radius=20):
-        self.radius = radius
-        outline = "black"
-        outline_width = 1
-        if self.selected:
-            outline = "blue"
-            outline_width = 3
-        canvas_x, canvas_y = window.unitsquare_to_canvas_coords(self.x, self.y)
-        circle = window.canvas.create_oval(canvas_x-radius, canvas_y-radius, canvas_x+radius, canvas_y+radius, fill=self.color, outline=outline, width=outline_width)
-        self.bind_actions(window, circle)
-        label = window.canvas.create_text(canvas_x, canvas_y, text=self.name)
-        self.bind_actions(window, label) # bind actions to label as well
-
-    # bindings to handle events on node
-    def bind_actions(self, window, bind_to):
-        window.canvas.tag_bind(bind_to, "<ButtonPress-1>", lambda event: self.handle_press(event, window))
-        window.canvas.tag_bind(bind_to, "<ButtonRelease-1>", lambda event: self.handle_release(event, window))
-
-    def handle_press(self, event, window):
-        debug("Node " + str(self.name) + " pressed")
-        window.current_tool.handle_node_press(window, self, event)
-
-    def handle_release(self, event, window):
-        debug("Node " + str(self.name) + " released")
-        window.current_tool.handle_node_release(window, self, event)
-
-    def on_drag_start(self, event):
-        debug("Starting drag of node " + str(self.name))
-        self.drag_start_x = event.x
-        self.drag_start_y = event.y
-
-    def on_drag_end(self, event, window):
-        dx = event.x - self.drag_start_x
-        dy = event.y - self.drag_start_y
-        debug("Ending drag of node " + str(self.name) + " with delta of " + str((dx, dy)))
-        tx, ty = window.canvas_to_unitsquare_coords(dx, dy, direction=True)
-        self.x += tx
-        self.y += ty
-        window.update_graph()
-
-# represents an edge between two nodes
+    __slots__ = ("graph", "index")
+    radius = 20 # radius used to draw the node
+
+    def __init__(self, graph, index):
+        self.graph = graph
+        self.index = index
+
+    def __eq__(self, other):
+        return type(other) is Node and other.index == self.index and other.graph is self.graph
+
+    def __hash__(self):
+        return hash(self.index)
+
+    def changed(self):
+        self.graph.dirty_nodes.add(self)
+
+    def moved(self):
+        self.graph.dirty_nodes.add(self)
+        self.graph.node_moved(self)
+
+    @property
+    def name(self):
+        return self.graph.names[self.index]
+
+    @property
+    def x(self):
+        return float(self.graph.positions[self.index, 0])
+
+    @x.setter
+    def x(self, value):
+        self.graph.positions[self.index, 0] = value
+        self.moved()
+
+    @property
+    def y(self):
+        return float(self.graph.positions[self.index, 1])
+
+    @y.setter
+    def y(self, value):
+        self.graph.positions[self.index, 1] = value
+        self.moved()
+
+    @property
+    def color(self):
+        return self.graph.palette[self.graph.node_colors[self.index]]
+
+    @color.setter
+    def color(self, value):
+        self.graph.record(NODE_COLOR, self.index, self.color, value)
+        self.graph.node_colors[self.index] = self.graph.color_index(value)
+        self.changed()
+
+    @property
+    def selected(self):
+        return bool(self.graph.node_selected[self.index])
+
+    @selected.setter
+    def selected(self, value):
+        self.graph.record(NODE_SELECTED, self.index, self.selected, value)
+        self.graph.node_selected[self.index] = value
+        self.changed()
+
+# an edge between two nodes, a view of row index in the edge arrays of the graph
 class Edge:
-    node1 = None
-    node2 = None
-    weight = None
-    directed = False
-
-    color = "black"
-
-    def __init__(self, node1, node2, weight=None, color="black", directed=False):
-        self.node1 = node1
-        self.node2 = node2
-        self.weight = weight
-        self.color = color
-        self.directed = directed
+    __slots__ = ("graph", "index")
 
-    def draw(self, window):
-        canvas_x1, canvas_y1 = window.unitsquare_to_canvas_coords(self.node1.x, self.node1.y)
-        canvas_x2, canvas_y2 = window.unitsquare_to_canvas_coords(self.node2.x, self.node2.y)
-        if self.directed: # create two lines to draw arrow markings at halfway point
-            window.canvas.create_line(canvas_x1, canvas_y1, (canvas_x1+canvas_x2)/2, (canvas_y1+canvas_y2)/2, arrow="last", fill=self.color)
-            window.canvas.create_line((canvas_x1+canvas_x2)/2, (canvas_y1+canvas_y2)/2, canvas_x2, canvas_y2, fill=self.color)
-        else:
-            window.canvas.create_line(canvas_x1, canvas_y1, canvas_x2, canvas_y2, fill=self.color)
-        if self.weight is not None:
-            vector = (canvas_x2-canvas_x1, canvas_y2-canvas_y1) # vector from node1 to node2
-            length = math.sqrt(vector[0]**2 + vector[1]**2) # length of vector
-            vector = (vector[0]/length, vector[1]/length) # normalize vector
-            rotated = (vector[0]*math.cos(math.pi/2)-vector[1]*math.sin(math.pi/2), vector[0]*math.sin(math.pi/2)+vector[1]*math.cos(math.pi/2)) # rotate vector by 90 degrees
-            # calculate label position
-            label_x = (canvas_x1+canvas_x2)/2 + rotated[0]*15 
-            label_y = (canvas_y1+canvas_y2)/2 + rotated[1]*15
-            window.canvas.create_text(label_x, label_y, text=self.weight)
\ No newline at end of file
+    def __init__(self, graph, index):
+        self.graph = graph
+        self.index = index
+
+    def __eq__(self, other):
+        return type(other) is Edge and other.index == self.index and other.graph is self.graph
+
+    def __hash__(self):
+        return hash(self.index)
+
+    def changed(self):
+        self.graph.dirty_edges.add(self)
+
+    @property
+    def node1(self):
+        return Node(self.graph, int(self.graph.edge_endpoints[self.index, 0]))
+
+    @property
+    def node2(self):
+        return Node(self.graph, int(self.graph.edge_endpoints[self.index, 1]))
+
+    @property
+    def directed(self):
+        return bool(self.graph.edge_directed[self.index])
+
+    # weights are stored as floats, integral weights are returned as ints
+    @property
+    def weight(self):
+        weight = float(self.graph.edge_weights[self.index])
+        if math.isnan(weight):
+            return None
+        if weight.is_integer():
+            return int(weight)
+        return weight
+
+    @weight.setter
+    def weight(self, value):
+        self.graph.record(EDGE_WEIGHT, self.index, self.weight, value)
+        self.graph.edge_weights[self.index] = np.nan if value is None else value
+        self.changed()
+
+    @property
+    def color(self):
+        return self.graph.palette[self.graph.edge_colors[self.index]]
+
+    @color.setter
+    def color(self, value):
+        self.graph.record(EDGE_COLOR, self.index, self.color, value)
+        self.graph.edge_colors[self.index] = self.graph.color_index(value)
+        self.changed()
@@ -0,0 +1,570 @@
+import ast
+from array import array
+import json
+import math
+import os
+import re
+import tempfile
+from xml.parsers import expat
+
+import numpy as np
+
+from lazy import LazyModule
+from debug import debug, timed
+from graph import Graph
+import layout
+
+saxutils = LazyModule("xml.sax.saxutils") # imports urllib, which is slow
+
+
+# reads a graph from a file, the format is chosen by the extension of path
+# edge lists are read from any other extension, .csv files are separated by commas
+@timed("io/load")
+def load(path):
+    debug("Loading graph from %s", path)
+    extension = os.path.splitext(path)[1].lower()
+    if extension == binary_extension:
+        return open_binary(path)
+    if extension == ".graphml":
+        return read_graphml(path)
+    if extension == ".gml":
+        return read_gml(path)
+    return read_edge_list(path, delimiter="," if extension == ".csv" else None)
+
+
+# writes a graph to a file, the format is chosen by the extension of path like in load()
+@timed("io/save")
+def save(graph, path):
+    debug("Saving graph to %s", path)
+    extension = os.path.splitext(path)[1].lower()
+    if extension == binary_extension:
+        save_binary(graph, path)
+    elif extension == ".graphml":
+        write_graphml(graph, path)
+    elif extension == ".gml":
+        write_gml(graph, path)
+    else:
+        write_edge_list(graph, path, delimiter="," if extension == ".csv" else " ")
+
+
+# file types for file dialogs
+file_types = [("Tarvos Graph", "*.tgraph"), ("GraphML", "*.graphml"), ("GML", "*.gml"),
+              ("Edge List", "*.edges *.txt *.csv"), ("All Files", "*")]
+
+
+# collects the nodes and edges of a graph while a file is read, one row at a time in typed arrays
+# the arrays are handed to Graph.from_arrays() without going through python lists of edges or a networkx graph
+class GraphBuilder:
+    names = None
+    name_index = None
+    palette = None # colors of nodes and edges, the first two are the default colors
+    palette_index = None
+    coordinates = None # x and y of every node, nan if the file has no position for it
+    node_colors = None
+    endpoints = None # node indices of both endpoints of every edge
+    edge_colors = None
+    edge_weights = None # nan for edges without weight
+
+    def __init__(self):
+        self.names = []
+        self.name_index = {}
+        self.palette = ["white", "black"]
+        self.palette_index = {"white": 0, "black": 1}
+        self.coordinates = array("d")
+        self.node_colors = array("i")
+        self.endpoints = array("q")
+        self.edge_colors = array("i")
+        self.edge_weights = array("d")
+
+    # index of the node with name, the node is added if it does not exist yet
+    def node(self, name):
+        index = self.name_index.get(name)
+        if index is None:
+            index = len(self.names)
+            self.names.append(name)
+            self.name_index[name] = index
+            self.coordinates.extend((math.nan, math.nan))
+            self.node_colors.append(0)
+        return index
+
+    def color_index(self, color):
+        index = self.palette_index.get(color)
+        if index is None:
+            index = len(self.palette)
+            self.palette.append(color)
+            self.palette_index[color] = index
+        return index
+
+    def set_position(self, index, x, y):
+        self.coordinates[2*index] = x
+        self.coordinates[2*index + 1] = y
+
+    def set_color(self, index, color):
+        self.node_colors[index] = self.color_index(color)
+
+    def edge(self, index1, index2, weight=math.nan, color=None):
+        self.endpoints.extend((index1, index2))
+        self.edge_colors.append(1 if color is None else self.color_index(color))
+        self.edge_weights.append(weight)
+
+    # parallel edges are dropped like networkx does, the first one is kept
+    # nodes keep their positions if the file has positions for all of them, otherwise the default layout is computed
+    def build(self, directed):
+        endpoints = np.frombuffer(self.endpoints, dtype=np.int64).reshape(-1, 2).astype(np.intp)
+        ordered = endpoints if directed else np.sort(endpoints, axis=1)
+        keys = ordered[:, 0]*max(len(self.names), 1) + ordered[:, 1]
+        keep = np.sort(np.unique(keys, return_index=True)[1])
+        if len(keep) < len(endpoints):
+            debug("Dropping %s parallel edges", len(endpoints) - len(keep))
+        coordinates = np.frombuffer(self.coordinates, dtype=float).reshape(-1, 2)
+        positions = None
+        if len(coordinates) and not np.isnan(coordinates).any():
+            positions = coordinates.copy()
+            if np.abs(positions).max() > 1: # e.g. pixel coordinates of another program
+                positions = layout.rescale(positions)
+        return Graph.from_arrays(self.names, endpoints[keep], directed, positions,
+                                 node_colors=np.array(self.node_colors, dtype=np.int32),
+                                 node_selected=np.zeros(len(self.names), dtype=bool),
+                                 edge_colors=np.frombuffer(self.edge_colors, dtype=np.int32)[keep],
+                                 edge_weights=np.frombuffer(self.edge_weights, dtype=float)[keep],
+                                 edge_directed=np.full(len(keep), directed),
+                                 palette=self.palette, name_index=self.name_index)
+
+
+# edge lists have one edge per line, the names of the endpoints followed by an optional weight
+# a line with a single name adds an isolated node, everything after # is a comment
+# the attribute dicts written by nx.write_edgelist, e.g. 1 2 {'weight': 3}, are understood as well
+# node names are strings, like in nx.read_edgelist
+def read_edge_list(path, directed=False, delimiter=None):
+    builder = GraphBuilder()
+    with open(path, encoding="utf-8") as file:
+        for number, line in enumerate(file, 1):
+            fields = line.split(delimiter)
+            # most lines are just two names, they skip the checks below
+            if len(fields) == 2 and delimiter is None and "#" not in line and "{" not in line:
+                builder.edge(builder.node(fields[0]), builder.node(fields[1]))
+            else:
+                read_edge_list_line(builder, line, delimiter, path, number)
+    return builder.build(directed)
+
+
+def read_edge_list_line(builder, line, delimiter, path, number):
+    line = line.split("#", 1)[0].strip()
+    if not line:
+        return
+    attributes = None
+    if "{" in line:
+        line, attributes = line.split("{", 1)
+        attributes = parse_attributes("{" + attributes, path, number)
+    fields = [field.strip() for field in line.split(delimiter) if field.strip()]
+    if len(fields) == 1 and attributes is None:
+        builder.node(fields[0])
+        return
+    if len(fields) not in (2, 3):
+        raise ValueError(path + ":" + str(number) + ": expected two node names and an optional weight")
+    weight = math.nan
+    color = None
+    if len(fields) == 3:
+        weight = parse_number(fields[2], path, number)
+    if attributes is not None:
+        weight = float(attributes.get("weight", weight))
+        color = attributes.get("color")
+    builder.edge(builder.node(fields[0]), builder.node(fields[1]), weight, color)
+
+
+def parse_attributes(text, path, number):
+    try:
+        attributes = ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        attributes = None
+    if not isinstance(attributes, dict):
+        raise ValueError(path + ":" + str(number) + ": invalid edge attributes " + text)
+    return attributes
+
+
+def parse_number(text, path, number):
+    try:
+        return float(text)
+    except ValueError:
+        raise ValueError(path + ":" + str(number) + ": invalid number " + text) from None
+
+
+# edge lists can not store positions or colors, nodes without edges are written as a single name
+def write_edge_list(graph, path, delimiter=" "):
+    names = [str(name) for name in graph.names]
+    for name in names:
+        if len(name.split(None if delimiter == " " else delimiter)) != 1 or name != name.strip() or "#" in name or "{" in name:
+            raise ValueError("node name " + repr(name) + " can not be written to an edge list")
+    endpoints = graph.edge_node_indices()
+    weights = graph.edge_weights[:graph.edge_count]
+    degrees = np.bincount(endpoints.ravel(), minlength=graph.node_count)
+    with open(path, "w", encoding="utf-8") as file:
+        for index in np.flatnonzero(degrees == 0).tolist():
+            file.write(names[index] + "\n")
+        for start in range(0, graph.edge_count, chunk_size):
+            lines = []
+            for (u, v), weight in zip(endpoints[start:start + chunk_size].tolist(), weights[start:start + chunk_size].tolist()):
+                if math.isnan(weight):
+                    lines.append(names[u] + delimiter + names[v] + "\n")
+                else:
+                    lines.append(names[u] + delimiter + names[v] + delimiter + format_number(weight) + "\n")
+            file.write("".join(lines))
+
+
+chunk_size = 65536 # number of edges that are formatted before they are written
+
+
+def format_number(value):
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+# reads the file with a streaming xml parser, only the node or edge that is being read is held in memory
+# the data keys x, y and color of nodes and weight and color of edges are used, other data is ignored
+class GraphMLReader:
+    builder = None
+    directed = False
+    keys = None # maps key ids to attribute names
+    element = None # attributes of the node or edge that is being read
+    data = None # data of the node or edge that is being read
+    key = None # key of the data element that is being read
+    text = None # parts of the text of the data element that is being read
+
+    def __init__(self):
+        self.builder = GraphBuilder()
+        self.keys = {}
+
+    def read(self, path):
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        parser.StartElementHandler = self.start
+        parser.EndElementHandler = self.end
+        parser.CharacterDataHandler = self.characters
+        try:
+            with open(path, "rb") as file:
+                parser.ParseFile(file)
+        except expat.ExpatError as error:
+            raise ValueError(path + ": " + str(error)) from None
+        return self.builder.build(self.directed)
+
+    def start(self, tag, attributes):
+        if tag == "key":
+            self.keys[attributes.get("id")] = attributes.get("attr.name", attributes.get("id"))
+        elif tag == "graph":
+            self.directed = attributes.get("edgedefault") == "directed"
+        elif tag in ("node", "edge"):
+            self.element = attributes
+            self.data = {}
+        elif tag == "data" and self.element is not None:
+            self.key = self.keys.get(attributes.get("key"), attributes.get("key"))
+            self.text = []
+
+    def characters(self, text):
+        if self.text is not None:
+            self.text.append(text)
+
+    def end(self, tag):
+        builder = self.builder
+        if tag == "data" and self.text is not None:
+            self.data[self.key] = "".join(self.text).strip()
+            self.text = None
+        elif tag == "node":
+            index = builder.node(self.element.get("id"))
+            if "x" in self.data and "y" in self.data:
+                builder.set_position(index, float(self.data["x"]), float(self.data["y"]))
+            if "color" in self.data:
+                builder.set_color(index, self.data["color"])
+            self.element = None
+        elif tag == "edge":
+            index1 = builder.node(self.element.get("source"))
+            index2 = builder.node(self.element.get("target"))
+            builder.edge(index1, index2, float(self.data.get("weight", math.nan)), self.data.get("color"))
+            self.element = None
+
+
+def read_graphml(path):
+    return GraphMLReader().read(path)
+
+
+# positions and colors of nodes and weights and colors of edges are written as data
+def write_graphml(graph, path):
+    positions = graph.node_positions().tolist()
+    colors = graph.node_colors[:graph.node_count].tolist()
+    endpoints = graph.edge_node_indices()
+    with open(path, "w", encoding="utf-8") as file:
+        file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        file.write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+        file.write('  <key id="x" for="node" attr.name="x" attr.type="double"/>\n')
+        file.write('  <key id="y" for="node" attr.name="y" attr.type="double"/>\n')
+        file.write('  <key id="node_color" for="node" attr.name="color" attr.type="string"/>\n')
+        file.write('  <key id="weight" for="edge" attr.name="weight" attr.type="double"/>\n')
+        file.write('  <key id="edge_color" for="edge" attr.name="color" attr.type="string"/>\n')
+        file.write('  <graph edgedefault="' + ("directed" if graph.directed else "undirected") + '">\n')
+        ids = [saxutils.quoteattr(str(name)) for name in graph.names]
+        for start in range(0, graph.node_count, chunk_size):
+            lines = []
+            for index in range(start, min(start + chunk_size, graph.node_count)):
+                x, y = positions[index]
+                lines.append('    <node id=' + ids[index] + '><data key="x">' + repr(x) + '</data><data key="y">' + repr(y)
+                             + '</data><data key="node_color">' + saxutils.escape(graph.palette[colors[index]]) + '</data></node>\n')
+            file.write("".join(lines))
+        for start in range(0, graph.edge_count, chunk_size):
+            stop = min(start + chunk_size, graph.edge_count)
+            lines = []
+            for (u, v), weight, color in zip(endpoints[start:stop].tolist(), graph.edge_weights[start:stop].tolist(),
+                                             graph.edge_colors[start:stop].tolist()):
+                line = '    <edge source=' + ids[u] + ' target=' + ids[v] + '>'
+                if not math.isnan(weight):
+                    line += '<data key="weight">' + repr(weight) + '</data>'
+                lines.append(line + '<data key="edge_color">' + saxutils.escape(graph.palette[color]) + '</data></edge>\n')
+            file.write("".join(lines))
+        file.write('  </graph>\n</graphml>\n')
+
+
+gml_token = re.compile(r'"[^"]*"|\[|\]|[^\s\[\]"]+')
+
+
+# gml is a nested list of keys and values, only one node or edge is held in memory at a time
+# nodes are named by their label, or by their id if they have none
+# positions and colors are read from the graphics of nodes, weights and colors from the edges
+def read_gml(path):
+    builder = GraphBuilder()
+    directed = False
+    ids = {} # maps gml ids to node indices
+    stack = [] # (key, dict) of the lists that are being read
+    key = None
+    with open(path, encoding="utf-8") as file:
+        for number, line in enumerate(file, 1):
+            for token in gml_token.findall(line):
+                if token == "[":
+                    if key is None:
+                        raise ValueError(path + ":" + str(number) + ": list without key")
+                    stack.append((key, {}))
+                    key = None
+                elif token == "]":
+                    if not stack or key is not None:
+                        raise ValueError(path + ":" + str(number) + ": unexpected ]")
+                    name, values = stack.pop()
+                    if len(stack) == 1 and name == "node":
+                        gml_node(builder, ids, values, path, number)
+                    elif len(stack) == 1 and name == "edge":
+                        gml_edge(builder, ids, values, path, number)
+                    elif stack:
+                        stack[-1][1][name] = values
+                elif key is None:
+                    key = token
+                else:
+                    value = gml_value(token)
+                    if len(stack) == 1 and key == "directed":
+                        directed = value == 1
+                    elif stack:
+                        stack[-1][1][key] = value
+                    key = None
+    if stack:
+        raise ValueError(path + ": unexpected end of file")
+    return builder.build(directed)
+
+
+def gml_value(token):
+    if token.startswith('"'):
+        return saxutils.unescape(token[1:-1], {"&quot;": '"'}) # the inverse of gml_string
+    try:
+        return int(token)
+    except ValueError:
+        pass
+    try:
+        return float(token)
+    except ValueError:
+        return token
+
+
+def gml_node(builder, ids, values, path, number):
+    if "id" not in values:
+        raise ValueError(path + ":" + str(number) + ": node without id")
+    index = builder.node(values.get("label", values["id"]))
+    ids[values["id"]] = index
+    graphics = values.get("graphics", {})
+    if "x" in graphics and "y" in graphics:
+        builder.set_position(index, float(graphics["x"]), float(graphics["y"]))
+    color = values.get("color", graphics.get("fill"))
+    if color is not None:
+        builder.set_color(index, color)
+
+
+def gml_edge(builder, ids, values, path, number):
+    if values.get("source") not in ids or values.get("target") not in ids:
+        raise ValueError(path + ":" + str(number) + ": edge between unknown nodes")
+    weight = float(values.get("weight", math.nan))
+    color = values.get("color", values.get("graphics", {}).get("fill"))
+    builder.edge(ids[values["source"]], ids[values["target"]], weight, color)
+
+
+# nodes get their index as id and their name as label
+def write_gml(graph, path):
+    positions = graph.node_positions().tolist()
+    colors = graph.node_colors[:graph.node_count].tolist()
+    endpoints = graph.edge_node_indices()
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("graph [\n  directed " + ("1" if graph.directed else "0") + "\n")
+        for start in range(0, graph.node_count, chunk_size):
+            lines = []
+            for index in range(start, min(start + chunk_size, graph.node_count)):
+                x, y = positions[index]
+                lines.append("  node [\n    id " + str(index) + "\n    label " + gml_string(graph.names[index])
+                             + "\n    graphics [\n      x " + repr(x) + "\n      y " + repr(y) + "\n      fill "
+                             + gml_string(graph.palette[colors[index]]) + "\n    ]\n  ]\n")
+            file.write("".join(lines))
+        for start in range(0, graph.edge_count, chunk_size):
+            stop = min(start + chunk_size, graph.edge_count)
+            lines = []
+            for (u, v), weight, color in zip(endpoints[start:stop].tolist(), graph.edge_weights[start:stop].tolist(),
+                                             graph.edge_colors[start:stop].tolist()):
+                line = "  edge [\n    source " + str(u) + "\n    target " + str(v) + "\n"
+                if not math.isnan(weight):
+                    line += "    weight " + repr(weight) + "\n"
+                lines.append(line + "    color " + gml_string(graph.palette[color]) + "\n  ]\n")
+            file.write("".join(lines))
+        file.write("]\n")
+
+
+# gml strings can not contain quotes, they are written as html entities like networkx does
+def gml_string(value):
+    return '"' + str(value).replace("&", "&amp;").replace('"', "&quot;") + '"'
+
+
+# binary format that is memory mapped when it is opened, so opening takes the same time for graphs of any size
+# the file starts with magic, the length of a json header and the header, which gives offset, dtype and shape
+# of every array, followed by the raw arrays, each aligned to alignment bytes
+# the arrays are the node and edge arrays of Graph, its compressed adjacency and the node names
+binary_extension = ".tgraph"
+magic = b"TARVOSG\x01"
+alignment = 64
+
+
+# names that are all ints are stored as an array, other names as their repr, which is parsed when a name is accessed
+def save_binary(graph, path):
+    if graph.edge_count > graph.indexed_edges:
+        graph.index_edges() # the stored adjacency has to cover all edges
+    arrays = {
+        "positions": graph.node_positions().astype("<f8"),
+        "node_colors": graph.node_colors[:graph.node_count].astype("<i4"),
+        "node_selected": graph.node_selected[:graph.node_count].astype("|b1"),
+        "edge_endpoints": graph.edge_node_indices().astype("<i8"),
+        "edge_colors": graph.edge_colors[:graph.edge_count].astype("<i4"),
+        "edge_weights": graph.edge_weights[:graph.edge_count].astype("<f8"),
+        "edge_directed": graph.edge_directed[:graph.edge_count].astype("|b1"),
+        "neighbor_offsets": np.asarray(graph.neighbor_offsets).astype("<i8"),
+        "neighbor_nodes": np.asarray(graph.neighbor_nodes).astype("<i4"),
+        "neighbor_edges": np.asarray(graph.neighbor_edges).astype("<i4"),
+    }
+    arrays.update(encode_names(graph.names))
+    header = {"directed": graph.directed, "palette": graph.palette, "arrays": {}}
+    offset = 0
+    for name, values in arrays.items():
+        header["arrays"][name] = [offset, values.dtype.str, list(values.shape)]
+        offset = aligned(offset + values.nbytes)
+    encoded = json.dumps(header).encode()
+    start = aligned(len(magic) + 8 + len(encoded))
+    directory = os.path.dirname(os.path.abspath(path))
+    # write to a temporary file first, a graph that was opened from path keeps its memory mapping of the old file
+    file, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(file, "wb") as stream:
+            stream.write(magic)
+            stream.write(np.array(len(encoded), dtype="<u8").tobytes())
+            stream.write(encoded)
+            stream.write(bytes(start - stream.tell()))
+            for name, values in arrays.items():
+                stream.write(bytes(start + header["arrays"][name][0] - stream.tell()))
+                stream.write(values.tobytes())
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+
+def aligned(offset):
+    return -(-offset//alignment)*alignment
+
+
+def encode_names(names):
+    if all(type(name) is int for name in names):
+        return {"name_values": np.array(names, dtype="<i8")}
+    texts = []
+    for name in names:
+        text = repr(name)
+        if type(name) is not str:
+            try:
+                readable = ast.literal_eval(text) == name
+            except (ValueError, SyntaxError):
+                readable = False
+            if not readable:
+                raise ValueError("node name " + text + " can not be saved")
+        texts.append(text.encode())
+    lengths = np.fromiter((len(text) for text in texts), dtype="<i8", count=len(texts))
+    offsets = np.concatenate((np.zeros(1, dtype="<i8"), np.cumsum(lengths, dtype="<i8")))
+    return {"name_offsets": offsets, "name_data": np.frombuffer(b"".join(texts), dtype="|u1")}
+
+
+# the arrays of the graph are copy on write views of the file, changes to the graph never change the file
+def open_binary(path):
+    data = np.memmap(path, dtype=np.uint8, mode="c")
+    if bytes(data[:len(magic)]) != magic:
+        raise ValueError(path + " is not a graph file")
+    length = int(data[len(magic):len(magic) + 8].view("<u8")[0])
+    header = json.loads(bytes(data[len(magic) + 8:len(magic) + 8 + length]))
+    start = aligned(len(magic) + 8 + length)
+
+    def section(name):
+        offset, dtype, shape = header["arrays"][name]
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape))*dtype.itemsize
+        return data[start + offset:start + offset + size].view(dtype).reshape(shape)
+
+    if "name_values" in header["arrays"]:
+        names = NameTable(section("name_values"))
+    else:
+        names = NameTable(None, section("name_offsets"), section("name_data"))
+    return Graph.from_arrays(names, section("edge_endpoints"), header["directed"], section("positions"),
+                             node_colors=section("node_colors"), node_selected=section("node_selected"),
+                             edge_colors=section("edge_colors"), edge_weights=section("edge_weights"),
+                             edge_directed=section("edge_directed"), palette=header["palette"],
+                             adjacency=(section("neighbor_offsets"), section("neighbor_nodes"), section("neighbor_edges")))
+
+
+# read only sequence of node names from a binary file, names are decoded when they are accessed
+# values holds int names, otherwise name i is the repr in data[offsets[i]:offsets[i + 1]]
+class NameTable:
+    values = None
+    offsets = None
+    data = None
+
+    def __init__(self, values, offsets=None, data=None):
+        self.values = values
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        if self.values is not None:
+            return len(self.values)
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self))[index]]
+        if index < 0:
+            index += len(self)
+        if self.values is not None:
+            return int(self.values[index])
+        text = bytes(self.data[self.offsets[index]:self.offsets[index + 1]]).decode()
+        if text.startswith(("'", '"')) and "\\" not in text:
+            return text[1:-1] # fast path for plain strings
+        return ast.literal_eval(text)
+
+    def __iter__(self):
+        if self.values is not None:
+            yield from self.values.tolist()
+            return
+        for index in range(len(self)):
+            yield self[index]
@@ -0,0 +1,276 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import numpy as np
+
+from debug import debug, span, timed
+
+
+# optimal distance between nodes for a layout of n nodes in [-1, 1], the same as networkx uses after rescaling
+def natural_length(n):
+    return 2/np.sqrt(max(n, 1))
+
+
+# number of node pairs up to which repulsion is computed exactly, above that barnes-hut is used
+exact_pairs = 250_000
+max_levels = 10 # depth of the barnes-hut grid pyramid, the finest level has 4**max_levels cells at most
+
+
+# repulsive displacement k*k*delta/distance**2 of the nodes in movable from all other nodes, one row per movable node
+def repulsion(positions, movable, k):
+    if len(movable)*len(positions) <= exact_pairs:
+        return exact_repulsion(positions, movable, k)
+    return barnes_hut_repulsion(positions, movable, k)
+
+
+def exact_repulsion(positions, movable, k):
+    delta = positions[movable][:, np.newaxis, :] - positions[np.newaxis, :, :]
+    distance = np.linalg.norm(delta, axis=-1)
+    np.clip(distance, 0.01*k, None, out=distance) # nodes on top of each other still push apart
+    return np.einsum("ijk,ij->ik", delta, k*k/distance**2)
+
+
+# approximates the repulsion with a pyramid of grids over the bounding box of the nodes, the grid version of a quadtree
+# on every level a node interacts with the centers of mass of the cells that are not adjacent to its own cell
+# but whose parents are adjacent to the parent of its cell, so every other node is accounted for on exactly one level
+# nodes in adjacent cells of the finest level are repelled exactly, this takes O(n log n) for evenly spread nodes
+def barnes_hut_repulsion(positions, movable, k):
+    low = positions.min(axis=0)
+    size = max(float(np.ptp(positions, axis=0).max()), 1e-9)*(1 + 1e-9) # keeps the maximum inside the last cell
+    levels = int(min(max(np.ceil(np.log(len(positions))/np.log(4)), 1), max_levels))
+    moving = positions[movable]
+    displacement = np.zeros_like(moving)
+    offset_x, offset_y = np.meshgrid(np.arange(-2, 4), np.arange(-2, 4)) # relative to the first child of the parent cell
+    offset_x = offset_x.ravel()
+    offset_y = offset_y.ravel()
+    for level in range(1, levels + 1):
+        side = 2**level
+        cells = np.minimum(((positions - low)/size*side).astype(np.intp), side - 1)
+        flat = cells[:, 0]*side + cells[:, 1]
+        mass = np.bincount(flat, minlength=side*side).astype(float)
+        center_x = np.bincount(flat, weights=positions[:, 0], minlength=side*side)
+        center_y = np.bincount(flat, weights=positions[:, 1], minlength=side*side)
+        occupied = mass > 0
+        center_x[occupied] /= mass[occupied]
+        center_y[occupied] /= mass[occupied]
+        own = cells[movable]
+        # candidates are the 6x6 children of the parent cell and its neighbors, one column per candidate
+        candidate_x = (own[:, 0]//2*2)[:, np.newaxis] + offset_x
+        candidate_y = (own[:, 1]//2*2)[:, np.newaxis] + offset_y
+        far = (np.abs(candidate_x - own[:, 0:1]) > 1) | (np.abs(candidate_y - own[:, 1:2]) > 1)
+        valid = far & (candidate_x >= 0) & (candidate_x < side) & (candidate_y >= 0) & (candidate_y < side)
+        flat_candidates = np.where(valid, candidate_x*side + candidate_y, 0)
+        cell_mass = np.where(valid, mass[flat_candidates], 0)
+        delta_x = moving[:, 0:1] - center_x[flat_candidates]
+        delta_y = moving[:, 1:2] - center_y[flat_candidates]
+        weight = cell_mass*k*k/np.maximum(delta_x**2 + delta_y**2, (0.01*k)**2)
+        displacement[:, 0] += (weight*delta_x).sum(axis=1)
+        displacement[:, 1] += (weight*delta_y).sum(axis=1)
+    # exact repulsion from the nodes in the own and adjacent cells of the finest level
+    order = np.argsort(flat, kind="stable")
+    counts = np.bincount(flat, minlength=side*side)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    own_index = np.asarray(movable, dtype=np.intp)
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            x = own[:, 0] + dx
+            y = own[:, 1] + dy
+            inside = (x >= 0) & (x < side) & (y >= 0) & (y < side)
+            neighbor = np.where(inside, x*side + y, 0)
+            count = np.where(inside, counts[neighbor], 0)
+            for slot in range(int(count.max(initial=0))):
+                present = slot < count
+                other = order[np.minimum(starts[neighbor] + slot, len(order) - 1)]
+                present &= other != own_index
+                delta = moving - positions[other]
+                squared = np.maximum((delta**2).sum(axis=1), (0.01*k)**2)
+                displacement += np.where(present, k*k/squared, 0)[:, np.newaxis]*delta
+    return displacement
+
+
+# one fruchterman-reingold iteration on the rows of positions in movable, the other rows stay in place
+# positions is an array of node positions, endpoints an array of node index pairs, one row per edge
+# every node is moved by at most temperature, returns the largest displacement
+def spring_step(positions, endpoints, movable, k, temperature):
+    moving = positions[movable]
+    # repulsion between all pairs, attraction along edges
+    displacement = repulsion(positions, movable, k)
+    if len(endpoints):
+        start = positions[endpoints[:, 0]]
+        end = positions[endpoints[:, 1]]
+        pull = (end - start)*np.linalg.norm(end - start, axis=1)[:, np.newaxis]/k
+        forces = np.zeros_like(positions)
+        np.add.at(forces, endpoints[:, 0], pull)
+        np.add.at(forces, endpoints[:, 1], -pull)
+        displacement += forces[movable]
+    length = np.linalg.norm(displacement, axis=1)
+    np.clip(length, 1e-9, None, out=length)
+    step = displacement*(np.minimum(length, temperature)/length)[:, np.newaxis]
+    positions[movable] = moving + step
+    if len(step) == 0:
+        return 0
+    return float(np.max(np.linalg.norm(step, axis=1)))
+
+
+# spring layout of a networkx graph that scales to large graphs, returns a dict of {name: (x, y)} like nx.spring_layout
+# the result is scaled to [-1, 1]
+@timed("layout/spring")
+def spring_layout(nx_graph, seed=None):
+    names = list(nx_graph.nodes())
+    if not names:
+        return {}
+    index = {name: i for i, name in enumerate(names)}
+    endpoints = np.array([(index[u], index[v]) for u, v in nx_graph.edges() if u != v], dtype=np.intp).reshape(-1, 2)
+    start = time.perf_counter()
+    positions = multilevel_layout(len(names), endpoints, np.random.default_rng(seed))
+    debug("Spring layout of %s nodes took %s s", len(names), time.perf_counter() - start)
+    return dict(zip(names, rescale(positions).tolist()))
+
+
+coarsest_size = 100 # graphs up to this size are laid out from random positions
+refine_iterations = 20 # iterations on every level after the positions of the coarser level are taken over
+local_radius = 3 # distance in natural lengths up to which other nodes push the nodes moved by relax_locally
+
+
+# lays out a coarser graph with matched pairs of adjacent nodes merged first and refines the result
+# the coarse layout already has the global shape, so the finer levels need only a few iterations with a low temperature
+def multilevel_layout(n, endpoints, rng, iterations=50):
+    k = natural_length(n)
+    movable = np.arange(n)
+    parents, coarse_n = match_neighbors(n, endpoints, rng)
+    if n <= coarsest_size or coarse_n > 0.8*n: # small enough, or coarsening does not help, e.g. for few edges
+        positions = rng.uniform(-1, 1, (n, 2))
+        for iteration in range(iterations):
+            spring_step(positions, endpoints, movable, k, 0.2*(1 - iteration/iterations))
+        return positions
+    coarse_endpoints = np.unique(np.sort(parents[endpoints], axis=1), axis=0)
+    coarse_endpoints = coarse_endpoints[coarse_endpoints[:, 0] != coarse_endpoints[:, 1]]
+    coarse = multilevel_layout(coarse_n, coarse_endpoints, rng, iterations)
+    positions = coarse[parents] + rng.uniform(-0.1*k, 0.1*k, (n, 2)) # merged nodes start next to each other
+    for iteration in range(refine_iterations):
+        spring_step(positions, endpoints, movable, k, 2*k*(1 - iteration/refine_iterations))
+    return positions
+
+
+# matches every node with at most one unmatched neighbor, returns the index of the merged node of every node
+def match_neighbors(n, endpoints, rng):
+    parents = np.full(n, -1, dtype=np.intp)
+    count = 0
+    for first, second in endpoints[rng.permutation(len(endpoints))].tolist():
+        if parents[first] == -1 and parents[second] == -1:
+            parents[first] = parents[second] = count
+            count += 1
+    unmatched = parents == -1
+    parents[unmatched] = np.arange(count, count + int(unmatched.sum()))
+    return parents, count + int(unmatched.sum())
+
+
+# centers positions at the origin and scales them so that the largest coordinate is 1, like networkx does
+def rescale(positions):
+    positions = positions - positions.mean(axis=0)
+    largest = np.abs(positions).max()
+    if largest > 0:
+        positions /= largest
+    return positions
+
+
+# relaxes the given nodes and their neighbors for a few iterations with a small temperature, all other nodes stay in place
+# cheap enough to run on the main thread after a local change, e.g. adding a node or an edge
+# endpoints only needs the edges at the nodes that can move, the other edges do not change their forces
+# only the nodes around the moving ones push them, so after one pass to find these nodes the work scales with the neighborhood
+@timed("layout/relax locally")
+def relax_locally(positions, endpoints, indices, pinned=(), iterations=30):
+    indices = np.asarray(indices, dtype=np.intp)
+    endpoints = endpoints.reshape(-1, 2)
+    starts = np.isin(endpoints[:, 0], indices)
+    ends = np.isin(endpoints[:, 1], indices)
+    movable = np.union1d(indices, np.concatenate((endpoints[starts, 1], endpoints[ends, 0])))
+    movable = np.setdiff1d(movable, np.asarray(pinned, dtype=np.intp))
+    if len(movable) == 0:
+        return movable
+    endpoints = endpoints[np.isin(endpoints, movable).any(axis=1)]
+    k = natural_length(len(positions))
+    low = positions[movable].min(axis=0) - local_radius*k
+    high = positions[movable].max(axis=0) + local_radius*k
+    nearby = np.flatnonzero(((positions >= low) & (positions <= high)).all(axis=1))
+    local = np.union1d(np.union1d(nearby, movable), endpoints.ravel())
+    local_positions = positions[local]
+    local_endpoints = np.searchsorted(local, endpoints)
+    local_movable = np.searchsorted(local, movable)
+    for iteration in range(iterations):
+        temperature = 0.1*k*(1 - iteration/iterations)
+        spring_step(local_positions, local_endpoints, local_movable, k, temperature)
+    positions[movable] = local_positions[local_movable]
+    return movable
+
+
+# computes a spring layout in a background thread, starting from the current positions
+# intermediate positions are published after every iteration so they can be drawn while the layout is running
+# results are tagged with the key they were started with, so results for outdated graph versions can be discarded
+class ProgressiveLayout:
+    executor = None
+    key = None # key of the most recent start
+    future = None
+    cancelled = None # event that stops the running layout
+    lock = None
+    latest = None # most recent positions that have not been polled yet
+    latest_key = None
+    time_budget = 2 # seconds a layout may run
+    max_iterations = 500
+    tolerance = 1e-4 # the layout stops once no node moves further than this times the natural length
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="layout")
+        self.cancelled = threading.Event()
+        self.lock = threading.Lock()
+
+    # starts a layout of a copy of positions, rows in pinned keep their position
+    def start(self, key, positions, endpoints, pinned=()):
+        self.cancel()
+        self.key = key
+        self.cancelled = threading.Event()
+        debug("Starting progressive layout for %s", key)
+        self.future = self.executor.submit(self.run, key, positions.copy(), endpoints.copy(), pinned, self.cancelled)
+
+    # executed in the worker thread
+    def run(self, key, positions, endpoints, pinned, cancelled):
+        movable = np.setdiff1d(np.arange(len(positions)), np.asarray(pinned, dtype=np.intp))
+        k = natural_length(len(positions))
+        # a warm start is already close to a good layout, so the temperature starts at half of what networkx uses
+        extent = float(np.ptp(positions, axis=0).max()) if len(positions) else 0
+        temperature = 0.05*max(extent, k)
+        deadline = time.perf_counter() + self.time_budget
+        for iteration in range(self.max_iterations):
+            if cancelled.is_set() or time.perf_counter() > deadline:
+                break
+            with span("layout/progressive iteration"):
+                moved = spring_step(positions, endpoints, movable, k, temperature*(1 - iteration/self.max_iterations))
+            with self.lock:
+                self.latest = positions.copy()
+                self.latest_key = key
+            if moved < self.tolerance*k:
+                break
+        debug("Progressive layout for %s stopped after %s iterations", key, iteration + 1)
+
+    def busy(self):
+        return (self.future is not None and not self.future.done()) or self.latest is not None
+
+    # returns the most recent positions of the current layout, or None if there are no new ones
+    def poll(self):
+        with self.lock:
+            positions, key = self.latest, self.latest_key
+            self.latest = None
+        if positions is None or key != self.key:
+            return None
+        return positions
+
+    def cancel(self):
+        self.cancelled.set()
+        self.key = None
+        with self.lock:
+            self.latest = None
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,134 @@
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+from debug import debug
+
+
+# stores layouts on disk so graphs that were laid out before are placed instantly
+# entries are keyed by a hash of the graph structure and of the layout algorithm with its parameters
+# the least recently used entries are removed once the cache is larger than max_bytes
+class LayoutCache:
+    directory = None
+    max_bytes = 64*1024*1024
+
+    def __init__(self, directory=None, max_bytes=64*1024*1024):
+        if directory is None:
+            base = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+            directory = os.path.join(base, "tarvos", "layouts")
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    # hash of the node names and edges in an order that does not depend on how the graph was built
+    # positions belong to node names, so an isomorphism invariant hash like weisfeiler-lehman is not enough here
+    @staticmethod
+    def key(nx_graph, algorithm):
+        digest = hashlib.sha256()
+        digest.update(repr(algorithm).encode())
+        digest.update(str(nx_graph.is_directed()).encode())
+        digest.update(repr(LayoutCache.node_order(nx_graph)).encode())
+        digest.update(repr(sorted(sorted((repr(u), repr(v))) for u, v in nx_graph.edges())).encode())
+        return digest.hexdigest()
+
+    # order of the rows of a stored layout
+    @staticmethod
+    def node_order(nx_graph):
+        return sorted(nx_graph.nodes(), key=repr)
+
+    # like key(), for a graph given as node names and an array of node index pairs, so no networkx graph is needed
+    # order is the row order of the stored layout, see array_order()
+    @staticmethod
+    def array_key(names, endpoints, directed, algorithm, order):
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        edges = rank[endpoints].reshape(-1, 2)
+        if not directed:
+            edges = np.sort(edges, axis=1)
+        edges = edges[np.lexsort((edges[:, 1], edges[:, 0]))]
+        digest = hashlib.sha256()
+        digest.update(repr(algorithm).encode())
+        digest.update(str(directed).encode())
+        digest.update(repr([names[index] for index in order.tolist()]).encode())
+        digest.update(edges.tobytes())
+        return digest.hexdigest()
+
+    # indices of the nodes in the order of the rows of a stored layout, the same order as node_order()
+    @staticmethod
+    def array_order(names):
+        return np.array(sorted(range(len(names)), key=lambda index: repr(names[index])), dtype=np.intp).reshape(-1)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".npy")
+
+    # returns the layout of nx_graph computed with compute(nx_graph), from the cache if it was computed before
+    # algorithm describes compute, e.g. ("spring", "networkx"), so different layouts of a graph are kept apart
+    # returns None without storing anything if compute returns None, e.g. if a planar layout is impossible
+    def get(self, nx_graph, algorithm, compute):
+        key = LayoutCache.key(nx_graph, algorithm)
+        path = self.path(key)
+        try:
+            positions = np.load(path)
+            os.utime(path) # marks the entry as recently used
+            debug("Using cached layout %s", key)
+            return dict(zip(LayoutCache.node_order(nx_graph), positions.tolist()))
+        except (OSError, ValueError):
+            pass
+        pos = compute(nx_graph)
+        if pos is not None:
+            self.put(key, np.array([pos[node] for node in LayoutCache.node_order(nx_graph)]).reshape(-1, 2))
+        return pos
+
+    # like get(), for a graph given as arrays, returns an array with one row per node
+    # compute() returns the positions in the order of names, it is only called if the layout is not cached
+    def get_array(self, names, endpoints, directed, algorithm, compute):
+        order = LayoutCache.array_order(names)
+        key = LayoutCache.array_key(names, endpoints, directed, algorithm, order)
+        path = self.path(key)
+        try:
+            stored = np.load(path)
+            if stored.shape == (len(names), 2):
+                os.utime(path) # marks the entry as recently used
+                debug("Using cached layout %s", key)
+                positions = np.empty_like(stored)
+                positions[order] = stored
+                return positions
+        except (OSError, ValueError):
+            pass
+        positions = compute()
+        self.put(key, positions[order])
+        return positions
+
+    def put(self, key, positions):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # write to a temporary file first, so a cache that is read at the same time never sees a partial entry
+            file, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(file, "wb") as stream:
+                np.save(stream, positions)
+            os.replace(temporary, self.path(key))
+            self.evict()
+        except OSError as error:
+            debug("Could not cache layout: %s", error)
+
+    # removes the least recently used entries until the cache fits into max_bytes
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npy"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            debug("Evicting cached layout %s", path)
+            os.remove(path)
+            total -= size
+
+    def clear(self):
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".npy"):
+                    os.remove(entry.path)
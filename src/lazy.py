@@ -0,0 +1,16 @@
+import importlib
+
+
+# stands in for a module that is slow to import, the module is imported on first attribute access
+# keeps e.g. networkx off the startup path, so the window is shown before it is imported
+class LazyModule:
+    module_name = None
+
+    def __init__(self, module_name):
+        self.module_name = module_name
+
+    # only called for attributes that were not looked up before, found attributes are kept on the instance
+    def __getattr__(self, attribute):
+        value = getattr(importlib.import_module(self.module_name), attribute)
+        setattr(self, attribute, value)
+        return value
@@ -1,24 +1,41 @@
+import argparse
+import os
+
 from window import Window
 from graph import Graph
+import graph_io
 from debug import setup_debug, debug
 
 
 # main function
 def main():
-    setup_debug()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("file", nargs="?", help="graph file to open, a .tgraph, .graphml or .gml file or an edge list")
+    parser.add_argument("-o", "--output", help="save the graph to this file, the format is chosen by its extension, and exit")
+    parser.add_argument("--memory-budget", type=int, default=512, metavar="MB",
+                        help="memory for open graphs above which the derived data of inactive tabs is evicted")
+    args = setup_debug(parser)
 
     debug("Starting...")
 
+    if args.output is not None:
+        if args.file is None:
+            parser.error("--output needs a graph file to convert")
+        graph_io.save(graph_io.load(args.file), args.output)
+        return
+
     # setup window
-    window = Window("Tarvos Graph Visualizer", 800, 600)
+    window = Window("Tarvos Graph Visualizer", 800, 600, memory_budget=args.memory_budget*1024*1024)
 
     # setup graph
-    debug("Setting up default graph...")
-    default_graph = Graph.new_complete_graph(5)
-    window.set_current_graph(default_graph)
-
-    # draw graph, properties have already been calculated in init of graph
-    window.update_graph(recalculate_properties=False)
+    if args.file is not None:
+        window.open_tab(graph_io.load(args.file), os.path.basename(args.file))
+    else:
+        debug("Setting up default graph...")
+        window.open_tab(Graph.new_complete_graph(5), "K5")
+
+    # draw graph, the properties are evaluated after the first frame is shown
+    window.draw_first_frame()
 
     # display window
     window.display()
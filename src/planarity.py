@@ -0,0 +1,76 @@
+from lazy import LazyModule
+from debug import debug
+
+nx = LazyModule("networkx") # graph library
+
+
+# keeps the result of one planarity test of a graph up to date while nodes and edges are added
+# a planar graph keeps its embedding, which is also used for the planar layout
+# a non planar graph keeps its kuratowski subgraph, which stays a certificate when more edges are added
+class Planarity:
+    known = False # whether the result belongs to the current graph, a full test is needed otherwise
+    planar = None
+    embedding = None # nx.PlanarEmbedding of the graph if it is planar
+    counterexample = None # kuratowski subgraph of the graph if it is not planar
+
+    def __init__(self):
+        self.invalidate()
+
+    def invalidate(self):
+        self.known = False
+        self.planar = None
+        self.embedding = None
+        self.counterexample = None
+
+    # result is the return value of test(), possibly computed in a worker for a snapshot of the graph
+    def set_result(self, result):
+        self.planar, certificate = result
+        self.known = True
+        self.embedding = certificate if self.planar else None
+        self.counterexample = None if self.planar else certificate
+
+    def node_added(self, name):
+        if self.embedding is not None:
+            self.embedding.add_node(name) # an isolated node does not change planarity
+
+    # updates the result for a new edge, returns False if the graph has to be tested again
+    # same_component tells whether the endpoints were connected before the edge was added
+    def edge_added(self, name1, name2, same_component):
+        if not self.known:
+            return False
+        if not self.planar: # adding edges never makes a non planar graph planar
+            return True
+        if name1 == name2: # self loops are not part of the embedding and do not change planarity
+            return True
+        if not same_component: # a bridge between two components can be drawn without crossings
+            self.embedding.connect_components(name1, name2)
+            return True
+        if self.insert_into_shared_face(name1, name2):
+            return True
+        debug("Endpoints do not share a face, planarity has to be tested again")
+        self.invalidate()
+        return False
+
+    # inserts the edge into a face that contains both endpoints, if the current embedding has one
+    # faces are traversed from the endpoint with fewer neighbors, this is much cheaper than a new test for sparse graphs
+    def insert_into_shared_face(self, name1, name2):
+        embedding = self.embedding
+        if embedding.out_degree(name1) > embedding.out_degree(name2):
+            name1, name2 = name2, name1
+        for neighbor in list(embedding.neighbors(name1)):
+            # the face right of the half edge name1 -> neighbor, it enters name1 from its last node
+            face = embedding.traverse_face(name1, neighbor)
+            if name2 not in face:
+                continue
+            index = face.index(name2)
+            # next_face_half_edge leaves a node counterclockwise of the half edge it came from,
+            # so the new half edges go counterclockwise next to the ones pointing back along the face
+            embedding.add_half_edge_ccw(name1, name2, face[-1])
+            embedding.add_half_edge_ccw(name2, name1, face[index - 1])
+            return True
+        return False
+
+
+# full planarity test, returns (planar, embedding or kuratowski subgraph)
+def test(nx_graph):
+    return nx.check_planarity(nx_graph, counterexample=True)
@@ -0,0 +1,492 @@
+import numpy as np
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import time
+
+from lazy import LazyModule
+from debug import debug
+import planarity
+from planarity import Planarity
+
+nx = LazyModule("networkx") # graph library
+multiprocessing = LazyModule("multiprocessing") # only needed once a graph is large enough for worker processes
+process_futures = LazyModule("concurrent.futures.process")
+
+
+# union-find over node names that also tracks the parity of each node relative to its root
+# parity is used to detect odd cycles, which tells us whether the graph is still bipartite
+class DisjointSet:
+    parent = {}
+    rank = {}
+    parity = {} # parity of the path from a node to its parent
+    components = 0
+
+    def __init__(self):
+        self.parent = {}
+        self.rank = {}
+        self.parity = {}
+        self.components = 0
+
+    def add(self, item):
+        if item in self.parent:
+            return
+        self.parent[item] = item
+        self.rank[item] = 0
+        self.parity[item] = 0
+        self.components += 1
+
+    # returns the root of item and the parity of item relative to it, compresses the path on the way
+    def find(self, item):
+        path = []
+        while self.parent[item] != item:
+            path.append(item)
+            item = self.parent[item]
+        root = item
+        # walk back from the node closest to the root to accumulate parities
+        parity = 0
+        for node in reversed(path):
+            parity ^= self.parity[node]
+            self.parity[node] = parity
+            self.parent[node] = root
+        if path:
+            return root, self.parity[path[0]]
+        return root, 0
+
+    # joins the sets of item1 and item2 so that they have different parities
+    # returns False if they already were in the same set with the same parity (odd cycle)
+    def union(self, item1, item2):
+        root1, parity1 = self.find(item1)
+        root2, parity2 = self.find(item2)
+        if root1 == root2:
+            return parity1 != parity2
+        if self.rank[root1] < self.rank[root2]:
+            root1, root2 = root2, root1
+        self.parent[root2] = root1
+        self.parity[root2] = parity1 ^ parity2 ^ 1
+        if self.rank[root1] == self.rank[root2]:
+            self.rank[root1] += 1
+        self.components -= 1
+        return True
+
+
+# cost classes of properties
+CHEAP = 0 # derived from counts, shown immediately
+LINEAR = 1 # needs a pass over the graph, kept up to date incrementally for undirected graphs where possible
+EXPENSIVE = 2 # e.g. the planarity test, only computed on request for large graphs, see PropertyTracker.on_demand_threshold
+
+on_request = "click to compute" # value of expensive properties of large graphs that were not requested yet
+seconds_per_operation = 1e-6 # rough cost of one step of a networkx algorithm, used to turn complexities into times
+
+
+# a property that is displayed in the sidebar
+# complexity estimates the number of operations of evaluate for a graph with the given number of nodes and edges
+# evaluate computes the value from a networkx graph, it has to be a module level function so it can be sent to worker processes
+class Property:
+    name = None
+    cost = CHEAP
+    complexity = None
+    evaluate = None
+
+    def __init__(self, name, cost, complexity, evaluate):
+        self.name = name
+        self.cost = cost
+        self.complexity = complexity
+        self.evaluate = evaluate
+
+    # estimated time in seconds to evaluate the property
+    def estimate(self, nodes, edges):
+        return self.complexity(nodes, edges)*seconds_per_operation
+
+
+registry = {} # registered properties by name, in the order they are displayed
+
+
+# registers a property, it is displayed for all graphs created afterwards
+def register_property(name, cost, complexity, evaluate):
+    registry[name] = Property(name, cost, complexity, evaluate)
+
+
+# keeps the properties of a graph up to date while nodes and edges are added
+# cheap properties are maintained in O(1) amortized per change, the others are marked dirty
+# dirty properties are evaluated cheapest first, small ones within the time budget of a frame, see evaluate_within()
+class PropertyTracker:
+    graph = None
+    values = {} # current values of the properties, in display order
+    dirty = set() # names of properties which have to be recomputed
+    requested = set() # names of expensive properties the user asked for, they are computed for graphs of any size
+    planarity = None # result of the planarity test, shared by the planar property and the planar layout
+    on_demand_threshold = 50_000 # number of nodes plus edges above which expensive properties are only computed on request
+    node_bytes = 125 # estimated memory of the counters of a node, see estimated_bytes
+    certificate_bytes = 900 # estimated memory per node and edge of a planar embedding or kuratowski subgraph
+
+    # properties kept up to date by update_cheap() for undirected graphs, only the counts are kept for directed graphs
+    incremental = ("nodes", "edges", "density", "empty", "directed", "connected", "bipartite", "tree", "forest",
+                   "eulerian", "regular")
+    counted = ("nodes", "edges", "density", "empty", "directed")
+
+    def __init__(self, graph):
+        self.requested = set()
+        self.reset(graph)
+
+    # rough estimate of the memory held by the tracker, used to decide which graphs to evict from memory
+    # the planarity certificate is by far the largest part once it was computed
+    def estimated_bytes(self):
+        size = self.number_of_nodes*self.node_bytes
+        certificate = self.planarity.embedding if self.planarity.embedding is not None else self.planarity.counterexample
+        if certificate is not None:
+            size += (certificate.number_of_nodes() + certificate.number_of_edges())*self.certificate_bytes
+        return size
+
+    # recomputes all properties from scratch, O(V+E), all properties that are not maintained are marked dirty
+    def reset(self, graph):
+        self.graph = graph
+        self.values = {name: None for name in registry}
+        self.dirty = set()
+        self.planarity = Planarity()
+        endpoints = graph.edge_node_indices()
+        self.number_of_nodes = graph.node_count
+        self.number_of_edges = len(endpoints)
+        if graph.directed:
+            # incremental tracking is only implemented for undirected graphs
+            self.update_counts()
+            self.mark_unmaintained_dirty()
+            return
+        self.degrees = dict(zip(graph.names, np.bincount(endpoints.ravel(), minlength=graph.node_count).tolist()))
+        self.degree_histogram = Counter(self.degrees.values())
+        self.odd_degrees = sum(1 for degree in self.degrees.values() if degree % 2 == 1)
+        self.components = DisjointSet()
+        self.bipartite = True
+        for node in graph.names:
+            self.components.add(node)
+        for node1, node2 in graph.edge_names():
+            if not self.components.union(node1, node2):
+                self.bipartite = False
+        self.update_cheap()
+        self.mark_unmaintained_dirty()
+
+    def node_added(self, name):
+        self.number_of_nodes += 1
+        if self.graph.directed:
+            self.update_counts()
+            self.mark_unmaintained_dirty()
+            return
+        self.degrees[name] = 0
+        self.degree_histogram[0] += 1
+        self.components.add(name)
+        self.planarity.node_added(name)
+        self.update_cheap()
+        self.mark_unmaintained_dirty(keep=("planar",))
+
+    def edge_added(self, name1, name2):
+        self.number_of_edges += 1
+        if self.graph.directed:
+            self.update_counts()
+            self.mark_unmaintained_dirty()
+            return
+        for name in (name1, name2): # a self loop adds two to the degree of its node
+            degree = self.degrees[name]
+            self.degree_histogram[degree] -= 1
+            if self.degree_histogram[degree] == 0:
+                del self.degree_histogram[degree]
+            self.degree_histogram[degree + 1] += 1
+            self.degrees[name] = degree + 1
+            self.odd_degrees += 1 if degree % 2 == 0 else -1
+        same_component = self.components.find(name1)[0] == self.components.find(name2)[0]
+        if not self.components.union(name1, name2):
+            self.bipartite = False
+        self.update_cheap()
+        if self.planarity.edge_added(name1, name2, same_component):
+            self.mark_unmaintained_dirty(keep=("planar",))
+        else:
+            self.mark_unmaintained_dirty()
+
+    # updates the properties that only depend on the number of nodes and edges
+    def update_counts(self):
+        n = self.number_of_nodes
+        m = self.number_of_edges
+        pairs = n*(n - 1) if self.graph.directed else n*(n - 1)/2
+        self.values["nodes"] = n
+        self.values["edges"] = m
+        self.values["density"] = 0 if n <= 1 else m/pairs
+        self.values["empty"] = m == 0
+        self.values["directed"] = self.graph.directed
+
+    # updates all properties that are derived from the incrementally maintained counters
+    def update_cheap(self):
+        self.update_counts()
+        n = self.number_of_nodes
+        m = self.number_of_edges
+        components = self.components.components
+        self.values["bipartite"] = self.bipartite
+        if n == 0: # these properties are undefined for the null graph
+            self.values["connected"] = "undefined"
+            self.values["tree"] = "undefined"
+            self.values["forest"] = "undefined"
+            self.values["eulerian"] = "undefined"
+            self.values["regular"] = "undefined"
+            return
+        connected = components == 1
+        self.values["connected"] = connected
+        self.values["tree"] = connected and m == n - 1
+        self.values["forest"] = m == n - components
+        self.values["eulerian"] = connected and self.odd_degrees == 0
+        self.values["regular"] = len(self.degree_histogram) == 1
+
+    # marks all properties dirty that are not kept up to date, except for the ones in keep
+    def mark_unmaintained_dirty(self, keep=()):
+        maintained = self.counted if self.graph.directed else self.incremental
+        for name in registry:
+            if name not in maintained and name not in keep:
+                self.mark_dirty(name)
+
+    # marks a property as dirty, it is displayed as being computed until a new value is set
+    # expensive properties of large graphs are not computed unless they were requested, see request()
+    def mark_dirty(self, name):
+        if registry[name].cost >= EXPENSIVE and name not in self.requested and self.size() > self.on_demand_threshold:
+            self.dirty.discard(name)
+            self.values[name] = on_request
+            return
+        self.dirty.add(name)
+        self.values[name] = "computing..."
+
+    # computes an expensive property for a large graph from now on, also after the graph changes
+    def request(self, name):
+        self.requested.add(name)
+        if self.values.get(name) == on_request:
+            self.mark_dirty(name)
+
+    def size(self):
+        return self.number_of_nodes + self.number_of_edges
+
+    def set_value(self, name, value):
+        if name == "planar" and isinstance(value, tuple): # the result of the planarity test including its certificate
+            self.planarity.set_result(value)
+            value = self.planarity.planar
+        self.values[name] = value
+        self.dirty.discard(name)
+
+    # estimated time in seconds to evaluate the property for the current graph
+    def estimate(self, name):
+        return registry[name].estimate(self.number_of_nodes, self.number_of_edges)
+
+    # result of the planarity test of the current graph, tests the graph now if the result is outdated
+    def planarity_result(self):
+        if not self.planarity.known:
+            self.set_value("planar", evaluate_property("planar", self.graph.to_networkx()))
+        return self.planarity
+
+    # evaluates dirty properties on the calling thread, cheapest first, as long as their estimates fit into budget seconds
+    # the networkx graph is only built if a property is evaluated, its cost is accounted for like that of a property
+    # returns the names of the dirty properties that do not fit into budget at all, they are left for a PropertyEvaluator
+    def evaluate_within(self, budget):
+        conversion = self.size()*seconds_per_operation
+        deadline = time.perf_counter() + budget
+        nx_graph = None
+        for name in sorted(self.dirty, key=self.estimate):
+            estimate = self.estimate(name) + (conversion if nx_graph is None else 0)
+            if time.perf_counter() + estimate > deadline:
+                break
+            if nx_graph is None:
+                nx_graph = self.graph.to_networkx()
+            self.set_value(name, evaluate_property(name, nx_graph))
+        return [name for name in sorted(self.dirty, key=self.estimate) if self.estimate(name) + conversion > budget]
+
+    # recomputes the dirty properties synchronously, does nothing if no property is dirty
+    def refresh(self):
+        if not self.dirty:
+            return
+        debug("Recomputing dirty properties: %s", self.dirty)
+        nx_graph = self.graph.to_networkx()
+        for name in list(self.dirty):
+            self.set_value(name, evaluate_property(name, nx_graph))
+
+
+def evaluate_property(name, nx_graph):
+    if name not in registry:
+        raise ValueError("Unknown property: " + str(name))
+    return registry[name].evaluate(nx_graph)
+
+
+# evaluates dirty properties in a worker pool so the ui stays responsive
+# results are tagged with the key they were submitted with, so results of outdated graph versions can be discarded
+class PropertyEvaluator:
+    process_threshold = 5000 # number of nodes plus edges above which worker processes are used instead of threads
+    thread_pool = None
+    process_pool = None
+    key = None # key of the most recent submission
+    submitted = set() # names of the properties submitted with key
+    futures = []
+    outstanding = set() # futures whose results have not been put into the results queue yet
+    results = None # queue of (key, name, value) tuples of finished evaluations
+
+    def __init__(self, max_workers=2):
+        self.max_workers = max_workers
+        self.thread_pool = ThreadPoolExecutor(max_workers=max_workers)
+        self.process_pool = None # only started once a large graph needs it
+        self.key = None
+        self.submitted = set()
+        self.futures = []
+        self.outstanding = set()
+        self.results = queue.Queue()
+
+    # names of the properties that were not submitted with key yet
+    def unsubmitted(self, key, names):
+        if key != self.key:
+            return list(names)
+        return [name for name in names if name not in self.submitted]
+
+    # submits the evaluation of the named properties
+    # a new key supersedes all work of earlier submissions, properties that were already submitted with key are skipped
+    def submit(self, key, nx_graph, names):
+        names = self.unsubmitted(key, names)
+        if key != self.key:
+            self.cancel()
+            self.key = key
+        # nx_graph has to be a snapshot, e.g. from Graph.to_networkx(), the graph may be changed on the main thread
+        snapshot = nx_graph
+        if len(snapshot) + snapshot.number_of_edges() > self.process_threshold:
+            pool = self.get_process_pool()
+        else:
+            pool = self.thread_pool
+        debug("Submitting evaluation of properties %s for %s", names, key)
+        for name in names:
+            # the function is submitted instead of its name, worker processes do not know properties registered at runtime
+            future = pool.submit(registry[name].evaluate, snapshot)
+            self.futures.append(future)
+            self.outstanding.add(future)
+            self.submitted.add(name)
+            future.add_done_callback(lambda future, name=name: self.finished(key, name, future))
+
+    def get_process_pool(self):
+        if self.process_pool is None:
+            # spawn instead of fork, forking a process with a running tk interpreter is not safe
+            context = multiprocessing.get_context("spawn")
+            self.process_pool = process_futures.ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+        return self.process_pool
+
+    # called in the worker thread (or the thread cancelling the future) when an evaluation is done
+    def finished(self, key, name, future):
+        if not future.cancelled():
+            try:
+                value = future.result()
+            except Exception as exception:
+                debug("Evaluation of property %s failed: %s", name, exception)
+                value = "error"
+            self.results.put((key, name, value))
+        self.outstanding.discard(future)
+
+    # cancels all evaluations that have not started yet, running ones are discarded once they finish
+    def cancel(self):
+        for future in self.futures:
+            future.cancel()
+        self.futures = []
+        self.submitted = set()
+        self.key = None
+
+    def busy(self):
+        return len(self.outstanding) > 0 or not self.results.empty()
+
+    # returns all finished results of the most recent submission, results of earlier submissions are dropped
+    def poll(self):
+        results = []
+        while True:
+            try:
+                key, name, value = self.results.get_nowait()
+            except queue.Empty:
+                return results
+            if key != self.key:
+                debug("Discarding stale result of property %s for %s", name, key)
+                continue
+            results.append((name, value))
+
+    def shutdown(self):
+        self.cancel()
+        self.thread_pool.shutdown(wait=False, cancel_futures=True)
+        if self.process_pool is not None:
+            self.process_pool.shutdown(wait=False, cancel_futures=True)
+
+
+# calculates all properties of a graph from scratch
+def full_properties(nx_graph):
+    return {name: evaluate_property(name, nx_graph) for name in registry}
+
+
+# evaluation functions of the built in properties
+# connectivity and the properties derived from it are undefined for the null graph
+
+def is_connected(nx_graph):
+    if len(nx_graph) == 0:
+        return "undefined"
+    if nx_graph.is_directed():
+        return nx.is_weakly_connected(nx_graph)
+    return nx.is_connected(nx_graph)
+
+
+def is_tree(nx_graph):
+    if len(nx_graph) == 0:
+        return "undefined"
+    return nx.is_tree(nx_graph)
+
+
+def is_forest(nx_graph):
+    if len(nx_graph) == 0:
+        return "undefined"
+    return nx.is_forest(nx_graph)
+
+
+# eulerian describes whether a path exists that visits each edge exactly once
+def is_eulerian(nx_graph):
+    if len(nx_graph) == 0:
+        return "undefined"
+    return nx.is_eulerian(nx_graph)
+
+
+def is_regular(nx_graph):
+    if len(nx_graph) == 0:
+        return "undefined"
+    return nx.is_regular(nx_graph)
+
+
+# the networkx functions are wrapped so registering them does not import networkx
+
+def number_of_nodes(nx_graph):
+    return nx_graph.number_of_nodes()
+
+
+def number_of_edges(nx_graph):
+    return nx_graph.number_of_edges()
+
+
+def density(nx_graph):
+    return nx.density(nx_graph)
+
+
+def is_empty(nx_graph):
+    return nx.is_empty(nx_graph)
+
+
+def is_directed(nx_graph):
+    return nx_graph.is_directed()
+
+
+def is_bipartite(nx_graph):
+    return nx.is_bipartite(nx_graph)
+
+
+def linear(nodes, edges):
+    return nodes + edges
+
+
+register_property("nodes", CHEAP, linear, number_of_nodes)
+register_property("edges", CHEAP, linear, number_of_edges)
+register_property("density", CHEAP, linear, density)
+register_property("planar", EXPENSIVE, lambda nodes, edges: 50*(nodes + edges), planarity.test)
+register_property("empty", CHEAP, linear, is_empty)
+register_property("connected", LINEAR, linear, is_connected)
+register_property("directed", CHEAP, linear, is_directed)
+register_property("bipartite", LINEAR, linear, is_bipartite)
+register_property("tree", LINEAR, linear, is_tree)
+register_property("forest", LINEAR, linear, is_forest)
+register_property("eulerian", LINEAR, linear, is_eulerian)
+register_property("regular", LINEAR, linear, is_regular)
@@ -0,0 +1,179 @@
+from array import array
+import json
+
+import numpy as np
+
+from debug import debug
+
+# attributes that are recorded, changes are stored with these codes
+NODE_COLOR = 0
+NODE_SELECTED = 1
+EDGE_COLOR = 2
+EDGE_WEIGHT = 3
+
+
+# records the changes an algorithm makes to the nodes and edges of a graph at every step
+# every step is stored as a compact delta of (attribute, index, old value, new value) entries, values are interned
+# keyframes with the complete state are taken periodically, so any step can be reached by applying a few deltas
+# the number of keyframes is bounded by increasing the distance between them, so memory grows only with the deltas
+class Trace:
+    graph = None
+    values = [] # interned values, deltas refer to them by index
+    value_ids = {} # maps values to their index in values
+    changes = None # flat array of (attribute, index, old value id, new value id) entries of all steps
+    offsets = None # offsets[i] is the start of the changes of step i in changes, one more entry than steps
+    pending = {} # changes of the current step, maps (attribute, index) to [old value id, new value id]
+    keyframes = {} # maps steps to snapshots of the state at that step
+    keyframe_interval = 64 # number of steps between keyframes
+    max_keyframes = 64
+    position = 0 # step whose state the graph currently shows
+    replaying = False # whether changes are being applied by the trace itself and should not be recorded
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.values = []
+        self.value_ids = {}
+        self.changes = array("i")
+        self.offsets = array("q", [0])
+        self.pending = {}
+        self.keyframes = {0: self.snapshot()}
+        self.position = 0
+
+    # number of recorded steps, the graph can show any step from 0 to length
+    def length(self):
+        return len(self.offsets) - 1
+
+    def at_head(self):
+        return self.position == self.length()
+
+    def value_id(self, value):
+        key = (type(value).__name__, value) # keeps e.g. 1 and True apart
+        value_id = self.value_ids.get(key)
+        if value_id is None:
+            value_id = len(self.values)
+            self.values.append(value)
+            self.value_ids[key] = value_id
+        return value_id
+
+    # called by the graph when a recorded attribute changes
+    def record(self, attribute, index, old, new):
+        if self.replaying:
+            return
+        entry = self.pending.get((attribute, index))
+        if entry is None:
+            self.pending[(attribute, index)] = [self.value_id(old), self.value_id(new)]
+        else: # only the first old and the last new value of a step are needed
+            entry[1] = self.value_id(new)
+
+    # stores the changes since the last call as a new step, called by the algorithm at every pause
+    def end_step(self):
+        for (attribute, index), (old, new) in self.pending.items():
+            if old != new:
+                self.changes.extend((attribute, index, old, new))
+        self.pending = {}
+        self.offsets.append(len(self.changes))
+        self.position = self.length()
+        if self.position % self.keyframe_interval == 0:
+            self.keyframes[self.position] = self.snapshot()
+            if len(self.keyframes) > self.max_keyframes:
+                self.thin_keyframes()
+
+    # doubles the distance between keyframes and drops the ones in between
+    def thin_keyframes(self):
+        self.keyframe_interval *= 2
+        debug("Increasing trace keyframe interval to %s", self.keyframe_interval)
+        self.keyframes = {step: keyframe for step, keyframe in self.keyframes.items() if step % self.keyframe_interval == 0}
+
+    # the complete recorded state of the graph as arrays of value ids
+    def snapshot(self):
+        return {NODE_COLOR: np.array([self.value_id(node.color) for node in self.graph.nodes], dtype=np.int32),
+                NODE_SELECTED: np.array([self.value_id(node.selected) for node in self.graph.nodes], dtype=np.int32),
+                EDGE_COLOR: np.array([self.value_id(edge.color) for edge in self.graph.edges], dtype=np.int32),
+                EDGE_WEIGHT: np.array([self.value_id(edge.weight) for edge in self.graph.edges], dtype=np.int32)}
+
+    def set_value(self, attribute, index, value_id):
+        value = self.values[value_id]
+        if attribute == NODE_COLOR:
+            self.graph.nodes[index].color = value
+        elif attribute == NODE_SELECTED:
+            self.graph.nodes[index].selected = value
+        elif attribute == EDGE_COLOR:
+            self.graph.edges[index].color = value
+        elif attribute == EDGE_WEIGHT:
+            self.graph.edges[index].weight = value
+
+    # applies the changes of a step to the graph, backwards undoes them
+    def apply_step(self, step, backwards=False):
+        start = self.offsets[step]
+        end = self.offsets[step + 1]
+        entries = range(start, end, 4)
+        if backwards:
+            entries = reversed(entries)
+        for entry in entries:
+            attribute, index, old, new = self.changes[entry:entry + 4]
+            self.set_value(attribute, index, old if backwards else new)
+
+    def restore(self, keyframe):
+        for attribute, value_ids in keyframe.items():
+            for index, value_id in enumerate(value_ids.tolist()):
+                self.set_value(attribute, index, value_id)
+
+    # shows the state of the graph at the given step, starting from the closest keyframe if that is cheaper
+    def seek(self, step):
+        step = max(0, min(step, self.length()))
+        self.replaying = True
+        try:
+            keyframe_step = step - step % self.keyframe_interval
+            if keyframe_step in self.keyframes and abs(step - self.position) > step - keyframe_step:
+                self.restore(self.keyframes[keyframe_step])
+                self.position = keyframe_step
+            while self.position < step:
+                self.apply_step(self.position)
+                self.position += 1
+            while self.position > step:
+                self.position -= 1
+                self.apply_step(self.position, backwards=True)
+        finally:
+            self.replaying = False
+
+    def step_back(self):
+        self.seek(self.position - 1)
+
+    def step_forward(self):
+        self.seek(self.position + 1)
+
+    # saves the trace to a file, it can be replayed on the same graph without running the algorithm
+    def save(self, path):
+        with open(path, "wb") as file:
+            np.savez_compressed(file,
+                                values=np.array(json.dumps(self.values)),
+                                changes=np.frombuffer(self.changes, dtype=np.int32),
+                                offsets=np.frombuffer(self.offsets, dtype=np.int64),
+                                **{"initial_" + str(attribute): value_ids for attribute, value_ids in self.keyframes[0].items()})
+
+    # loads a trace saved with save() for replaying it on graph, which is reset to the initial state of the trace
+    @staticmethod
+    def load(path, graph):
+        data = np.load(path)
+        if len(data["initial_" + str(NODE_COLOR)]) != len(graph.nodes) or len(data["initial_" + str(EDGE_COLOR)]) != len(graph.edges):
+            raise ValueError("Trace was recorded on a graph with a different number of nodes or edges")
+        trace = Trace(graph)
+        trace.values = []
+        trace.value_ids = {}
+        for value in json.loads(str(data["values"])):
+            trace.value_id(value)
+        trace.changes = array("i", data["changes"].tobytes())
+        trace.offsets = array("q", data["offsets"].tobytes())
+        trace.keyframes = {0: {attribute: data["initial_" + str(attribute)] for attribute in (NODE_COLOR, NODE_SELECTED, EDGE_COLOR, EDGE_WEIGHT)}}
+        trace.replaying = True
+        trace.restore(trace.keyframes[0])
+        trace.replaying = False
+        trace.position = 0
+        # keyframes of the saved run are recreated by replaying it once
+        trace.keyframe_interval = max(64, trace.length()//trace.max_keyframes + 1)
+        for step in range(trace.keyframe_interval, trace.length() + 1, trace.keyframe_interval):
+            trace.seek(step)
+            trace.keyframes[step] = trace.snapshot()
+        trace.seek(0)
+        debug("Loaded trace with %s steps from %s", trace.length(), path)
+        return trace
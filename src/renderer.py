@@ -0,0 +1,399 @@
+import itertools
+
+import numpy as np
+
+from debug import debug, timed
+
+
+# level of detail used for drawing, chosen per frame from the number of visible nodes and edges
+class DetailLevel:
+    name = ""
+    show_labels = True # whether node names are drawn
+    show_weights = True # whether edge weights are drawn
+    point_radius = None # radius of nodes drawn as points, None to draw nodes with their own radius
+
+    def __init__(self, name, show_labels, show_weights, point_radius=None):
+        self.name = name
+        self.show_labels = show_labels
+        self.show_weights = show_weights
+        self.point_radius = point_radius
+
+FULL_DETAIL = DetailLevel("full", True, True)
+NO_WEIGHTS = DetailLevel("no weights", True, False)
+NO_LABELS = DetailLevel("no labels", False, False)
+POINTS = DetailLevel("points", False, False, point_radius=3)
+
+
+# draws a graph on the canvas of a window in retained mode
+# every node and edge gets its canvas items once, afterwards only the items of changed nodes and edges are updated
+# canvas coordinates are computed for all updated nodes and edges at once from the position array of the graph
+# items are only created for nodes and edges inside the visible part of the canvas, items outside of it are hidden
+# several renderers can share a canvas, e.g. one per tab, all their items carry their own tag
+class Renderer:
+    window = None
+    canvas = None
+    graph = None # graph whose items are currently on the canvas
+    tag = "graph" # tag of all items of this renderer
+    node_tag = "graph-node" # tag of the node items of this renderer, their bindings are per renderer
+
+    node_items = {} # maps Node to (circle, label) item ids
+    edge_items = {} # maps Edge to a list of line item ids
+    weight_items = {} # maps Edge to the item id of its weight label
+    item_entities = {} # maps item ids to the Node or Edge they belong to
+    node_shown = None # boolean array, whether the node with that index has visible items
+    edge_shown = None # boolean array, whether the edge with that index has visible items
+    invalid = True # whether all items have to be updated, e.g. after resizing the canvas
+    detail = FULL_DETAIL # current level of detail
+    stats = {} # item counts of the last frame
+
+    weight_offset = 15 # distance of weight labels from the middle of their edge in pixels
+    cull_margin = 30 # pixels outside of the canvas in which nodes and edges are still drawn
+    label_limit = 300 # maximum number of visible nodes for which labels are drawn
+    label_spacing = 40 # minimum average distance between visible nodes in pixels for which labels are drawn
+    weight_limit = 300 # maximum number of visible edges for which weights are drawn
+    point_limit = 2000 # number of visible nodes above which nodes are drawn as points
+    point_spacing = 12 # average distance between visible nodes in pixels below which nodes are drawn as points
+    item_bytes = 400 # estimated memory of a canvas item and its entries in the item dicts, see cache_bytes
+    ids = itertools.count(1) # source of the numbers in the tags of new renderers
+
+    def __init__(self, window):
+        self.window = window
+        self.canvas = window.canvas
+        self.tag = "graph%d" % next(Renderer.ids)
+        self.node_tag = self.tag + "-node"
+        self.clear()
+        # a single dispatcher for all node items replaces per item bindings
+        self.canvas.tag_bind(self.node_tag, "<ButtonPress-1>", self.handle_node_press)
+        self.canvas.tag_bind(self.node_tag, "<ButtonRelease-1>", self.handle_node_release)
+
+    # marks all items as outdated, used when the mapping from the unit square to the canvas changes without
+    # apply_zoom or apply_pan being called
+    def invalidate(self):
+        self.invalid = True
+
+    # the items of this renderer among all items with the given tag
+    def scoped(self, tag):
+        return tag + "&&" + self.tag
+
+    # hides all items without deleting them, e.g. when the tab of the graph is left
+    # the items are reused when the graph is rendered again, its view may have changed in the meantime
+    def hide(self):
+        self.canvas.itemconfigure(self.tag, state="hidden")
+        self.node_shown[:] = False
+        self.edge_shown[:] = False
+        self.invalid = True
+
+    # estimated memory used by the items of this renderer, they are dropped by clear()
+    def cache_bytes(self):
+        return len(self.item_entities)*self.item_bytes + self.node_shown.nbytes + self.edge_shown.nbytes
+
+    # radius nodes are drawn with at the current level of detail, also used for hit testing
+    def node_radius(self, node):
+        if self.detail.point_radius is not None:
+            return self.detail.point_radius
+        return node.radius
+
+    # zooms the existing items by factor around the canvas point (x, y), the view has to be zoomed already
+    # lines and texts are scaled by tk in one call each, only visible circles are moved one by one to keep their radius
+    # hidden circles are moved once they become visible again
+    def apply_zoom(self, factor, x, y):
+        if self.graph is None:
+            return
+        for tag in ("edge", "label", "weight"):
+            self.canvas.scale(self.scoped(tag), x, y, factor, factor)
+        nodes = [self.graph.nodes[index] for index in np.flatnonzero(self.node_shown)]
+        if not nodes:
+            return
+        boxes = self.node_boxes(nodes, self.canvas_positions(nodes))
+        for node, box in zip(nodes, boxes.tolist()):
+            self.canvas.coords(self.node_items[node][0], *box)
+
+    # moves all items by (dx, dy) pixels, the view has to be panned already
+    def apply_pan(self, dx, dy):
+        self.canvas.move(self.tag, dx, dy)
+
+    # places the weight labels exactly, scaling them with the edges also scales their distance to the edge
+    def update_weights(self):
+        edges = [edge for edge in self.weight_items if self.edge_shown[edge.index]]
+        if not edges or not self.detail.show_weights:
+            return
+        start, end = self.canvas_endpoints(edges)
+        self.place_weights(edges, start, end)
+
+    # brings the canvas up to date with the graph
+    @timed("render/frame")
+    def render(self, graph):
+        if graph is not self.graph:
+            self.clear()
+            self.graph = graph
+        self.node_shown = resize(self.node_shown, len(graph.nodes))
+        self.edge_shown = resize(self.edge_shown, len(graph.edges))
+        dirty_nodes, dirty_edges = graph.take_dirty()
+
+        # find the visible nodes and edges
+        x1, y1, x2, y2 = self.window.view.visible_rect(self.cull_margin)
+        positions = graph.node_positions()
+        node_visible = (positions[:, 0] >= x1) & (positions[:, 0] <= x2) & (positions[:, 1] >= y1) & (positions[:, 1] <= y2)
+        endpoints = graph.edge_node_indices()
+        start = positions[endpoints[:, 0]]
+        end = positions[endpoints[:, 1]]
+        # an edge is drawn if its bounding box intersects the visible rectangle
+        edge_visible = ((np.minimum(start[:, 0], end[:, 0]) <= x2) & (np.maximum(start[:, 0], end[:, 0]) >= x1)
+                        & (np.minimum(start[:, 1], end[:, 1]) <= y2) & (np.maximum(start[:, 1], end[:, 1]) >= y1))
+        self.set_detail(self.choose_detail(int(node_visible.sum()), int(edge_visible.sum())), node_visible)
+
+        # decide which items have to be shown, hidden or updated
+        shown_nodes = node_visible & ~self.node_shown
+        hidden_nodes = ~node_visible & self.node_shown
+        shown_edges = edge_visible & ~self.edge_shown
+        hidden_edges = ~edge_visible & self.edge_shown
+        if self.invalid:
+            updated_nodes = node_visible.copy()
+            updated_edges = edge_visible.copy()
+            self.invalid = False
+        else:
+            updated_nodes = shown_nodes.copy()
+            updated_edges = shown_edges.copy()
+            for node in dirty_nodes:
+                updated_nodes[node.index] = True
+                # edges need new coordinates if one of their nodes moved
+                for edge in graph.incident_edges(node):
+                    updated_edges[edge.index] = True
+            for edge in dirty_edges:
+                updated_edges[edge.index] = True
+            updated_nodes &= node_visible
+            updated_edges &= edge_visible
+
+        for index in np.flatnonzero(hidden_edges):
+            self.hide_edge(graph.edges[index])
+        for index in np.flatnonzero(hidden_nodes):
+            self.hide_node(graph.nodes[index])
+        for index in np.flatnonzero(shown_edges):
+            self.show_edge(graph.edges[index])
+        for index in np.flatnonzero(shown_nodes):
+            self.show_node(graph.nodes[index])
+        self.node_shown = node_visible
+        self.edge_shown = edge_visible
+        self.update_edges([graph.edges[index] for index in np.flatnonzero(updated_edges)])
+        self.update_nodes([graph.nodes[index] for index in np.flatnonzero(updated_nodes)])
+
+        self.stats = {"detail": self.detail.name,
+                      "visible nodes": int(node_visible.sum()), "visible edges": int(edge_visible.sum()),
+                      "updated nodes": int(updated_nodes.sum()), "updated edges": int(updated_edges.sum()),
+                      "shown": int(shown_nodes.sum() + shown_edges.sum()), "hidden": int(hidden_nodes.sum() + hidden_edges.sum()),
+                      "items": len(self.item_entities)}
+        debug("Rendered frame: %s", self.stats)
+
+    def choose_detail(self, visible_nodes, visible_edges):
+        return self.detail_for(self.window.view, visible_nodes, visible_edges)
+
+    # chooses the level of detail from the number of visible nodes and edges and their average distance on the canvas
+    # also used for exported images, so they look like the canvas
+    @classmethod
+    def detail_for(cls, view, visible_nodes, visible_edges):
+        spacing = float("inf")
+        if visible_nodes > 0:
+            spacing = (view.width*view.height/visible_nodes)**0.5
+        if visible_nodes > cls.point_limit or spacing < cls.point_spacing:
+            return POINTS
+        if visible_nodes > cls.label_limit or spacing < cls.label_spacing:
+            return NO_LABELS
+        if visible_edges > cls.weight_limit:
+            return NO_WEIGHTS
+        return FULL_DETAIL
+
+    # node_visible is used to only create labels for nodes that stay visible, newly visible nodes get them when shown
+    def set_detail(self, detail, node_visible):
+        if detail is self.detail:
+            return
+        debug("Changing level of detail to %s", detail.name)
+        previous = self.detail
+        self.detail = detail
+        # labels and weights are hidden for all items at once, showing them again is done for visible items only
+        if not detail.show_labels:
+            self.canvas.itemconfigure(self.scoped("label"), state="hidden")
+        if not detail.show_weights:
+            self.canvas.itemconfigure(self.scoped("weight"), state="hidden")
+        if detail.show_labels and not previous.show_labels:
+            for index in np.flatnonzero(self.node_shown & node_visible):
+                self.show_label(self.graph.nodes[index])
+        self.invalid = True # radii and weight labels change
+
+    # removes all items of this renderer from the canvas
+    def clear(self):
+        self.canvas.delete(self.tag)
+        self.node_items = {}
+        self.edge_items = {}
+        self.weight_items = {}
+        self.item_entities = {}
+        self.node_shown = np.zeros(0, dtype=bool)
+        self.edge_shown = np.zeros(0, dtype=bool)
+        self.graph = None
+        self.invalid = True
+        self.stats = {}
+
+    # canvas positions of the given nodes, one row per node
+    def canvas_positions(self, nodes):
+        indices = np.fromiter((node.index for node in nodes), dtype=np.intp, count=len(nodes))
+        return self.window.view.to_canvas_array(self.graph.positions[indices])
+
+    # canvas positions of the start and end nodes of the given edges, one row per edge each
+    def canvas_endpoints(self, edges):
+        indices = np.fromiter((edge.index for edge in edges), dtype=np.intp, count=len(edges))
+        endpoints = self.graph.edge_endpoints[indices]
+        view = self.window.view
+        return view.to_canvas_array(self.graph.positions[endpoints[:, 0]]), view.to_canvas_array(self.graph.positions[endpoints[:, 1]])
+
+    # bounding boxes of the circles of the given nodes, one row of (x1, y1, x2, y2) per node
+    def node_boxes(self, nodes, centers):
+        radii = np.fromiter((self.node_radius(node) for node in nodes), dtype=float, count=len(nodes))[:, np.newaxis]
+        return np.hstack((centers - radii, centers + radii))
+
+    def show_node(self, node):
+        items = self.node_items.get(node)
+        if items is None:
+            circle = self.canvas.create_oval(0, 0, 0, 0, tags=(self.tag, self.node_tag, "node", "circle"))
+            self.node_items[node] = (circle, None)
+            self.item_entities[circle] = node
+        else:
+            self.canvas.itemconfigure(items[0], state="normal")
+        self.show_label(node)
+
+    # labels are only created once they are drawn, so graphs drawn as points do not need a text item per node
+    def show_label(self, node):
+        circle, label = self.node_items[node]
+        if not self.detail.show_labels:
+            if label is not None:
+                self.canvas.itemconfigure(label, state="hidden")
+            return
+        if label is None:
+            label = self.canvas.create_text(0, 0, text=node.name, tags=(self.tag, self.node_tag, "node", "label"))
+            self.node_items[node] = (circle, label)
+            self.item_entities[label] = node
+        else:
+            self.canvas.itemconfigure(label, state="normal")
+
+    def hide_node(self, node):
+        for item in self.node_items[node]:
+            if item is not None:
+                self.canvas.itemconfigure(item, state="hidden")
+
+    def update_nodes(self, nodes):
+        if not nodes:
+            return
+        centers = self.canvas_positions(nodes)
+        boxes = self.node_boxes(nodes, centers)
+        points = self.detail.point_radius is not None
+        for node, box, center in zip(nodes, boxes.tolist(), centers.tolist()):
+            circle, label = self.node_items[node]
+            outline = "black"
+            outline_width = 0 if points else 1
+            if node.selected:
+                outline = "blue"
+                outline_width = 3
+            self.canvas.coords(circle, *box)
+            self.canvas.itemconfigure(circle, fill=node.color, outline=outline, width=outline_width)
+            if label is not None:
+                self.canvas.coords(label, *center)
+
+    def show_edge(self, edge):
+        lines = self.edge_items.get(edge)
+        if lines is None:
+            if edge.directed: # two lines to draw arrow markings at halfway point
+                lines = [self.canvas.create_line(0, 0, 0, 0, arrow="last", tags=(self.tag, "edge")),
+                         self.canvas.create_line(0, 0, 0, 0, tags=(self.tag, "edge"))]
+            else:
+                lines = [self.canvas.create_line(0, 0, 0, 0, tags=(self.tag, "edge"))]
+            for line in lines:
+                self.canvas.tag_lower(line) # edges are drawn below nodes
+                self.item_entities[line] = edge
+            self.edge_items[edge] = lines
+            return
+        for line in lines:
+            self.canvas.itemconfigure(line, state="normal")
+
+    def hide_edge(self, edge):
+        for line in self.edge_items[edge]:
+            self.canvas.itemconfigure(line, state="hidden")
+        label = self.weight_items.get(edge)
+        if label is not None:
+            self.canvas.itemconfigure(label, state="hidden")
+
+    def update_edges(self, edges):
+        if not edges:
+            return
+        start, end = self.canvas_endpoints(edges)
+        middle = (start + end)/2
+        for edge, point1, point2, point3 in zip(edges, start.tolist(), middle.tolist(), end.tolist()):
+            lines = self.edge_items[edge]
+            if edge.directed:
+                self.canvas.coords(lines[0], *point1, *point2)
+                self.canvas.coords(lines[1], *point2, *point3)
+            else:
+                self.canvas.coords(lines[0], *point1, *point3)
+            for line in lines:
+                self.canvas.itemconfigure(line, fill=edge.color)
+        if not self.detail.show_weights:
+            return
+        weighted = [i for i, edge in enumerate(edges) if edge.weight is not None or edge in self.weight_items]
+        if weighted:
+            self.place_weights([edges[i] for i in weighted], start[weighted], end[weighted])
+
+    # places the weight labels of the given edges next to the middle of the edges
+    def place_weights(self, edges, start, end):
+        positions = weight_positions(start, end, self.weight_offset)
+        for edge, position in zip(edges, positions.tolist()):
+            label = self.weight_items.get(edge)
+            if edge.weight is None:
+                if label is not None:
+                    self.canvas.delete(label)
+                    del self.weight_items[edge]
+                    del self.item_entities[label]
+                continue
+            if label is None:
+                label = self.canvas.create_text(0, 0, tags=(self.tag, "weight"))
+                self.weight_items[edge] = label
+                self.item_entities[label] = edge
+            self.canvas.coords(label, *position)
+            self.canvas.itemconfigure(label, text=edge.weight, state="normal")
+
+    # dispatches events on node items to the current tool of the window
+    def handle_node_press(self, event):
+        node = self.current_entity()
+        if node is None:
+            return
+        debug("Node %s pressed", node.name)
+        self.window.current_tool.handle_node_press(self.window, node, event)
+
+    def handle_node_release(self, event):
+        node = self.current_entity()
+        if node is None:
+            return
+        debug("Node %s released", node.name)
+        self.window.current_tool.handle_node_release(self.window, node, event)
+
+    # the entity of the item under the mouse pointer
+    def current_entity(self):
+        items = self.canvas.find_withtag("current")
+        if not items:
+            return None
+        return self.item_entities.get(items[0])
+
+
+# positions of weight labels next to the middle of edges from start to end, offset pixels away from the edge
+def weight_positions(start, end, offset):
+    vector = end - start
+    length = np.hypot(vector[:, 0], vector[:, 1])[:, np.newaxis]
+    # edge directions rotated by 90 degrees, zero for edges between nodes at the same position
+    normal = np.divide(np.column_stack((-vector[:, 1], vector[:, 0])), length, out=np.zeros_like(vector), where=length > 0)
+    return (start + end)/2 + normal*offset
+
+
+# returns a boolean array of the given length that starts with the values of array, new entries are False
+def resize(array, length):
+    if len(array) == length:
+        return array
+    resized = np.zeros(length, dtype=bool)
+    count = min(len(array), length)
+    resized[:count] = array[:count]
+    return resized
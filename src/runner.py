@@ -0,0 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+from debug import debug
+
+
+# result of a headless run of an algorithm
+class RunResult:
+    algorithm = None
+    graph = None # graph in its final state
+    finished = False # whether the algorithm ran to completion, False if it was stopped by the step limit
+    steps = 0 # number of pauses the algorithm reached
+    duration = 0 # wall time of the run in seconds
+    step_times = [] # time before every pause in seconds
+
+    def __init__(self, algorithm, graph, duration):
+        self.algorithm = algorithm
+        self.graph = graph
+        self.finished = algorithm.finished
+        self.steps = algorithm.steps
+        self.duration = duration
+        self.step_times = algorithm.step_times
+
+    def summary(self):
+        slowest = max(self.step_times, default=0)
+        return {"algorithm": self.algorithm.name, "finished": self.finished, "steps": self.steps,
+                "duration": self.duration, "slowest step": slowest}
+
+
+# runs an algorithm without a window at full speed, either to completion or for max_steps steps
+# algorithm is an instance constructed without a window, e.g. TestAlgorithm()
+# if record is True, algorithm.trace holds the changes of every step afterwards
+def run_headless(algorithm, graph, max_steps=None, record=False):
+    if algorithm.window is not None:
+        raise ValueError("Headless runs need an algorithm without a window")
+    debug("Running algorithm headless: %s", algorithm.name)
+    algorithm.finished = False
+    algorithm.max_steps = max_steps
+    algorithm.reset_counters()
+    if record:
+        algorithm.record(graph)
+    start = time.perf_counter()
+    algorithm.run(graph)
+    duration = time.perf_counter() - start
+    if record:
+        algorithm.trace.end_step() # changes after the last pause
+        algorithm.stop_recording()
+    result = RunResult(algorithm, graph, duration)
+    debug("Headless run done: %s", result.summary())
+    return result
+
+
+# runs several headless runs at the same time, e.g. to compare algorithms side by side
+# runs is a list of (algorithm, graph) pairs, every run needs its own algorithm instance and should have its own graph
+# returns the results in the order of runs, all worker threads are finished when this returns
+def run_headless_concurrently(runs, max_steps=None, max_workers=4):
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="headless") as executor:
+        futures = [executor.submit(run_headless, algorithm, graph, max_steps) for algorithm, graph in runs]
+        return [future.result() for future in futures]
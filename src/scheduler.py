@@ -0,0 +1,90 @@
+import threading
+import time
+
+from debug import debug
+
+
+# collapses requests for redrawing into at most one render per frame
+# requests can come in much faster than frames can be drawn, e.g. from an algorithm stepping quickly
+class FrameScheduler:
+    root = None # tk root used to schedule frames
+    render = None # function drawing a frame
+    fps = 60 # target number of frames per second
+    pending = False # whether a frame is scheduled
+    last_frame = 0 # time of the last frame in seconds
+    requests = 0 # number of requests since the last frame, only used for debugging
+
+    def __init__(self, root, render, fps=60):
+        self.root = root
+        self.render = render
+        self.fps = fps
+
+    def frame_interval(self):
+        return 1/self.fps
+
+    # requests a frame, a frame that is already scheduled also covers this request
+    def request(self):
+        self.requests += 1
+        if self.pending:
+            return
+        self.pending = True
+        wait = self.last_frame + self.frame_interval() - time.perf_counter()
+        if wait <= 0:
+            self.root.after_idle(self.frame)
+        else:
+            self.root.after(int(wait*1000), self.frame)
+
+    def frame(self):
+        self.pending = False
+        self.last_frame = time.perf_counter()
+        if self.requests > 1:
+            debug("Coalesced %s update requests into one frame", self.requests)
+        self.requests = 0
+        self.render()
+
+
+# hands out steps to the worker thread of one algorithm session
+# the main thread grants steps with release(), the worker blocks in wait() at every pause until it gets one
+# every session has its own scheduler, so sessions never step each other
+class StepScheduler:
+    condition = None
+    permits = 0 # number of granted steps the worker has not taken yet
+    free_running = False # whether the worker no longer waits at pauses
+    cancelled = False
+    waiting = False # whether the worker is blocked in wait()
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.permits = 0
+        self.free_running = False
+        self.cancelled = False
+        self.waiting = False
+
+    # called by the worker at a pause, returns True if the session was cancelled
+    def wait(self):
+        with self.condition:
+            self.waiting = True
+            self.condition.wait_for(lambda: self.permits > 0 or self.free_running or self.cancelled)
+            self.waiting = False
+            if self.cancelled:
+                return True
+            if self.permits > 0:
+                self.permits -= 1
+            return False
+
+    # grants the worker one more step
+    def release(self):
+        with self.condition:
+            self.permits += 1
+            self.condition.notify_all()
+
+    # lets the worker pass all remaining pauses without waiting
+    def run_free(self):
+        with self.condition:
+            self.free_running = True
+            self.condition.notify_all()
+
+    def cancel(self):
+        with self.condition:
+            self.cancelled = True
+            self.condition.notify_all()
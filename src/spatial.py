@@ -0,0 +1,80 @@
+import math
+
+
+# uniform grid over the layout coordinates of the nodes of a graph, used for hit testing and area selection
+# cells are stored in a dictionary, so nodes outside of the unit square are supported as well
+class SpatialGrid:
+    cell_size = 0.1 # side length of a cell in layout coordinates
+    cells = {} # maps (column, row) to the set of nodes in that cell
+    node_cells = {} # maps each node to the cell it is stored in
+
+    def __init__(self, nodes=()):
+        self.rebuild(nodes)
+
+    # chooses a cell size so that there are about as many cells as nodes in the bounding box and reinserts all nodes
+    def rebuild(self, nodes):
+        nodes = list(nodes)
+        self.cells = {}
+        self.node_cells = {}
+        if nodes:
+            width = max(node.x for node in nodes) - min(node.x for node in nodes)
+            height = max(node.y for node in nodes) - min(node.y for node in nodes)
+            extent = max(width, height)
+            self.cell_size = max(extent/math.sqrt(len(nodes)), 1e-3)
+        for node in nodes:
+            self.insert(node)
+
+    def cell(self, x, y):
+        return math.floor(x/self.cell_size), math.floor(y/self.cell_size)
+
+    def insert(self, node):
+        cell = self.cell(node.x, node.y)
+        self.cells.setdefault(cell, set()).add(node)
+        self.node_cells[node] = cell
+
+    # moves node to the cell of its current position, O(1)
+    def update(self, node):
+        old_cell = self.node_cells.get(node)
+        cell = self.cell(node.x, node.y)
+        if cell == old_cell:
+            return
+        if old_cell is not None:
+            nodes = self.cells[old_cell]
+            nodes.discard(node)
+            if not nodes:
+                del self.cells[old_cell]
+        self.cells.setdefault(cell, set()).add(node)
+        self.node_cells[node] = cell
+
+    # yields the nodes in all cells that intersect the given rectangle
+    def candidates(self, x1, y1, x2, y2):
+        column1, row1 = self.cell(x1, y1)
+        column2, row2 = self.cell(x2, y2)
+        if (column2 - column1 + 1)*(row2 - row1 + 1) > len(self.cells):
+            # the rectangle covers more cells than there are occupied ones, so check those directly
+            for (column, row), nodes in self.cells.items():
+                if column1 <= column <= column2 and row1 <= row <= row2:
+                    yield from nodes
+            return
+        for column in range(column1, column2 + 1):
+            for row in range(row1, row2 + 1):
+                nodes = self.cells.get((column, row))
+                if nodes:
+                    yield from nodes
+
+    # returns the node closest to (x, y) whose center is at most radius away, or None
+    def nearest(self, x, y, radius):
+        closest = None
+        closest_distance = radius
+        for node in self.candidates(x - radius, y - radius, x + radius, y + radius):
+            distance = math.dist((x, y), (node.x, node.y))
+            if distance < closest_distance:
+                closest = node
+                closest_distance = distance
+        return closest
+
+    # returns all nodes whose centers lie in the given rectangle
+    def within(self, x1, y1, x2, y2):
+        x1, x2 = min(x1, x2), max(x1, x2)
+        y1, y2 = min(y1, y2), max(y1, y2)
+        return [node for node in self.candidates(x1, y1, x2, y2) if x1 <= node.x <= x2 and y1 <= node.y <= y2]
@@ -1,5 +1,4 @@
 from abc import ABC, abstractmethod
-import math
 
 from debug import debug
 
@@ -40,6 +39,10 @@ class Tool(ABC):
     def handle_canvas_release(self, window, event):
         pass
 
+    @abstractmethod
+    def handle_canvas_motion(self, window, event):
+        pass
+
 
 class DragTool(Tool):
     node_drag_start_x = 0
@@ -53,53 +56,56 @@ class DragTool(Tool):
         super().__init__("drag", "Drag Tool")
 
     def handle_node_press(self, window, node, event):
-        debug("Starting drag of node " + str(node.name))
+        debug("Starting drag of node %s", node.name)
         self.node_drag_start_x = event.x
         self.node_drag_start_y = event.y
 
     def handle_node_release(self, window, node, event):
         dx = event.x - self.node_drag_start_x
         dy = event.y - self.node_drag_start_y
-        debug("Ending drag of node " + str(node.name) + " with delta of " + str((dx, dy)))
+        debug("Ending drag of node %s with delta of %s", node.name, (dx, dy))
         tx, ty = window.canvas_to_unitsquare_coords(dx, dy, direction=True)
+        window.layout.cancel() # a running layout would move the node back
         node.x += tx
         node.y += ty
         window.update_graph()
 
     def handle_canvas_press(self, window, event):
-        # check if a node was clicked
-        drag_canvas = True
-        for node in window.current_graph.nodes:
-            canvas_x, canvas_y = window.unitsquare_to_canvas_coords(node.x, node.y)
-            if math.dist((canvas_x, canvas_y), (event.x, event.y)) < node.radius:
-                drag_canvas = False
-                break
-        self.drag_canvas = drag_canvas
+        # only drag the canvas if no node was clicked
+        self.drag_canvas = window.node_at(event.x, event.y) is None
         if self.drag_canvas:
             debug("Starting canvas drag...")
             self.canvas_drag_start_x = event.x
             self.canvas_drag_start_y = event.y
 
-    def handle_canvas_release(self, window, event):
+    # pans the view while the canvas is dragged, nodes keep their layout coordinates
+    def handle_canvas_motion(self, window, event):
         if not self.drag_canvas:
             return
         dx = event.x - self.canvas_drag_start_x
         dy = event.y - self.canvas_drag_start_y
-        debug("Ending canvas drag with delta of " + str((dx, dy)))
-        tx, ty = window.canvas_to_unitsquare_coords(dx, dy, direction=True)
-        # move nodes instead of canvas
-        for node in window.current_graph.nodes:
-            node.x += tx
-            node.y += ty
-        window.update_graph()
+        window.pan_canvas(dx, dy)
+        self.canvas_drag_start_x = event.x
+        self.canvas_drag_start_y = event.y
+
+    def handle_canvas_release(self, window, event):
+        if not self.drag_canvas:
+            return
+        self.handle_canvas_motion(window, event)
+        debug("Ending canvas drag")
         self.drag_canvas = False
 
+# selects single nodes by clicking them or all nodes in a rectangle by dragging over the canvas
 class SelectTool(Tool):
+    rectangle = None # canvas item of the selection rectangle while dragging
+    rectangle_start_x = 0
+    rectangle_start_y = 0
+
     def __init__(self):
         super().__init__("select", "Select Tool")
 
     def handle_node_press(self, window, node, event):
-        debug("Selecting/Unselecting node " + str(node.name))
+        debug("Selecting/Unselecting node %s", node.name)
         node.selected = not node.selected
         window.update_graph()
 
@@ -107,10 +113,27 @@ class SelectTool(Tool):
         pass
 
     def handle_canvas_press(self, window, event):
-        pass
+        if window.node_at(event.x, event.y) is not None:
+            return
+        self.rectangle_start_x = event.x
+        self.rectangle_start_y = event.y
+        self.rectangle = window.canvas.create_rectangle(event.x, event.y, event.x, event.y, outline="blue", dash=(4, 2))
+
+    def handle_canvas_motion(self, window, event):
+        if self.rectangle is None:
+            return
+        window.canvas.coords(self.rectangle, self.rectangle_start_x, self.rectangle_start_y, event.x, event.y)
 
     def handle_canvas_release(self, window, event):
-        pass
+        if self.rectangle is None:
+            return
+        window.canvas.delete(self.rectangle)
+        self.rectangle = None
+        nodes = window.nodes_within(self.rectangle_start_x, self.rectangle_start_y, event.x, event.y)
+        debug("Selecting %s nodes in rectangle", len(nodes))
+        for node in nodes:
+            node.selected = True
+        window.update_graph()
 
 class AddTool(Tool):
     start_node = None
@@ -125,11 +148,12 @@ class AddTool(Tool):
             window.update_graph()
         else:
             if window.current_graph.has_edge(self.start_node, node):
-                debug("Edge already exists between " + str(self.start_node.name) + " and " + str(node.name))
+                debug("Edge already exists between %s and %s", self.start_node.name, node.name)
             else:
-                debug("Adding edge between " + str(self.start_node.name) + " and " + str(node.name))
+                debug("Adding edge between %s and %s", self.start_node.name, node.name)
                 window.current_graph.add_edge(self.start_node, node)
             self.start_node.selected = False
+            window.relax_around([self.start_node, node])
             self.start_node = None
             window.update_graph()
 
@@ -138,13 +162,15 @@ class AddTool(Tool):
 
     def handle_canvas_press(self, window, event):
         # check if a node was clicked
-        for node in window.current_graph.nodes:
-            canvas_x, canvas_y = window.unitsquare_to_canvas_coords(node.x, node.y)
-            if math.dist((canvas_x, canvas_y), (event.x, event.y)) < node.radius:
-                return
+        if window.node_at(event.x, event.y) is not None:
+            return
         unit_x, unit_y = window.canvas_to_unitsquare_coords(event.x, event.y)
-        window.current_graph.add_node(unit_x, unit_y)
+        node = window.current_graph.add_node(unit_x, unit_y)
+        window.relax_around([node])
         window.update_graph()
 
     def handle_canvas_release(self, window, event):
         pass
+
+    def handle_canvas_motion(self, window, event):
+        pass
@@ -0,0 +1,72 @@
+# maps layout coordinates (roughly in the unit square) to canvas coordinates
+# the transform is kept separate from the layout, so zooming and panning never change node positions
+# the canvas size is cached here and updated from <Configure> events instead of being queried for every point
+class ViewTransform:
+    width = 1 # canvas width in pixels
+    height = 1 # canvas height in pixels
+    padding = 25 # padding around the unit square in pixels
+    zoom = 1 # zoom factor
+    offset_x = 0 # pan offset in pixels
+    offset_y = 0 # pan offset in pixels
+
+    def __init__(self, width, height, padding=25):
+        self.width = width
+        self.height = height
+        self.padding = padding
+
+    def reset(self):
+        self.zoom = 1
+        self.offset_x = 0
+        self.offset_y = 0
+
+    def resize(self, width, height):
+        self.width = width
+        self.height = height
+
+    # number of pixels per unit of layout coordinates
+    def unit(self):
+        smaller_dimension = min(self.width, self.height)
+        return (smaller_dimension - 2*self.padding)/2*self.zoom
+
+    # canvas position of the layout origin
+    def origin(self):
+        return self.width/2 + self.offset_x, self.height/2 + self.offset_y
+
+    def to_canvas(self, x, y, direction=False):
+        unit = self.unit()
+        if direction:
+            return x*unit, y*unit
+        origin_x, origin_y = self.origin()
+        return origin_x + x*unit, origin_y + y*unit
+
+    # transforms an array of layout positions with one row per point in one vectorized pass
+    def to_canvas_array(self, points):
+        origin_x, origin_y = self.origin()
+        canvas = points*self.unit()
+        canvas[:, 0] += origin_x
+        canvas[:, 1] += origin_y
+        return canvas
+
+    def to_layout(self, x, y, direction=False):
+        unit = self.unit()
+        if direction:
+            return x/unit, y/unit
+        origin_x, origin_y = self.origin()
+        return (x - origin_x)/unit, (y - origin_y)/unit
+
+    # the visible part of the layout as (x1, y1, x2, y2), extended by margin pixels on every side
+    def visible_rect(self, margin=0):
+        x1, y1 = self.to_layout(-margin, -margin)
+        x2, y2 = self.to_layout(self.width + margin, self.height + margin)
+        return x1, y1, x2, y2
+
+    # zooms by factor while keeping the canvas point (x, y) fixed
+    def zoom_at(self, factor, x, y):
+        origin_x, origin_y = self.origin()
+        self.offset_x += (x - origin_x)*(1 - factor)
+        self.offset_y += (y - origin_y)*(1 - factor)
+        self.zoom *= factor
+
+    def pan(self, dx, dy):
+        self.offset_x += dx
+        self.offset_y += dy
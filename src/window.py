@@ -1,13 +1,33 @@
 import tkinter as tk # gui library
 import tkinter.simpledialog # for dialogs
-import webbrowser # open links in browser
+import tkinter.filedialog # for choosing graph and trace files
+import tkinter.messagebox # for confirming very large graphs
+import tkinter.ttk # for the progress bar of graph construction
 import random
 import math
-
-from debug import debug
-from graph import Graph
+import time
+import os
+import tempfile
+
+import debug as profiler
+from debug import debug, timed
+from graph import Graph, Node
+import generators
+from construction import GraphConstruction
+import graph_io
+import export
+from properties import PropertyEvaluator, on_request
+from renderer import Renderer
+from view import ViewTransform
+from scheduler import FrameScheduler
+from layout import ProgressiveLayout
 from tool import Tool, ToolFactory
-from algorithm import Algorithm, TestAlgorithm
+from algorithm import Algorithm, AlgorithmPool, TestAlgorithm
+from recording import Trace
+from workspace import Workspace, Tab
+from lazy import LazyModule
+
+webbrowser = LazyModule("webbrowser") # open links in browser
 
 
 class Window:
@@ -15,22 +35,53 @@ class Window:
     canvas = None # canvas to draw on
     menu = None # menu bar
     sidebar = None # sidebar to display properties of the graph
+    renderer = None # keeps the canvas items in sync with the current graph, every tab has its own
+    tab_bar = None # row of buttons above the canvas, one per tab
+    tab_variable = None # identifies the button of the active tab
+    workspace = None # open graphs, the current graph is the graph of its active tab
 
     canvas_padding = 20 # padding around the canvas
-    zoom = 1 # zoom factor
+    view = None # transform from layout coordinates to canvas coordinates, holds zoom and pan, every tab has its own
+    settle_delay = 150 # ms after the last zoom step until weight labels are placed exactly
+    settle_job = None
+    frame_scheduler = None # coalesces requests for redrawing the graph into at most one frame
+    autoplay_job = None # scheduled autoplay tick while autoplay is running
+    autoplay_speed = 10 # algorithm steps per second during autoplay
+    autoplay_due = 0 # number of steps autoplay still has to execute, may be fractional
+    autoplay_last_tick = 0 # time of the last autoplay tick in seconds
+    scrubber = None # slider for moving through the trace of the current run, None while its window is closed
 
     current_graph = None
     current_tool = ToolFactory.get_tool("drag")
     current_algorithm = None
+    algorithm_pool = None # worker threads for algorithm sessions
+    current_trace = None # recorded steps of the current or a loaded run
+    property_evaluator = None # evaluates expensive properties off the main thread
+    property_poll_interval = 50 # ms between checks for finished property evaluations
+    property_frame_budget = 0.005 # seconds per frame that properties may be evaluated on the main thread
+    layout = None # computes spring layouts in the background
+    construction = None # builds new graphs in the background
+    constructed_graph = None # graph opened from the construction whose properties are still calculated in the background
+    construction_poll_interval = 50 # ms between checks for the progress of the construction
+    construction_job = None # scheduled check of the construction, None while none is scheduled
+    progress_delay = 0.3 # seconds a construction runs before its progress is shown
+    construction_started = 0 # time the construction was started
+    progress_window = None # window with the progress of the construction, None while it is closed
+    large_graph_bytes = 200*1024*1024 # estimated memory of new graphs above which they have to be confirmed
+    icon_directory = None # subsampled tool icons are cached here, decoding the full size images is slow
+    timings_interval = 1 # seconds between updates of the timings in the sidebar, only shown when profiling
+    timings_shown = 0 # time of the last update of the timings in the sidebar
 
     drag_canvas = False # whether the canvas is being dragged (and not a node)
     drag_start_x = 0 # x coordinate of the start of a canvas drag
     drag_start_y = 0 # y coordinate of the start of a canvas drag
 
 
-    def __init__(self, title, width, height, canvas_padding=25):
+    # memory_budget is the estimated number of bytes above which the derived data of inactive tabs is evicted
+    def __init__(self, title, width, height, canvas_padding=25, memory_budget=512*1024*1024):
         debug("Creating window...")
         self.canvas_padding = canvas_padding
+        self.workspace = Workspace(memory_budget)
         # create root window
         self.root = tk.Tk()
         self.root.title(title)
@@ -44,21 +95,38 @@ class Window:
         self.sidebar.pack(side=tk.LEFT, fill=tk.BOTH)
         self.sidebar.pack_propagate(False)
         self.create_sidebar()
-        # create canvas
+        self.property_evaluator = PropertyEvaluator()
+        self.algorithm_pool = AlgorithmPool()
+        self.layout = ProgressiveLayout()
+        self.construction = GraphConstruction()
+        # create tab bar and canvas, the renderer is created with the first tab
+        self.tab_bar = tk.Frame(self.root)
+        self.tab_bar.pack(side=tk.TOP, fill=tk.X)
+        self.tab_variable = tk.StringVar(self.root)
         self.canvas = tk.Canvas(self.root, width=width, height=height)
         self.canvas.pack(expand=True, fill=tk.BOTH)
+        self.view = ViewTransform(width, height, canvas_padding)
         # register event handlers
-        self.root.bind("<<UpdateGraph>>", lambda event: self.update_graph())
+        self.frame_scheduler = FrameScheduler(self.root, self.update_graph)
+        self.root.bind("<<UpdateGraph>>", lambda event: self.request_update())
         self.root.bind_all("<MouseWheel>", self.zoom_canvas) # windows zoom
         self.root.bind_all("<Button-4>", self.zoom_canvas) # linux zoom
         self.root.bind_all("<Button-5>", lambda event: self.zoom_canvas(event, invert=True)) # linux zoom
         self.canvas.bind("<ButtonPress-1>", self.handle_canvas_press)
         self.canvas.bind("<ButtonRelease-1>", self.handle_canvas_release)
+        self.canvas.bind("<B1-Motion>", self.handle_canvas_motion)
+        self.canvas.bind("<Configure>", self.resize_canvas)
         # update root window
         self.root.update()
 
     # definition of the menu bar
     def create_menu(self):
+        file_menu = tk.Menu(self.menu)
+        file_menu.add_command(label="Open", command=self.open_graph)
+        file_menu.add_command(label="Save", command=self.save_graph)
+        file_menu.add_command(label="Export Image", command=self.export_image)
+        file_menu.add_command(label="Close Tab", command=self.close_tab)
+        self.menu.add_cascade(label="File", menu=file_menu)
         new_graph_menu = tk.Menu(self.menu)
         new_graph_menu.add_command(label="Null Graph", command=self.new_null_graph)
         new_graph_menu.add_command(label="Trivial Graph", command=self.new_trivial_graph)
@@ -73,9 +141,24 @@ class Window:
 
         self.menu.add_cascade(label="New", menu=new_graph_menu)
         self.menu.add_command(label="Reset", command=self.reset_graph)
+        self.menu.add_command(label="Relax", command=self.relax_layout)
         self.menu.add_command(label="Planarize", command=self.planrize_graph)
+        self.menu.add_command(label="Kuratowski", command=self.show_kuratowski_subgraph)
         self.menu.add_command(label="Algorithm", command=self.run_algorithm)
+        self.menu.add_command(label="Step Back", command=self.step_algorithm_back)
         self.menu.add_command(label="Step", command=self.step_algorithm)
+        self.menu.add_command(label="Scrub", command=self.open_scrubber)
+        self.menu.add_command(label="Run to End", command=self.run_algorithm_to_end)
+        autoplay_menu = tk.Menu(self.menu)
+        autoplay_menu.add_command(label="Start/Stop", command=self.toggle_autoplay)
+        autoplay_menu.add_command(label="Steps per Second", command=self.set_autoplay_speed)
+        self.menu.add_cascade(label="Autoplay", menu=autoplay_menu)
+        trace_menu = tk.Menu(self.menu)
+        trace_menu.add_command(label="Save", command=self.save_trace)
+        trace_menu.add_command(label="Load", command=self.load_trace)
+        trace_menu.add_command(label="Export Frames", command=self.export_frames)
+        trace_menu.add_command(label="Export Animation", command=self.export_animation)
+        self.menu.add_cascade(label="Trace", menu=trace_menu)
         self.menu.add_command(label="About", command=self.about)
         self.menu.add_command(label="Exit", command=self.exit)
 
@@ -89,192 +172,679 @@ class Window:
         # divider below tools
         self.divider(tools, width=200, horizontal=True)
         # buttons for tools
-        drag_image = tk.PhotoImage(file="assets/drag.png").subsample(22, 22)
+        drag_image = self.load_icon("assets/drag.png", 22)
         drag_button = tk.Button(tools, image=drag_image, command=lambda: self.set_current_tool("drag"))
         drag_button.image = drag_image # prevent garbage collection by keeping a reference
         drag_button.pack(side=tk.LEFT, padx=5, pady=5)
-        select_image = tk.PhotoImage(file="assets/select.png").subsample(25, 25)
+        select_image = self.load_icon("assets/select.png", 25)
         select_button = tk.Button(tools, image=select_image, command=lambda: self.set_current_tool("select"))
         select_button.image = select_image # prevent garbage collection by keeping a reference
         select_button.pack(side=tk.LEFT, padx=0, pady=5)
         add_button = tk.Button(tools, text="+", command=lambda: self.set_current_tool("add"))
         add_button.pack(side=tk.LEFT, padx=5, pady=5)
+        # timings of the hot paths, packed first so they stay below the properties
+        if profiler.profiling:
+            timings = tk.Text(self.sidebar, height=14, font=("TkFixedFont", 8))
+            timings.pack(side=tk.BOTTOM, fill=tk.X)
+            timings.insert(tk.END, "Timings will be displayed here.")
+            self.sidebar.timings = timings
+            self.divider(self.sidebar, width=200, horizontal=True)
         # draw properties text field
         properties = tk.Text(self.sidebar, yscrollcommand=True)
         properties.pack(side=tk.BOTTOM, fill=tk.BOTH)
         properties.insert(tk.END, "Properties of the graph will be displayed here.")
+        properties.tag_config("on_request", foreground="blue", underline=True)
         self.sidebar.properties = properties # make text field accessible from outside
 
+    # loads the image at path subsampled by factor, from the icon cache if it was subsampled before
+    # cached icons are named after the modification time of the image, so changed images are subsampled again
+    def load_icon(self, path, factor):
+        if self.icon_directory is None:
+            base = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+            self.icon_directory = os.path.join(base, "tarvos", "icons")
+        name = os.path.splitext(os.path.basename(path))[0]
+        cached = os.path.join(self.icon_directory, "%s-%d-%d.png" % (name, factor, os.stat(path).st_mtime_ns))
+        if os.path.exists(cached):
+            try:
+                return tk.PhotoImage(file=cached)
+            except tk.TclError as error:
+                debug("Could not read cached icon %s: %s", cached, error)
+        image = tk.PhotoImage(file=path).subsample(factor, factor)
+        try:
+            os.makedirs(self.icon_directory, exist_ok=True)
+            file, temporary = tempfile.mkstemp(dir=self.icon_directory, suffix=".tmp")
+            os.close(file)
+            image.write(temporary, format="png")
+            os.replace(temporary, cached) # other instances never read a partially written icon
+        except (OSError, tk.TclError) as error:
+            debug("Could not cache icon: %s", error)
+        return image
+
     def about(self):
         webbrowser.open("https://github.com/cytobi/py-graphs")
 
     def exit(self):
         debug("Exiting...")
-        if self.current_algorithm is not None:
-            self.current_algorithm.kill()
+        self.stop_autoplay()
+        self.algorithm_pool.shutdown() # also kills the current algorithm
+        self.layout.shutdown()
+        self.construction.shutdown()
+        self.property_evaluator.shutdown()
         self.root.quit()
 
 
+    # tabs
+    # opens graph in a new tab and switches to it, the graph of the previous tab stays open
+    def open_tab(self, graph, title):
+        tab = Tab(graph, title, ViewTransform(self.view.width, self.view.height, self.canvas_padding), Renderer(self))
+        tab.button = tk.Radiobutton(self.tab_bar, text=title, indicatoron=0, variable=self.tab_variable, value=str(id(tab)),
+                                    command=lambda: self.activate_tab(tab))
+        tab.button.pack(side=tk.LEFT)
+        self.workspace.add(tab)
+        self.activate_tab(tab)
+
+    # switches to tab, the canvas items of the previous tab are hidden and shown again when it is activated
+    # switching is instant unless the tab was evicted, then its properties and canvas items are rebuilt
+    def activate_tab(self, tab):
+        self.tab_variable.set(str(id(tab)))
+        previous = self.workspace.active
+        if tab is previous:
+            return
+        if previous is not None:
+            self.leave_tab(previous)
+        debug("Switching to tab: %s", tab.title)
+        self.workspace.activate(tab)
+        tab.view.resize(self.view.width, self.view.height) # the canvas may have been resized in the meantime
+        self.view = tab.view
+        self.renderer = tab.renderer
+        self.renderer.invalidate()
+        self.current_graph = tab.graph
+        self.current_algorithm = tab.algorithm
+        self.current_trace = tab.trace
+        self.workspace.evict()
+        self.renderer.render(self.current_graph) # the properties follow in the next frame, like on startup
+        self.request_update()
+
+    # keeps the algorithm and trace of the current graph in its tab, they are not stopped
+    def leave_tab(self, tab):
+        self.stop_autoplay()
+        self.layout.cancel()
+        self.close_scrubber()
+        tab.algorithm = self.current_algorithm
+        tab.trace = self.current_trace
+        tab.renderer.hide()
+
+    # closing the last tab opens an empty one, so there always is a current graph
+    def close_tab(self):
+        tab = self.workspace.active
+        debug("Closing tab: %s", tab.title)
+        self.clean_up_old_graph()
+        tab.button.destroy()
+        following = self.workspace.remove(tab)
+        if following is None:
+            self.open_tab(Graph.new_null_graph(), "Null Graph")
+        else:
+            self.activate_tab(following)
+
+
     # graph handling
-    def set_current_graph(self, graph):
-        self.current_graph = graph
+    # schedules a redraw, multiple requests before the next frame result in a single redraw
+    def request_update(self):
+        self.frame_scheduler.request()
+
+    # redraws the changed parts of the graph, only properties invalidated by structural changes are recomputed
+    @timed("window/update graph")
+    def update_graph(self):
+        if self.properties_pending():
+            self.renderer.render(self.current_graph)
+            self.show_properties_pending()
+        else:
+            self.evaluate_properties()
+            self.renderer.render(self.current_graph)
+            self.update_properties()
+        if profiler.profiling and time.perf_counter() - self.timings_shown > self.timings_interval:
+            self.update_timings()
+
+    # evaluates dirty properties, cheapest first
+    # properties that fit into the time budget of a frame are evaluated right away, or in the next frame if the budget is spent
+    # the others are evaluated in the background, their results are shown as they arrive
+    def evaluate_properties(self):
+        graph = self.current_graph
+        if not graph.dirty_properties():
+            return
+        background = graph.evaluate_properties(self.property_frame_budget)
+        if len(graph.dirty_properties()) > len(background):
+            self.request_update()
+        key = (id(graph), graph.version)
+        background = self.property_evaluator.unsubmitted(key, background)
+        if not background:
+            return
+        was_busy = self.property_evaluator.busy()
+        self.property_evaluator.submit(key, graph.to_networkx(), background)
+        if not was_busy:
+            self.root.after(self.property_poll_interval, self.poll_properties)
+
+    # computes a property that is only computed on request for large graphs, called when it is clicked in the sidebar
+    def compute_property(self, name):
+        debug("Computing property on request: %s", name)
+        self.current_graph.request_property(name)
+        self.update_graph()
 
-    def update_graph(self, recalculate_properties=True):
-        self.canvas.delete("all")
-        if recalculate_properties:
-            self.current_graph.calculate_properties()
-        self.current_graph.draw(self)
+    def poll_properties(self):
+        graph = self.current_graph
+        results = self.property_evaluator.poll()
+        # the evaluator drops results of earlier submissions, this also drops results for a graph that was replaced
+        if results and self.property_evaluator.key == (id(graph), graph.version):
+            for name, value in results:
+                graph.set_property(name, value)
+            self.update_properties()
+        if self.property_evaluator.busy():
+            self.root.after(self.property_poll_interval, self.poll_properties)
 
     def reset_graph(self):
-        debug("Resetting graph: " + str(self.current_graph))
-        self.zoom = 1 # reset zoom
+        debug("Resetting graph: %s", self.current_graph)
+        self.layout.cancel()
+        self.view.reset() # reset zoom and pan
+        self.renderer.invalidate()
         self.current_graph.spring_layout()
         self.update_graph()
 
+    # improves the current layout in the background, selected nodes stay in place
+    # intermediate positions are drawn as they arrive, at most once per frame
+    def relax_layout(self):
+        graph = self.current_graph
+        was_busy = self.layout.busy()
+        self.layout.start((id(graph), graph.version), graph.node_positions(), graph.edge_node_indices(), graph.pinned_nodes())
+        if not was_busy:
+            self.root.after(int(self.frame_scheduler.frame_interval()*1000), self.poll_layout)
+
+    def poll_layout(self):
+        graph = self.current_graph
+        positions = self.layout.poll()
+        # a structural change makes the positions of the running layout outdated
+        if positions is not None and self.layout.key == (id(graph), graph.version):
+            graph.set_position_array(positions)
+            self.request_update()
+        elif self.layout.key is not None and self.layout.key != (id(graph), graph.version):
+            self.layout.cancel()
+        if self.layout.busy():
+            self.root.after(int(self.frame_scheduler.frame_interval()*1000), self.poll_layout)
+
+    # moves nodes a little after they or their edges were added, instead of computing a new layout
+    def relax_around(self, nodes):
+        self.layout.cancel()
+        self.current_graph.relax_around(nodes)
+
     def planrize_graph(self):
+        self.layout.cancel()
         self.current_graph.planar_layout()
         self.update_graph()
 
-    # all things that need to be cleaned up when a new graph is created
+    # highlights a subdivision of K5 or K3,3 that shows why the graph is not planar
+    def show_kuratowski_subgraph(self):
+        subgraph = self.current_graph.kuratowski_subgraph()
+        if subgraph is None:
+            debug("Graph is planar, there is no Kuratowski subgraph")
+            return
+        nodes, edges = subgraph
+        debug("Highlighting Kuratowski subgraph with %s nodes", len(nodes))
+        for node in nodes:
+            node.selected = True
+        for edge in edges:
+            edge.color = "red"
+        self.update_graph()
+
+    # all things that need to be cleaned up when the current graph is closed or its trace replaced
     def clean_up_old_graph(self):
+        self.stop_autoplay()
+        self.layout.cancel()
         if self.current_algorithm is not None:
             self.current_algorithm.kill()
+        self.current_trace = None
+        self.close_scrubber()
 
 
     def update_properties(self):
         debug("Updating properties in sidebar...")
         properties = self.current_graph.properties
-        text = ""
+        text = self.sidebar.properties
+        text.delete("1.0", tk.END)
         for key in properties:
-            text += key + ": " + str(properties[key]) + "\n"
+            if properties[key] == on_request:
+                # each property gets its own tag, so a click computes the property that was clicked
+                text.insert(tk.END, key + ": ")
+                text.insert(tk.END, on_request, ("on_request", "compute_" + key))
+                text.tag_bind("compute_" + key, "<Button-1>", lambda event, name=key: self.compute_property(name))
+                text.insert(tk.END, "\n")
+            else:
+                text.insert(tk.END, key + ": " + str(properties[key]) + "\n")
+
+    def show_properties_pending(self):
         self.sidebar.properties.delete("1.0", tk.END)
-        self.sidebar.properties.insert(tk.END, text)
+        self.sidebar.properties.insert(tk.END, "Computing properties...")
+
+    # shows count, mean and 90th percentile of every span in the sidebar, slowest total first
+    def update_timings(self):
+        self.timings_shown = time.perf_counter()
+        text = self.sidebar.timings
+        text.delete("1.0", tk.END)
+        for name, summary in profiler.timing_summaries().items():
+            text.insert(tk.END, "%s\n  %d x %.2f ms, p90 %.2f ms\n" % (name, summary["count"], summary["mean"]*1e3, summary["p90"]*1e3))
 
     def set_current_tool(self, tool):
-        debug("Setting current tool to " + str(tool))
+        debug("Setting current tool to %s", tool)
         self.current_tool = ToolFactory.get_tool(tool)
 
     # displays the window, must be called at the end of the main function
+    # draws the current graph before its properties are evaluated, they follow in the next frame
+    # evaluating them imports networkx, which takes longer than the rest of the startup
+    def draw_first_frame(self):
+        self.renderer.render(self.current_graph)
+        self.show_properties_pending()
+        self.root.update_idletasks()
+        self.request_update()
+
     def display(self):
-        debug("Displaying window: " + str(self))
+        debug("Displaying window: %s", self)
         self.root.mainloop()
 
 
+    # graph construction
+    # builds the graph of generator in the background, it is opened in a new tab as soon as its layout is ready
+    # its properties are calculated afterwards, also in the background, the graph can already be used in the meantime
+    def build_graph(self, generator):
+        self.close_progress()
+        self.constructed_graph = None
+        self.construction.start(generator)
+        self.construction_started = time.perf_counter()
+        if self.construction_job is None:
+            self.construction_job = self.root.after(self.construction_poll_interval, self.poll_construction)
+
+    def poll_construction(self):
+        self.construction_job = None
+        graph, tracker = self.construction.poll()
+        if graph is not None:
+            self.close_progress()
+            self.constructed_graph = graph
+            self.open_tab(graph, self.construction.generator.title)
+        if tracker is not None:
+            tracker, version = tracker
+            tracker.graph.adopt_property_tracker(tracker, version)
+            self.constructed_graph = None
+            self.request_update()
+        if not self.construction.busy():
+            self.close_progress()
+            return
+        if self.constructed_graph is None and time.perf_counter() - self.construction_started > self.progress_delay:
+            self.show_progress()
+        self.construction_job = self.root.after(self.construction_poll_interval, self.poll_construction)
+
+    # the properties of a graph that was just built are not shown until they arrive from the construction
+    # changing the graph calculates them right away, the ones from the construction are dropped then
+    def properties_pending(self):
+        graph = self.current_graph
+        return graph is self.constructed_graph and not graph.has_property_tracker()
+
+    def cancel_construction(self):
+        debug("Cancelling construction")
+        self.construction.cancel()
+        self.constructed_graph = None
+        self.close_progress()
+        self.request_update()
+
+    # opens the progress window if it is closed and shows the current stage of the construction
+    def show_progress(self):
+        if self.progress_window is None:
+            top = tk.Toplevel(self.root)
+            top.title("Building " + self.construction.generator.title)
+            top.transient(self.root)
+            top.protocol("WM_DELETE_WINDOW", self.cancel_construction)
+            top.label = tk.Label(top, width=30)
+            top.label.pack(padx=5, pady=5)
+            top.bar = tkinter.ttk.Progressbar(top, length=300, maximum=1)
+            top.bar.pack(fill=tk.X, padx=5, pady=5)
+            tk.Button(top, text="Cancel", command=self.cancel_construction).pack(padx=5, pady=5)
+            self.progress_window = top
+        stages = {"edges": "Creating edges...", "layout": "Computing layout...", "properties": "Computing properties..."}
+        self.progress_window.label.config(text=stages[self.construction.stage])
+        self.progress_window.bar["value"] = self.construction.progress
+
+    def close_progress(self):
+        if self.progress_window is not None:
+            self.progress_window.destroy()
+            self.progress_window = None
+
+
+    # graph files
+    def open_graph(self):
+        path = tk.filedialog.askopenfilename(parent=self.root, filetypes=graph_io.file_types)
+        if not path:
+            return
+        try:
+            graph = graph_io.load(path)
+        except (OSError, ValueError) as error:
+            debug("Could not open graph: %s", error)
+            return
+        self.open_tab(graph, os.path.basename(path))
+
+    def save_graph(self):
+        path = tk.filedialog.asksaveasfilename(parent=self.root, defaultextension=graph_io.binary_extension,
+                                               filetypes=graph_io.file_types)
+        if not path:
+            return
+        try:
+            graph_io.save(self.current_graph, path)
+        except (OSError, ValueError) as error:
+            debug("Could not save graph: %s", error)
+
+    # writes the graph as it is shown on the canvas as an svg or png image
+    def export_image(self):
+        path = tk.filedialog.asksaveasfilename(parent=self.root, defaultextension=".svg", filetypes=[("SVG", "*.svg"), ("PNG", "*.png")])
+        if not path:
+            return
+        try:
+            export.Scene.of_graph(self.current_graph, self.view).save(path)
+        except OSError as error:
+            debug("Could not export image: %s", error)
+
+
     # new graphs
     def new_null_graph(self):
-        self.clean_up_old_graph()
-        self.current_graph = Graph.new_null_graph()
-        self.update_graph(recalculate_properties=False)
+        self.build_graph(generators.null_graph())
 
     def new_trivial_graph(self):
-        self.clean_up_old_graph()
-        self.current_graph = Graph.new_trivial_graph()
-        self.update_graph(recalculate_properties=False)
+        self.build_graph(generators.trivial_graph())
 
     def new_empty_graph(self):
-        input = self.ask_input("New Empty Graph", {"n": ("number of nodes", 1)})
+        input = self.ask_input("New Empty Graph", {"n": ("number of nodes", 1)}, generators.empty_graph)
         if input is None:
             return
         n = input["n"]
-        debug("Creating new empty graph with " + str(n) + " nodes")
-        self.clean_up_old_graph()
-        self.current_graph = Graph.new_empty_graph(n)
-        self.update_graph(recalculate_properties=False)
+        debug("Creating new empty graph with %s nodes", n)
+        self.build_graph(generators.empty_graph(n))
 
     def new_complete_graph(self):
-        input = self.ask_input("New Complete Graph", {"n": ("number of nodes", 1)})
+        input = self.ask_input("New Complete Graph", {"n": ("number of nodes", 1)}, generators.complete_graph)
         if input is None:
             return
         n = input["n"]
-        debug("Creating new complete graph with " + str(n) + " nodes")
-        self.clean_up_old_graph()
-        self.current_graph = Graph.new_complete_graph(n)
-        self.update_graph(recalculate_properties=False)
+        debug("Creating new complete graph with %s nodes", n)
+        self.build_graph(generators.complete_graph(n))
 
     def new_complete_bipartite_graph(self):
-        input = self.ask_input("New Complete Bipartite Graph", {"n1": ("number of nodes in first part", 1), "n2": ("number of nodes in second part", 1)})
+        input = self.ask_input("New Complete Bipartite Graph", {"n1": ("number of nodes in first part", 1), "n2": ("number of nodes in second part", 1)}, generators.complete_bipartite_graph)
         if input is None:
             return
         n1 = input["n1"]
         n2 = input["n2"]
-        debug("Creating new complete bipartite graph with " + str(n1) + " nodes in first part and " + str(n2) + " nodes in second part")
-        self.clean_up_old_graph()
-        self.current_graph = Graph.new_complete_bipartite_graph(n1, n2)
-        self.update_graph(recalculate_properties=False)
+        debug("Creating new complete bipartite graph with %s nodes in first part and %s nodes in second part", n1, n2)
+        self.build_graph(generators.complete_bipartite_graph(n1, n2))
 
     def new_cycle_graph(self):
-        input = self.ask_input("New Cycle Graph", {"n": ("number of nodes", 3)})
+        input = self.ask_input("New Cycle Graph", {"n": ("number of nodes", 3)}, generators.cycle_graph)
         if input is None:
             return
         n = input["n"]
-        debug("Creating new cycle graph with " + str(n) + " nodes")
-        self.clean_up_old_graph()
-        self.current_graph = Graph.new_cycle_graph(n)
-        self.update_graph(recalculate_properties=False)
+        debug("Creating new cycle graph with %s nodes", n)
+        self.build_graph(generators.cycle_graph(n))
 
     def new_path_graph(self):
-        input = self.ask_input("New Path Graph", {"n": ("number of nodes", 1)})
+        input = self.ask_input("New Path Graph", {"n": ("number of nodes", 1)}, generators.path_graph)
         if input is None:
             return
         n = input["n"]
-        debug("Creating new path graph with " + str(n) + " nodes")
-        self.clean_up_old_graph()
-        self.current_graph = Graph.new_path_graph(n)
-        self.update_graph(recalculate_properties=False)
+        debug("Creating new path graph with %s nodes", n)
+        self.build_graph(generators.path_graph(n))
 
     def new_star_graph(self):
-        input = self.ask_input("New Star Graph", {"n": ("number of nodes", 0)})
+        input = self.ask_input("New Star Graph", {"n": ("number of nodes", 0)}, generators.star_graph)
         if input is None:
             return
         n = input["n"]
-        debug("Creating new star graph with " + str(n) + " nodes")
-        self.clean_up_old_graph()
-        self.current_graph = Graph.new_star_graph(n)
-        self.update_graph(recalculate_properties=False)
+        debug("Creating new star graph with %s nodes", n)
+        self.build_graph(generators.star_graph(n))
 
     def new_full_rary_tree(self):
-        input = self.ask_input("New Full r-ary Tree", {"n": ("number of nodes", 1), "r": ("number of children per node", 1)})
+        input = self.ask_input("New Full r-ary Tree", {"n": ("number of nodes", 1), "r": ("number of children per node", 1)}, generators.full_rary_tree)
         if input is None:
             return
         n = input["n"]
         r = input["r"]
-        debug("Creating new full r-ary tree with " + str(n) + " nodes")
-        self.clean_up_old_graph()
-        self.current_graph = Graph.new_full_rary_tree(r, n)
-        self.update_graph(recalculate_properties=False)
+        debug("Creating new full r-ary tree with %s nodes", n)
+        self.build_graph(generators.full_rary_tree(r, n))
 
     def new_rary_balanced_tree(self):
-        input = self.ask_input("New Balanced Tree", {"h": ("height", 1), "r": ("number of children per node", 1)})
+        input = self.ask_input("New Balanced Tree", {"h": ("height", 1), "r": ("number of children per node", 1)}, generators.balanced_tree)
         if input is None:
             return
         h = input["h"]
         r = input["r"]
-        debug("Creating new balanced tree with " + str(h) + " nodes")
-        self.clean_up_old_graph()
-        self.current_graph = Graph.new_balanced_tree(r, h)
-        self.update_graph(recalculate_properties=False)
+        debug("Creating new balanced tree with %s nodes", h)
+        self.build_graph(generators.balanced_tree(r, h))
     
 
     # algorithms
     def run_algorithm(self):
+        if self.current_algorithm is not None:
+            self.current_algorithm.kill()
         self.current_algorithm = TestAlgorithm(self)
-        self.current_algorithm.start(self.current_graph)
+        if not self.current_algorithm.start(self.current_graph, self.algorithm_pool):
+            self.current_algorithm = None
+            message = ("All %d algorithm sessions are in use by other tabs. "
+                       "Run one of them to the end or close its tab first." % self.algorithm_pool.max_workers)
+            tk.messagebox.showinfo("Algorithm", message, parent=self.root)
+            return
+        self.current_trace = self.current_algorithm.trace
 
+    # steps that were already recorded are replayed from the trace, the algorithm only continues from the latest step
     def step_algorithm(self):
+        if self.current_trace is not None and not self.current_trace.at_head():
+            self.seek_trace(self.current_trace.position + 1)
+            return
         if self.current_algorithm is None:
             debug("No algorithm initialized")
             return
         self.current_algorithm.step()
 
+    def step_algorithm_back(self):
+        if self.current_trace is None:
+            debug("No trace recorded")
+            return
+        self.stop_autoplay()
+        self.seek_trace(self.current_trace.position - 1)
+
+    # finishes the current algorithm without stopping or redrawing at its steps
+    def run_algorithm_to_end(self):
+        if self.current_algorithm is None:
+            debug("No algorithm initialized")
+            return
+        self.stop_autoplay()
+        # steps that were stepped back over are replayed first, the algorithm continues from the latest step
+        if self.current_trace is not None and not self.current_trace.at_head():
+            self.seek_trace(self.current_trace.length())
+        self.current_algorithm.run_to_end()
+
+    # autoplay steps the current algorithm on a timer, every step requests a frame
+    # steps that happen between two frames are never drawn, so fast runs are not slowed down by redrawing
+    def toggle_autoplay(self):
+        if self.autoplay_job is not None:
+            self.stop_autoplay()
+            return
+        if self.current_algorithm is None:
+            debug("No algorithm initialized")
+            return
+        debug("Starting autoplay with %s steps per second", self.autoplay_speed)
+        self.autoplay_due = 1 # the first step is executed immediately
+        self.autoplay_last_tick = time.perf_counter()
+        self.autoplay_tick()
+
+    def stop_autoplay(self):
+        if self.autoplay_job is not None:
+            debug("Stopping autoplay")
+            self.root.after_cancel(self.autoplay_job)
+            self.autoplay_job = None
+
+    def autoplay_tick(self):
+        self.autoplay_job = None
+        algorithm = self.current_algorithm
+        if algorithm is None or algorithm.finished:
+            debug("Autoplay finished")
+            return
+        now = time.perf_counter()
+        self.autoplay_due += (now - self.autoplay_last_tick)*self.autoplay_speed
+        self.autoplay_last_tick = now
+        # execute the due steps, but give control back to tk after one frame interval to keep the ui responsive
+        deadline = now + self.frame_scheduler.frame_interval()
+        while self.autoplay_due >= 1 and not algorithm.finished and time.perf_counter() < deadline:
+            self.step_algorithm() # replays recorded steps first if the trace was moved back
+            self.autoplay_due -= 1
+        self.autoplay_due = min(self.autoplay_due, self.autoplay_speed) # do not catch up on more than a second of steps
+        self.autoplay_job = self.root.after(int(self.frame_scheduler.frame_interval()*1000), self.autoplay_tick)
+
+    # shows the recorded state at the given step, the algorithm must be waiting for its next step
+    def seek_trace(self, step):
+        algorithm = self.current_algorithm
+        if algorithm is not None and algorithm.running_to_end and not algorithm.finished:
+            debug("Cannot seek while the algorithm runs to the end")
+            return
+        self.current_trace.seek(step)
+        if self.scrubber is not None:
+            self.scrubber.set(self.current_trace.position)
+        self.request_update()
+
+    # opens a window with a slider over all recorded steps
+    def open_scrubber(self):
+        if self.current_trace is None:
+            debug("No trace recorded")
+            return
+        if self.scrubber is not None:
+            self.scrubber.winfo_toplevel().lift()
+            return
+        top = tk.Toplevel(self.root)
+        top.title("Scrub")
+        top.protocol("WM_DELETE_WINDOW", self.close_scrubber)
+        self.scrubber = tk.Scale(top, from_=0, to=self.current_trace.length(), orient=tk.HORIZONTAL, length=400,
+                                 command=lambda value: self.scrub_to(int(value)))
+        self.scrubber.set(self.current_trace.position)
+        self.scrubber.pack(fill=tk.BOTH, padx=5, pady=5)
+        self.scrubber.bind("<Enter>", lambda event: self.scrubber.config(to=self.current_trace.length())) # new steps may have been recorded
+
+    def close_scrubber(self):
+        if self.scrubber is not None:
+            self.scrubber.winfo_toplevel().destroy()
+            self.scrubber = None
+
+    def scrub_to(self, step):
+        if self.current_trace is None or step == self.current_trace.position:
+            return
+        self.stop_autoplay()
+        self.seek_trace(step)
+
+    def save_trace(self):
+        if self.current_trace is None:
+            debug("No trace recorded")
+            return
+        path = tk.filedialog.asksaveasfilename(parent=self.root, defaultextension=".npz", filetypes=[("Trace", "*.npz")])
+        if not path:
+            return
+        debug("Saving trace to %s", path)
+        self.current_trace.save(path)
+
+    # replays a saved trace on the current graph without running the algorithm
+    def load_trace(self):
+        path = tk.filedialog.askopenfilename(parent=self.root, filetypes=[("Trace", "*.npz")])
+        if not path:
+            return
+        self.clean_up_old_graph()
+        self.current_algorithm = None
+        try:
+            self.current_trace = Trace.load(path, self.current_graph)
+        except ValueError as error:
+            debug("Could not load trace: %s", error)
+            return
+        self.request_update()
+
+    # whether the trace can be replayed for exporting it, the algorithm must not change the graph at the same time
+    def can_export_trace(self):
+        if self.current_trace is None:
+            debug("No trace recorded")
+            return False
+        algorithm = self.current_algorithm
+        if algorithm is not None and algorithm.running_to_end and not algorithm.finished:
+            debug("Cannot export while the algorithm runs to the end")
+            return False
+        self.stop_autoplay()
+        return True
+
+    # writes every recorded step as a png image and a contact sheet of the run into a directory
+    def export_frames(self):
+        if not self.can_export_trace():
+            return
+        directory = tk.filedialog.askdirectory(parent=self.root)
+        if not directory:
+            return
+        try:
+            export.export_frames(self.current_trace, self.view, directory)
+            export.export_contact_sheet(self.current_trace, self.view, os.path.join(directory, "contact_sheet.png"))
+        except OSError as error:
+            debug("Could not export frames: %s", error)
+        self.request_update()
+
+    def export_animation(self):
+        if not self.can_export_trace():
+            return
+        path = tk.filedialog.asksaveasfilename(parent=self.root, defaultextension=".svg", filetypes=[("SVG", "*.svg")])
+        if not path:
+            return
+        try:
+            export.export_animation(self.current_trace, self.view, path)
+        except OSError as error:
+            debug("Could not export animation: %s", error)
+
+    def set_autoplay_speed(self):
+        input = self.ask_input("Autoplay Speed", {"speed": ("number of steps per second", 1)})
+        if input is None:
+            return
+        self.autoplay_speed = input["speed"]
+        debug("Setting autoplay speed to %s steps per second", self.autoplay_speed)
+
 
     # event handlers
-    # event handler for zooming the canvas
+    # event handler for zooming the canvas, zooms around the mouse pointer
     def zoom_canvas(self, event, invert=False):
         if (event.delta > 0) is invert:
-            self.zoom *= 1.1
+            factor = 1.1
         else:
-            self.zoom /= 1.1
-        debug("Zooming canvas to " + str(self.zoom))
+            factor = 1/1.1
+        # the event may come from another widget since zooming is bound to all widgets
+        x = self.canvas.winfo_pointerx() - self.canvas.winfo_rootx()
+        y = self.canvas.winfo_pointery() - self.canvas.winfo_rooty()
+        if self.current_graph is None: # no tab was opened yet
+            return
+        self.view.zoom_at(factor, x, y)
+        debug("Zooming canvas to %s", self.view.zoom)
+        self.renderer.apply_zoom(factor, x, y)
+        self.request_update() # nodes may have become visible or the level of detail may have changed
+        if self.settle_job is not None:
+            self.root.after_cancel(self.settle_job)
+        self.settle_job = self.root.after(self.settle_delay, self.settle_zoom)
+
+    def settle_zoom(self):
+        self.settle_job = None
+        self.renderer.update_weights()
+
+    # moves the view instead of the nodes, items on the canvas are moved without redrawing them
+    def pan_canvas(self, dx, dy):
+        self.view.pan(dx, dy)
+        self.renderer.apply_pan(dx, dy)
+        self.request_update() # draws nodes and edges that became visible
+
+    # the mapping from the unit square to the canvas depends on the canvas size
+    def resize_canvas(self, event):
+        self.view.resize(event.width, event.height)
+        if self.current_graph is None:
+            return
+        self.renderer.invalidate()
         self.update_graph()
 
     # event handlers for grabbing the canvas
@@ -284,32 +854,34 @@ class Window:
     def handle_canvas_release(self, event):
         self.current_tool.handle_canvas_release(self, event)
 
+    def handle_canvas_motion(self, event):
+        self.current_tool.handle_canvas_motion(self, event)
+
 
     # helpers
     # helper to convert coordinates and directions from the unit square to the canvas of this window
     def unitsquare_to_canvas_coords(self, x, y, direction=False):
-        canvas_width = self.canvas.winfo_width()
-        canvas_height = self.canvas.winfo_height()
-        smaller_dimension = min(canvas_width, canvas_height)
-        sd_without_padding = smaller_dimension - 2*self.canvas_padding
-        zoomed_half = sd_without_padding/2*self.zoom
-        if direction:
-            return x*zoomed_half, y*zoomed_half
-        else:
-            return canvas_width/2 + x*zoomed_half, canvas_height/2 + y*zoomed_half
+        return self.view.to_canvas(x, y, direction)
     
     # helper to convert coordinates and directions from the canvas of this window to the unit square
     def canvas_to_unitsquare_coords(self, x, y, direction=False):
-        canvas_width = self.canvas.winfo_width()
-        canvas_height = self.canvas.winfo_height()
-        smaller_dimension = min(canvas_width, canvas_height)
-        sd_without_padding = smaller_dimension - 2*self.canvas_padding
-        zoomed_half = sd_without_padding/2*self.zoom
-        if direction:
-            return x/zoomed_half, y/zoomed_half
-        else:
-            return (x - canvas_width/2)/zoomed_half, (y - canvas_height/2)/zoomed_half
+        return self.view.to_layout(x, y, direction)
         
+    # helper that returns the node drawn at the canvas position (x, y), or None
+    def node_at(self, x, y):
+        unit_x, unit_y = self.canvas_to_unitsquare_coords(x, y)
+        radius = Node.radius
+        if self.renderer.detail.point_radius is not None: # nodes are drawn as points
+            radius = self.renderer.detail.point_radius
+        radius, _ = self.canvas_to_unitsquare_coords(radius, 0, direction=True)
+        return self.current_graph.node_at(unit_x, unit_y, radius)
+
+    # helper that returns the nodes inside the rectangle spanned by two canvas positions
+    def nodes_within(self, x1, y1, x2, y2):
+        unit_x1, unit_y1 = self.canvas_to_unitsquare_coords(x1, y1)
+        unit_x2, unit_y2 = self.canvas_to_unitsquare_coords(x2, y2)
+        return self.current_graph.nodes_within(unit_x1, unit_y1, unit_x2, unit_y2)
+
     # helper for creating a divider with tkinter, divider is placed on right/bottom of parent and should be the first element
     def divider(self, parent, height=2, width=2, horizontal=True):
         canvas = tk.Canvas(parent, width=width, height=height)
@@ -324,7 +896,8 @@ class Window:
     # values is dict: {"key/parametername": ("description", min_value)}
     # e.g. values={"n": ("number of nodes", 1), "r": ("number of children per node", 0)}
     # returns None or dict: {"key/parametername": value}
-    def ask_input(self, title, values):
+    # generator is a function of the values that returns a GraphGenerator, very large graphs have to be confirmed
+    def ask_input(self, title, values, generator=None):
         for key in values:
             description = values[key][0]
             min_value = values[key][1]
@@ -333,9 +906,21 @@ class Window:
                 if value is None:
                     return None
                 if value < min_value:
-                    debug("Invalid " + description + ": " + str(value))
+                    debug("Invalid %s: %s", description, value)
                     continue
                 else:
                     break
             values[key] = value
+        if generator is not None and not self.confirm_size(generator(**values)):
+            return None
         return values
+
+    # warns about graphs whose estimated memory is above large_graph_bytes, returns whether the graph should be built
+    def confirm_size(self, generator):
+        size = generator.estimated_bytes()
+        if size <= self.large_graph_bytes:
+            return True
+        debug("Asking to confirm %s with an estimated size of %s bytes", generator.title, size)
+        message = ("%s has %d nodes and %d edges and needs about %d MB of memory, building and drawing it may take a long time.\n\n"
+                   "Build it anyway?" % (generator.title, generator.node_count, generator.edge_count, size//(1024*1024)))
+        return tk.messagebox.askokcancel("Large Graph", message, icon=tk.messagebox.WARNING, parent=self.root)
@@ -0,0 +1,89 @@
+import itertools
+
+from debug import debug
+
+
+# a graph opened in a tab of the window, with everything needed to switch back to it instantly
+class Tab:
+    graph = None
+    title = ""
+    view = None # zoom and pan of this tab
+    renderer = None # canvas items of the graph, hidden while the tab is inactive
+    algorithm = None # algorithm session on the graph, None if there is none
+    trace = None # recorded steps of the current or a loaded run
+    last_used = 0 # value of the workspace clock when the tab was last activated
+    button = None # button of the tab in the tab bar of the window
+
+    def __init__(self, graph, title, view, renderer):
+        self.graph = graph
+        self.title = title
+        self.view = view
+        self.renderer = renderer
+
+    # estimated memory that can be freed by evicting this tab, the structure of the graph always stays in memory
+    def derived_bytes(self):
+        return self.graph.derived_bytes() + self.renderer.cache_bytes()
+
+    def structure_bytes(self):
+        return self.graph.structure_bytes()
+
+    # frees the derived data of the graph and its canvas items, they are rebuilt when the tab is activated again
+    def evict(self):
+        debug("Evicting tab: %s", self.title)
+        self.renderer.clear()
+        self.graph.drop_derived()
+
+
+# the tabs of a window, one of them is active
+# the derived data of the least recently used inactive tabs is evicted once all tabs together use more than max_bytes
+# layouts, colors and algorithm runs are part of the structure of a graph and survive eviction
+class Workspace:
+    tabs = [] # open tabs in the order they are shown
+    active = None # tab shown on the canvas
+    max_bytes = 512*1024*1024
+    clock = None # source of last_used values, a counter instead of a time so ties are impossible
+
+    def __init__(self, max_bytes=512*1024*1024):
+        self.tabs = []
+        self.max_bytes = max_bytes
+        self.clock = itertools.count(1)
+
+    def add(self, tab):
+        self.tabs.append(tab)
+        tab.last_used = next(self.clock)
+
+    # removes the tab, the next tab to the right or else to the left is returned, None if it was the last one
+    def remove(self, tab):
+        index = self.tabs.index(tab)
+        self.tabs.remove(tab)
+        tab.renderer.clear()
+        if tab is self.active:
+            self.active = None
+        if not self.tabs:
+            return None
+        return self.tabs[min(index, len(self.tabs) - 1)]
+
+    def activate(self, tab):
+        self.active = tab
+        tab.last_used = next(self.clock)
+
+    def total_bytes(self):
+        return sum(tab.structure_bytes() + tab.derived_bytes() for tab in self.tabs)
+
+    # evicts inactive tabs, least recently used first, until the estimated memory fits into max_bytes
+    # the active tab is never evicted, so a single large graph may exceed the budget
+    def evict(self):
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+        debug("Workspace uses about %s bytes, the budget is %s bytes", total, self.max_bytes)
+        for tab in sorted(self.tabs, key=lambda tab: tab.last_used):
+            if total <= self.max_bytes:
+                break
+            if tab is self.active:
+                continue
+            freed = tab.derived_bytes()
+            if freed == 0:
+                continue
+            tab.evict()
+            total -= freed
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# the modules are imported from src like main.py does, the repo is not an installed package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from graph import Graph
+from layout_cache import LayoutCache
+
+
+# layouts and tool icons are cached in the cache directory of the user, tests use a directory of their own
+@pytest.fixture(autouse=True)
+def cache_directory(tmp_path, monkeypatch):
+    directory = tmp_path / "cache"
+    monkeypatch.setenv("XDG_CACHE_HOME", str(directory))
+    monkeypatch.setattr(Graph, "layout_cache", LayoutCache(str(directory / "layouts")))
+    return directory
@@ -0,0 +1,85 @@
+import time
+
+import algorithm
+from graph import Graph
+from window import Window
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+class FakeRoot:
+    def event_generate(self, event):
+        pass
+
+
+# the algorithm and trace handling of the window without tk
+class FakeWindow:
+    root = None
+    scrubber = None
+    current_algorithm = None
+    current_trace = None
+
+    step_algorithm = Window.step_algorithm
+    step_algorithm_back = Window.step_algorithm_back
+    run_algorithm_to_end = Window.run_algorithm_to_end
+    seek_trace = Window.seek_trace
+
+    def __init__(self):
+        self.root = FakeRoot()
+
+    def stop_autoplay(self):
+        pass
+
+    def request_update(self):
+        pass
+
+
+def test_run_to_end_after_stepping_back():
+    graph = Graph.new_path_graph(5)
+    window = FakeWindow()
+    pool = algorithm.AlgorithmPool()
+    session = algorithm.TestAlgorithm(window)
+    window.current_algorithm = session
+    session.start(graph, pool)
+    window.current_trace = session.trace
+    try:
+        wait_until(lambda: session.scheduler.waiting)
+        for steps in (2, 3):
+            window.step_algorithm()
+            wait_until(lambda: session.steps == steps and session.scheduler.waiting)
+        assert [node.color for node in graph.nodes[:2]] == ["red", "red"]
+        window.step_algorithm_back()
+        assert graph.nodes[1].color == "white"
+        window.run_algorithm_to_end()
+        wait_until(lambda: session.finished)
+        assert [node.color for node in graph.nodes] == ["red"]*5
+        assert window.current_trace.at_head()
+    finally:
+        pool.shutdown()
+
+
+# parked sessions keep their workers, a session that does not get one is refused instead of waiting forever
+def test_more_sessions_than_workers():
+    pool = algorithm.AlgorithmPool(max_workers=2)
+    sessions = [algorithm.TestAlgorithm(FakeWindow()) for _ in range(3)]
+    graphs = [Graph.new_path_graph(3) for _ in range(3)]
+    try:
+        for session, graph in zip(sessions[:2], graphs):
+            assert session.start(graph, pool)
+        for session in sessions[:2]:
+            wait_until(lambda: session.scheduler.waiting)
+        assert not sessions[2].start(graphs[2], pool)
+        assert graphs[2].recorder is None
+        sessions[0].kill()
+        assert sessions[2].start(graphs[2], pool)
+        wait_until(lambda: sessions[2].scheduler.waiting)
+        sessions[2].run_to_end()
+        wait_until(lambda: sessions[2].finished)
+        assert [node.color for node in graphs[2].nodes] == ["red"]*3
+    finally:
+        pool.shutdown()
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+import graph_io
+from graph import Graph
+
+
+@pytest.mark.parametrize("dropped", [False, True])
+def test_add_node_and_edge_are_counted_once(dropped):
+    graph = Graph.new_complete_graph(4)
+    graph.properties # builds the property tracker
+    if dropped:
+        graph._property_tracker = None
+    node = graph.add_node(0, 0)
+    assert graph.properties["nodes"] == 5
+    if dropped:
+        graph._property_tracker = None
+    graph.add_edge(node, graph.nodes[0])
+    assert graph.properties["nodes"] == 5
+    assert graph.properties["edges"] == 7
+    assert graph.properties["connected"] is True
+
+
+def test_default_names_do_not_collide(tmp_path):
+    path = tmp_path / "graph.txt"
+    path.write_text("1 2\n2 3\n3 1\n3 4\n")
+    graph = graph_io.load(str(path))
+    node = graph.add_node(0, 0)
+    assert node.name not in {"1", "2", "3", "4"}
+    assert len(set(graph.names)) == 5
+    assert graph.to_networkx().number_of_nodes() == 5
+    assert graph.properties["connected"] is False
+
+
+def test_large_layouts_are_cached(monkeypatch):
+    monkeypatch.setattr(Graph, "large_layout_threshold", 10) # uses the multilevel layout, it starts from random positions
+    first = Graph.new_cycle_graph(50)
+    second = Graph.new_cycle_graph(50)
+    assert np.allclose(first.node_positions(), second.node_positions())
+
+
+def test_relax_around_moves_only_the_neighborhood():
+    graph = Graph.new_path_graph(10)
+    node = graph.add_node(0.5, 0.5)
+    graph.add_edge(node, graph.nodes[3])
+    before = graph.node_positions().copy()
+    graph.relax_around([node])
+    moved = np.flatnonzero((graph.node_positions() != before).any(axis=1))
+    assert set(moved.tolist()) <= {3, node.index}
+
+
+def test_drop_derived_keeps_structure():
+    graph = Graph.new_cycle_graph(6)
+    graph.properties
+    positions = graph.node_positions().copy()
+    graph.drop_derived()
+    assert graph.derived_bytes() == 0
+    assert (graph.node_positions() == positions).all()
+    assert graph.properties["edges"] == 6
+
+
+def test_add_node_after_drop_derived():
+    graph = Graph.new_complete_graph(4)
+    graph.properties
+    graph.drop_derived()
+    node = graph.add_node(0, 0)
+    graph.drop_derived()
+    graph.add_edge(node, graph.nodes[0])
+    assert graph.properties["nodes"] == 5
+    assert graph.properties["edges"] == 7
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+import graph_io
+from graph import Graph
+
+
+# path 0-1-2-3 with an extra node joined to 0, with a colored node, a colored edge and a weight
+def sample_graph(name):
+    graph = Graph.new_path_graph(4)
+    node = graph.add_node(0.25, 0.5, name)
+    graph.add_edge(node, graph.nodes[0], weight=2.5, color="red")
+    graph.nodes[1].color = "blue"
+    return graph
+
+
+def edge_set(graph):
+    return {frozenset((str(name1), str(name2))) for name1, name2 in graph.edge_names()}
+
+
+@pytest.mark.parametrize("extension", [graph_io.binary_extension, ".graphml", ".gml"])
+def test_round_trip(tmp_path, extension):
+    graph = sample_graph('a&b "q" <c>')
+    path = str(tmp_path / ("graph" + extension))
+    graph_io.save(graph, path)
+    loaded = graph_io.load(path)
+    assert [str(name) for name in loaded.names] == [str(name) for name in graph.names]
+    assert edge_set(loaded) == edge_set(graph)
+    assert np.allclose(loaded.node_positions(), graph.node_positions())
+    assert [node.color for node in loaded.nodes] == [node.color for node in graph.nodes]
+    assert [edge.color for edge in loaded.edges] == [edge.color for edge in graph.edges]
+    assert [edge.weight for edge in loaded.edges] == [edge.weight for edge in graph.edges]
+
+
+@pytest.mark.parametrize("extension", [".txt", ".csv"])
+def test_edge_list_round_trip(tmp_path, extension):
+    graph = sample_graph("extra")
+    path = str(tmp_path / ("graph" + extension))
+    graph_io.save(graph, path)
+    loaded = graph_io.load(path)
+    assert sorted(str(name) for name in loaded.names) == sorted(str(name) for name in graph.names)
+    assert edge_set(loaded) == edge_set(graph)
+
+
+def test_gml_unescapes_names(tmp_path):
+    path = tmp_path / "graph.gml"
+    path.write_text('graph [\n  node [ id 0 label "a&amp;b &quot;q&quot;" ]\n]\n')
+    assert list(graph_io.load(str(path)).names) == ['a&b "q"']
@@ -0,0 +1,59 @@
+import random
+
+import networkx as nx
+import pytest
+
+from graph import Graph
+
+
+def undirected_edges(nx_graph):
+    return {frozenset(edge) for edge in nx_graph.edges() if edge[0] != edge[1]}
+
+
+# the kept result must agree with a full test, and a kept embedding must be valid and contain exactly the edges of the graph
+def check(graph):
+    result = graph.property_tracker.planarity_result()
+    nx_graph = graph.to_networkx()
+    planar, certificate = nx.check_planarity(nx_graph, counterexample=True)
+    assert result.planar == planar
+    assert graph.properties["planar"] == planar
+    if planar:
+        result.embedding.check_structure()
+        assert set(result.embedding.nodes) == set(nx_graph.nodes)
+        assert undirected_edges(result.embedding) == undirected_edges(nx_graph)
+    else:
+        counterexample = result.counterexample
+        assert not nx.check_planarity(counterexample)[0]
+        assert undirected_edges(counterexample) <= undirected_edges(nx_graph)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_edges_keep_planarity(seed):
+    rng = random.Random(seed)
+    graph = Graph.new_empty_graph(12)
+    # two cycles, the random edges join them and insert chords until the graph is no longer planar
+    for i in range(6):
+        graph.add_edge(graph.nodes[i], graph.nodes[(i + 1) % 6])
+        graph.add_edge(graph.nodes[6 + i], graph.nodes[6 + (i + 1) % 6])
+    check(graph)
+    became_non_planar = False
+    for _ in range(40):
+        node1, node2 = rng.sample(list(graph.nodes), 2)
+        if graph.has_edge(node1, node2):
+            continue
+        graph.add_edge(node1, node2)
+        check(graph)
+        became_non_planar = became_non_planar or not graph.properties["planar"]
+    assert became_non_planar
+
+
+@pytest.mark.parametrize("nx_graph", [nx.complete_graph(5), nx.complete_bipartite_graph(3, 3)], ids=["K5", "K3,3"])
+def test_last_edge_makes_graph_non_planar(nx_graph):
+    last = list(nx_graph.edges())[-1]
+    nx_graph.remove_edge(*last)
+    graph = Graph(nx_graph)
+    check(graph)
+    assert graph.properties["planar"] is True
+    graph.add_edge(graph.get_node(last[0]), graph.get_node(last[1]))
+    check(graph)
+    assert graph.properties["planar"] is False
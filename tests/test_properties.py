@@ -0,0 +1,64 @@
+import random
+
+import pytest
+
+from graph import Graph
+from properties import PropertyTracker, evaluate_property
+
+
+# the incrementally maintained values must be the ones networkx computes for the current graph
+def check(graph):
+    nx_graph = graph.to_networkx()
+    for name in PropertyTracker.incremental:
+        expected = evaluate_property(name, nx_graph)
+        assert graph.properties[name] == pytest.approx(expected), name
+
+
+def add_path(graph, nodes):
+    for node1, node2 in zip(nodes, nodes[1:]):
+        graph.add_edge(node1, node2)
+        check(graph)
+
+
+@pytest.mark.parametrize("length", [3, 4, 5, 6])
+def test_cycles(length):
+    graph = Graph.new_empty_graph(length)
+    nodes = list(graph.nodes)
+    add_path(graph, nodes + nodes[:1])
+    assert graph.properties["bipartite"] is (length % 2 == 0)
+    assert graph.properties["eulerian"] is True
+
+
+# two bipartite components are joined by an edge, once keeping and once breaking the two coloring
+@pytest.mark.parametrize("offset, bipartite", [(0, True), (1, False)])
+def test_joining_components(offset, bipartite):
+    graph = Graph.new_empty_graph(8)
+    nodes = list(graph.nodes)
+    add_path(graph, nodes[:4])
+    add_path(graph, nodes[4:])
+    assert graph.properties["connected"] is False
+    assert graph.properties["forest"] is True
+    graph.add_edge(nodes[0], nodes[4]) # joins the components, nodes 0 and 4 start both paths
+    check(graph)
+    assert graph.properties["tree"] is True
+    graph.add_edge(nodes[3], nodes[7 - offset]) # closes a cycle of length 8 or 7
+    check(graph)
+    assert graph.properties["bipartite"] is bipartite
+
+
+# random sequences of added nodes, edges and self loops, starting from the null graph
+@pytest.mark.parametrize("seed", range(20))
+def test_random_additions(seed):
+    rng = random.Random(seed)
+    graph = Graph.new_null_graph()
+    check(graph)
+    for _ in range(60):
+        nodes = list(graph.nodes)
+        if len(nodes) < 2 or rng.random() < 0.3:
+            graph.add_node(rng.random(), rng.random())
+        elif rng.random() < 0.05:
+            node = rng.choice(nodes)
+            graph.add_edge(node, node)
+        else:
+            graph.add_edge(*rng.sample(nodes, 2))
+        check(graph)
@@ -0,0 +1,87 @@
+import random
+
+from algorithm import Algorithm
+from graph import Graph
+from recording import Trace
+from runner import run_headless
+
+
+def state(graph):
+    return ([node.color for node in graph.nodes], [node.selected for node in graph.nodes],
+            [edge.color for edge in graph.edges], [repr(edge.weight) for edge in graph.edges])
+
+
+# changes random colors, selections and weights at every step and remembers the live state after every pause
+class RandomChanges(Algorithm):
+    def __init__(self, steps, seed=0):
+        super().__init__("Random Changes", "Changes random attributes at every step")
+        self.step_count = steps
+        self.rng = random.Random(seed)
+        self.states = []
+
+    def run(self, graph):
+        self.states.append(state(graph))
+        for _ in range(self.step_count):
+            for _ in range(self.rng.randint(0, 3)):
+                node = self.rng.choice(graph.nodes)
+                node.color = self.rng.choice(["red", "green", "blue", "white"])
+                node.selected = self.rng.random() < 0.5
+            edge = self.rng.choice(graph.edges)
+            if self.rng.random() < 0.5:
+                edge.color = self.rng.choice(["black", "red"])
+            else:
+                edge.weight = self.rng.randint(1, 5)
+            if self.pause():
+                return
+            self.states.append(state(graph))
+        self.finished = True
+
+
+def record(steps):
+    graph = Graph.new_cycle_graph(8)
+    algorithm = RandomChanges(steps)
+    run_headless(algorithm, graph, record=True)
+    algorithm.states.append(state(graph)) # the last step of the trace holds the changes after the last pause, there are none
+    assert algorithm.trace.length() == len(algorithm.states) - 1
+    return graph, algorithm.trace, algorithm.states
+
+
+def check_seeks(trace, graph, states, steps):
+    for step in steps:
+        trace.seek(step)
+        assert trace.position == step
+        assert state(graph) == states[step], step
+
+
+def test_seek_every_step():
+    graph, trace, states = record(300)
+    steps = range(trace.length() + 1)
+    check_seeks(trace, graph, states, steps)
+    check_seeks(trace, graph, states, reversed(steps))
+    check_seeks(trace, graph, states, random.Random(1).sample(steps, len(steps))) # jumps use the keyframes
+
+
+def test_keyframes_are_thinned():
+    graph, trace, states = record(64*Trace.max_keyframes*2)
+    assert len(trace.keyframes) <= Trace.max_keyframes
+    assert trace.keyframe_interval > Trace.keyframe_interval
+    assert all(step % trace.keyframe_interval == 0 for step in trace.keyframes)
+    steps = range(trace.length() + 1)
+    check_seeks(trace, graph, states, random.Random(2).sample(steps, 2000))
+    check_seeks(trace, graph, states, [0, trace.length(), 1, trace.length() - 1])
+
+
+def test_save_load_seek(tmp_path):
+    graph, trace, states = record(1000)
+    path = str(tmp_path / "trace.npz")
+    trace.save(path)
+    trace.seek(trace.length() // 2) # loading resets the graph to the initial state
+    loaded = Trace.load(path, graph)
+    assert loaded.length() == trace.length()
+    assert loaded.position == 0
+    assert state(graph) == states[0]
+    assert len(loaded.keyframes) <= Trace.max_keyframes
+    steps = range(loaded.length() + 1)
+    check_seeks(loaded, graph, states, steps)
+    check_seeks(loaded, graph, states, reversed(steps))
+    check_seeks(loaded, graph, states, random.Random(3).sample(steps, len(steps)))
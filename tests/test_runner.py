@@ -0,0 +1,22 @@
+import pytest
+
+from algorithm import TestAlgorithm as ColoringAlgorithm
+from graph import Graph
+from runner import run_headless
+
+
+@pytest.mark.parametrize("max_steps", [1, 2, 5])
+def test_step_limit(max_steps):
+    graph = Graph.new_path_graph(10)
+    result = run_headless(ColoringAlgorithm(), graph, max_steps=max_steps)
+    assert not result.finished
+    assert result.steps == max_steps
+    assert len(result.step_times) == max_steps
+
+
+def test_step_limit_above_the_steps_needed():
+    graph = Graph.new_path_graph(10)
+    result = run_headless(ColoringAlgorithm(), graph, max_steps=12) # the algorithm pauses once before the first node and after every node
+    assert result.finished
+    assert result.steps == 11
+    assert [node.color for node in graph.nodes] == ["red"]*10